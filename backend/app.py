@@ -1,15 +1,43 @@
-from flask import Flask, jsonify, request
+import hmac
+import os
+import threading
+from functools import wraps
+import time
+from flask import Flask, Response, g, jsonify, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound
 from datetime import datetime
-from modules.database import init_db, get_db_connection
+from modules.database import init_db
 from modules.data_fetcher import DataFetcher
 from modules.swot_analyzer import SWOTAnalyzer
 from modules.company_info import CompanyInfo
 from modules.stock_screener import StockScreener
-from modules.auth import login_user, register_user, forgot_password, verify_token, create_or_reset_password, verify_jwt_token
+from modules.number_parser import to_float, format_market_cap
+from modules.auth import ADMIN_ENABLED, login_user, register_user, forgot_password, verify_token, create_or_reset_password, verify_jwt_token, start_token_sweeper
 from modules.email_service import send_password_create_email, send_password_reset_email
+from modules.email_outbox import outbox
+from modules.warmup import start_scheduler as start_warmup_scheduler, warm_symbols
+from modules.tiered_cache import cache, NAMESPACES
+from modules.hot_symbols import prefetcher
+from modules.admission import admission, AdmissionRejected
+from modules.deadline import set_deadline, reset_deadline
+from modules.metrics import metrics, span, start_request_timings, end_request_timings, server_timing_header
+from modules.upstream_fixtures import UPSTREAM_MODE, install as install_upstream_fixtures
+from modules.profiler import RequestProfiler, should_profile, list_profiles, PROFILE_DIR, PROFILE_PARAM, PROFILE_HEADER
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON responses, with encoding time reported as its own stage"""
+    def dumps(self, obj, **kwargs):
+        with span('json.encode'):
+            return super().dumps(obj, **kwargs)
+
+# Record upstream responses or replay them from a stand-in server (UPSTREAM_MODE=record|replay)
+if UPSTREAM_MODE != 'live':
+    install_upstream_fixtures()
 
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 CORS(app)
 init_db()
 data_fetcher = DataFetcher()
@@ -17,6 +45,93 @@ swot_analyzer = SWOTAnalyzer()
 company_info = CompanyInfo()
 stock_screener = StockScreener()
 
+# Nightly cache warm-up, e.g. WARMUP_SCHEDULE=18:00 (IST); also runnable as `python -m modules.warmup`
+if os.getenv('WARMUP_SCHEDULE'):
+    start_warmup_scheduler(os.getenv('WARMUP_SCHEDULE'))
+
+# Keep frequently opened symbols and their peers warm (HOT_PREFETCH=0 to disable)
+if os.getenv('HOT_PREFETCH', '1') == '1':
+    prefetcher.start()
+
+# Deliver queued emails in the background (EMAIL_OUTBOX=0 to run `python -m modules.email_outbox` separately)
+if os.getenv('EMAIL_OUTBOX', '1') == '1':
+    outbox.start()
+
+# Purge used and expired password tokens hourly (TOKEN_SWEEP=0 to disable)
+if os.getenv('TOKEN_SWEEP', '1') == '1':
+    start_token_sweeper()
+
+if not ADMIN_ENABLED:
+    print("Admin endpoints disabled: set SECRET_KEY (and ADMIN_EMAILS) to enable them")
+
+# Time budget per endpoint (seconds): upstream calls take their timeouts from what is
+# left and optional work is skipped near the end (see modules/deadline)
+ROUTE_DEADLINES = {
+    'get_nifty50': 5,
+    'get_sensex': 5,
+    'get_stock_details': 15,
+    'generate_swot': 20,
+    'generate_swot_batch': 60,
+    'get_historical_data': 12,
+    'get_company_info': 8,
+    'get_peer_comparison': 15,
+    'get_bulk_deals': 15,
+    'screen_stocks': 120,
+}
+
+@app.before_request
+def start_request_deadline():
+    g.request_started = time.perf_counter()
+    g.timings_token = start_request_timings()
+    seconds = ROUTE_DEADLINES.get(request.endpoint)
+    if seconds:
+        g.deadline_token = set_deadline(seconds)
+
+@app.after_request
+def record_request_timing(response):
+    """Per-route latency histogram, and a Server-Timing header with the request's spans"""
+    started = g.get('request_started')
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('route', (route, request.method, str(response.status_code)), elapsed)
+        response.headers['Server-Timing'] = server_timing_header(elapsed)
+    return response
+
+@app.before_request
+def start_profiling():
+    """Profile this request if an admin asked for it (?_profile=1 or X-Profile: 1), at PROFILE_SAMPLE_RATE"""
+    if request.args.get(PROFILE_PARAM) != '1' and request.headers.get(PROFILE_HEADER) != '1':
+        return
+    payload = _bearer_payload()
+    if not _is_admin(payload) or not should_profile():
+        return
+    g.profiler = RequestProfiler(threading.get_ident())
+    g.profiler.start()
+
+@app.after_request
+def write_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        try:
+            response.headers['X-Profile-Id'] = profiler.write(f"{request.method} {request.path}", response.status_code)
+        except OSError as e:
+            print(f"Could not write request profile: {e}")
+    return response
+
+@app.teardown_request
+def end_request_deadline(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+    token = g.pop('deadline_token', None)
+    if token is not None:
+        reset_deadline(token)
+    token = g.pop('timings_token', None)
+    if token is not None:
+        end_request_timings(token)
+
 @app.route("/")
 def index():
     return jsonify({"status": "Stock SWOT API", "version": "1.0"})
@@ -52,7 +167,7 @@ def register():
         result = register_user(first_name, last_name, email, phone)
         
         if result['success']:
-            # Send email with password create link
+            # Queue email with password create link (sent in the background)
             send_password_create_email(email, first_name, result['token'])
             return jsonify({
                 "success": True,
@@ -75,7 +190,7 @@ def forgot_password_endpoint():
         result = forgot_password(first_name, last_name, email, phone)
         
         if result['success']:
-            # Send email with password reset link
+            # Queue email with password reset link (sent in the background)
             send_password_reset_email(email, first_name, result['token'])
             return jsonify({
                 "success": True,
@@ -151,7 +266,66 @@ def verify_auth():
         # Fast error response
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Route protection; the verified payload is available as g.user
+def _bearer_payload():
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else None
+    return verify_jwt_token(token) if token else None
+
+def require_auth(view):
+    """Require a valid session token (Authorization: Bearer ...)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        payload = _bearer_payload()
+        if not payload:
+            return jsonify({"success": False, "error": "Authentication required"}), 401
+        g.user = payload
+        return view(*args, **kwargs)
+    return wrapper
+
+def _is_admin(payload):
+    """Admin claim, honoured only when tokens are signed with a configured SECRET_KEY"""
+    return bool(ADMIN_ENABLED and payload and payload.get('admin'))
+
+def require_admin(view):
+    """Require a valid session token carrying the admin claim"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_ENABLED:
+            return jsonify({"success": False, "error": "Admin endpoints are disabled until SECRET_KEY is configured"}), 403
+        payload = _bearer_payload()
+        if not payload:
+            return jsonify({"success": False, "error": "Authentication required"}), 401
+        if not _is_admin(payload):
+            return jsonify({"success": False, "error": "Admin access required"}), 403
+        g.user = payload
+        return view(*args, **kwargs)
+    return wrapper
+
+def admission_control(route_class, when=None):
+    """
+    Quota and concurrency limits for an expensive route (see admission); use
+    after require_auth. `when` limits it to some requests, e.g. long periods.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if when is not None and not when():
+                return view(*args, **kwargs)
+            user = str(g.user.get('email') or g.user.get('user_id'))
+            try:
+                with admission.admit(route_class, user):
+                    return view(*args, **kwargs)
+            except AdmissionRejected as e:
+                response = jsonify({"success": False, "error": str(e), "retry_after": e.retry_after})
+                response.status_code = e.status
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+        return wrapper
+    return decorator
+
 @app.route("/api/nifty50", methods=["GET"])
+@require_auth
 def get_nifty50():
     try:
         data = data_fetcher.fetch_nifty50()
@@ -160,6 +334,7 @@ def get_nifty50():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/sensex", methods=["GET"])
+@require_auth
 def get_sensex():
     try:
         data = data_fetcher.fetch_sensex()
@@ -168,80 +343,46 @@ def get_sensex():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/stock-details/<symbol>", methods=["GET"])
+@require_auth
 def get_stock_details(symbol):
     """Get detailed stock information from Yahoo Finance"""
     try:
         stock_data = swot_analyzer._fetch_stock_data(symbol.upper())
         
         if stock_data:
-            # Format market cap (could be string from screener or number from yfinance)
-            market_cap = stock_data.get('market_cap', 0)
-            
-            # If market_cap is already a string from screener.in, use it directly
-            if isinstance(market_cap, str):
-                market_cap_display = market_cap
-            # Otherwise convert from number
-            elif isinstance(market_cap, (int, float)):
-                if market_cap >= 1000000000000:
-                    market_cap_display = f"{market_cap / 1000000000000:.2f} T"
-                elif market_cap >= 10000000000:
-                    market_cap_display = f"{market_cap / 10000000000:.2f} B"
-                elif market_cap >= 10000000:
-                    market_cap_display = f"{market_cap / 10000000:.2f} Cr"
-                else:
-                    market_cap_display = f"{market_cap:,.0f}"
-            else:
-                market_cap_display = str(market_cap)
+            prefetcher.record_access(symbol, stock_data.get('peer_comparison'))
             
-            # Correctly format financial metrics
-            roe_raw = stock_data.get('roe', 0)
-            # ROE from screener.in is already in percentage (29 = 29%)
-            # ROE from yfinance is in decimal (0.29 = 29%)
-            # Check if it's from screener (value >= 1 typically) or yfinance (value < 1)
-            if isinstance(roe_raw, (int, float)):
-                if roe_raw > 0 and roe_raw <= 1:
-                    roe_percent = round(roe_raw * 100, 2)  # yfinance format
-                else:
-                    roe_percent = round(roe_raw, 2)  # screener.in format (already %)
-            else:
-                roe_percent = 0
+            # Market cap is display text from screener.in ("₹9,552 Cr.") or a number from yfinance
+            market_cap = stock_data.get('market_cap', 0)
+            market_cap_display = market_cap if isinstance(market_cap, str) else format_market_cap(market_cap)
             
-            roce_raw = stock_data.get('roce', 0)
-            # ROCE from screener.in is already in percentage
-            if isinstance(roce_raw, (int, float)):
-                if roce_raw > 0 and roce_raw <= 1:
-                    roce_percent = round(roce_raw * 100, 2)  # yfinance format
-                else:
-                    roce_percent = round(roce_raw, 2)  # screener.in format (already %)
-            else:
-                roce_percent = 0
+            # Ratios are normalized to percent units when the data is fetched
+            roe_percent = round(to_float(stock_data.get('roe')), 2)
+            roce_percent = round(to_float(stock_data.get('roce')), 2)
+            div_yield = round(to_float(stock_data.get('dividend_yield')), 2)
             
-            dividend_yield_raw = stock_data.get('dividend_yield', 0)
-            # Dividend yield from yfinance is ALREADY in percentage form
-            # TI returns 0.21 which IS 0.21% (yfinance formats it as decimal percentage)
-            # So we do NOT convert - it's already correct
-            # Just round it to 2 decimal places for display
-            if dividend_yield_raw:
-                div_yield = round(dividend_yield_raw, 2)
-            else:
-                div_yield = 0
+            # Quarterly results are stored numerically; render them for the table view
+            quarterly_results = stock_data.get('quarterly_results')
             
             details = {
                 "symbol": stock_data['symbol'],
                 "name": stock_data.get('name', ''),
                 "sector": stock_data.get('sector', 'Unknown'),
-                "current_price": round(stock_data.get('current_price', 0), 2),
+                "current_price": round(to_float(stock_data.get('current_price')), 2),
                 "market_cap": market_cap_display,
-                "pe_ratio": round(stock_data.get('pe_ratio', 0), 2),
-                "book_value": round(stock_data.get('book_value', 0), 2),
+                "pe_ratio": round(to_float(stock_data.get('pe_ratio')), 2),
+                "book_value": round(to_float(stock_data.get('book_value')), 2),
                 "roe": roe_percent,
                 "roce": roce_percent,
                 "dividend_yield": div_yield,
-                "52w_high": round(stock_data.get('52w_high', 0), 2),
-                "52w_low": round(stock_data.get('52w_low', 0), 2),
-                "previous_close": round(stock_data.get('previous_close', 0), 2),
+                "52w_high": round(to_float(stock_data.get('52w_high')), 2),
+                "52w_low": round(to_float(stock_data.get('52w_low')), 2),
+                "previous_close": round(to_float(stock_data.get('previous_close')), 2),
                 "peer_comparison": stock_data.get('peer_comparison'),
-                "quarterly_results": stock_data.get('quarterly_results')
+                "quarterly_results": quarterly_results.to_display() if quarterly_results is not None else None,
+                # Served from cache: how old the data is, and whether a refresh is under way
+                "stale": stock_data.get('stale', False),
+                "age_seconds": stock_data.get('age_seconds', 0)
             }
             
             return jsonify({"success": True, "data": details})
@@ -251,38 +392,80 @@ def get_stock_details(symbol):
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/swot/<symbol>", methods=["POST", "GET"])
+@require_auth
+@admission_control('swot')
 def generate_swot(symbol):
     try:
+        prefetcher.record_access(symbol)
         swot_data = swot_analyzer.analyze(symbol.upper())
         return jsonify({"success": True, "data": {"symbol": symbol.upper(), "swot": swot_data,
                    "timestamp": datetime.now().isoformat()}})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+MAX_SWOT_BATCH = 50
+
+@app.route("/api/swot/batch", methods=["GET"])
+def swot_batch_get():
+    """Reject GET explicitly; it would otherwise fall through to /api/swot/<symbol> as symbol BATCH"""
+    response = jsonify({"success": False, "error": "Use POST with a JSON body of symbols"})
+    response.status_code = 405
+    response.headers['Allow'] = 'POST'
+    return response
+
+@app.route("/api/swot/batch", methods=["POST"])
+@require_auth
+@admission_control('swot_batch')
+def generate_swot_batch():
+    try:
+        data = request.get_json() or {}
+        symbols = data.get('symbols')
+        if not isinstance(symbols, list) or not symbols:
+            return jsonify({"success": False, "error": "symbols must be a non-empty list"}), 400
+
+        # Dedupe, keeping the caller's order
+        symbols = list(dict.fromkeys(str(s).strip().upper() for s in symbols if str(s).strip()))
+        if len(symbols) > MAX_SWOT_BATCH:
+            return jsonify({"success": False, "error": f"At most {MAX_SWOT_BATCH} symbols per request"}), 400
+
+        results = swot_analyzer.analyze_batch(symbols)
+        return jsonify({"success": True, "data": [
+            {"symbol": symbol, "status": results[symbol]["status"], "swot": results[symbol]["swot"]}
+            for symbol in symbols
+        ], "count": len(symbols), "timestamp": datetime.now().isoformat()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# Client period values -> yfinance periods (anything else means 1y)
+HISTORY_PERIODS = {
+    '1y': '1y',
+    '3y': '3y',
+    '5y': '5y',
+    'all': 'max'
+}
+
+def _history_period():
+    return HISTORY_PERIODS.get(request.args.get('period', '1y'), '1y')
+
 @app.route("/api/historical/<symbol>", methods=["GET"])
+@require_auth
+@admission_control('historical_max', when=lambda: _history_period() == 'max')
 def get_historical_data(symbol):
     try:
-        period = request.args.get('period', '1y')  # Default to 1 year
-        
-        # Map period values
-        period_map = {
-            '1y': '1y',
-            '3y': '3y',
-            '5y': '5y',
-            'all': 'max'
-        }
-        
-        period = period_map.get(period, '1y')
+        period = _history_period()
         data = data_fetcher.fetch_historical_data(symbol.upper(), period)
         
         if data:
-            return jsonify({"success": True, "data": data, "period": period})
+            stale, age_seconds = data_fetcher.history_age(symbol.upper(), period)
+            return jsonify({"success": True, "data": data, "period": period,
+                            "stale": stale, "age_seconds": age_seconds})
         else:
             return jsonify({"success": False, "error": "Historical data not found"}), 404
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/company-info/<symbol>", methods=["GET"])
+@require_auth
 def get_company_info(symbol):
     try:
         info = company_info.get_annual_reports_and_news(symbol.upper())
@@ -291,6 +474,7 @@ def get_company_info(symbol):
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/peer-comparison/<symbol>", methods=["GET"])
+@require_auth
 def get_peer_comparison(symbol):
     """Get peer comparison data for stocks in the same sector"""
     try:
@@ -323,6 +507,8 @@ def get_peer_comparison(symbol):
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/bulk-deals/<symbol>", methods=["GET"])
+@require_auth
+@admission_control('bulk_deals')
 def get_bulk_deals(symbol):
     """Get bulk deals data for the last 30 days"""
     try:
@@ -335,6 +521,8 @@ def get_bulk_deals(symbol):
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/screen-stocks", methods=["GET", "POST"])
+@require_auth
+@admission_control('screen')
 def screen_stocks():
     """
     Screen Indian stocks based on criteria:
@@ -417,5 +605,89 @@ def screen_stocks():
             "traceback": error_trace if app.debug else None
         }), 500
 
+# Bearer token for Prometheus scrapers; admin sessions can read /metrics too
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Latency histograms (this process) in the Prometheus text format"""
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else ''
+    if not (METRICS_TOKEN and token and hmac.compare_digest(token, METRICS_TOKEN)) and not _is_admin(_bearer_payload()):
+        return jsonify({"success": False, "error": "Metrics token or admin access required"}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Admin endpoints
+MAX_WARM_SYMBOLS = 200
+
+@app.route("/api/admin/cache", methods=["GET"])
+@require_admin
+def get_cache_stats():
+    """Per-namespace hit ratios, entry counts, sizes, evictions and age distribution"""
+    try:
+        # Hit/miss and L1 figures are for the worker that answers; L2 figures are shared
+        return jsonify({"success": True, "data": cache.stats(), "pid": os.getpid(),
+                        "timestamp": datetime.now().isoformat()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/admin/cache/<namespace>", methods=["DELETE"])
+@require_admin
+def purge_cache_namespace(namespace):
+    try:
+        if namespace != 'all' and namespace not in NAMESPACES:
+            return jsonify({"success": False, "error": f"Unknown namespace, expected one of {', '.join(NAMESPACES)} or all"}), 400
+        removed = cache.purge(None if namespace == 'all' else namespace)
+        return jsonify({"success": True, "namespace": namespace, "removed": removed})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/admin/cache/symbol/<symbol>", methods=["DELETE"])
+@require_admin
+def purge_cache_symbol(symbol):
+    try:
+        removed = cache.purge_symbol(symbol)
+        return jsonify({"success": True, "symbol": symbol.upper(), "removed": removed})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/admin/cache/warm", methods=["POST"])
+@require_admin
+def warm_cache():
+    """Warm financials and SWOT for a symbol list in the background"""
+    try:
+        data = request.get_json() or {}
+        symbols = data.get('symbols')
+        if not isinstance(symbols, list) or not symbols:
+            return jsonify({"success": False, "error": "symbols must be a non-empty list"}), 400
+        symbols = list(dict.fromkeys(str(s).strip().upper() for s in symbols if str(s).strip()))
+        if len(symbols) > MAX_WARM_SYMBOLS:
+            return jsonify({"success": False, "error": f"At most {MAX_WARM_SYMBOLS} symbols per request"}), 400
+        
+        threading.Thread(target=warm_symbols, args=(symbols,), name='admin-cache-warm', daemon=True).start()
+        return jsonify({"success": True, "queued": symbols, "count": len(symbols)}), 202
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/admin/profiles", methods=["GET"])
+@require_admin
+def get_profiles():
+    """Recent request profiles written by ?_profile=1"""
+    try:
+        return jsonify({"success": True, "data": list_profiles()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/admin/profiles/<path:filename>", methods=["GET"])
+@require_admin
+def get_profile_file(filename):
+    """A profile's .speedscope.json, .folded or .txt file"""
+    try:
+        return send_from_directory(os.path.abspath(PROFILE_DIR), filename, as_attachment=filename.endswith('.json'))
+    except NotFound:
+        return jsonify({"success": False, "error": "Profile not found"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
@@ -0,0 +1,103 @@
+"""
+Auth endpoint throughput: concurrent clients driving login, verify-token and
+forgot-password (a write) against a scratch copy of the database.
+
+Usage:
+    python -m benchmarks.auth_throughput [--threads 8] [--seconds 10] [--users 50]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# The API process starts no background workers during the benchmark
+os.environ.setdefault('HOT_PREFETCH', '0')
+os.environ.setdefault('EMAIL_OUTBOX', '0')
+
+import modules.database as database
+
+PASSWORD = 'benchmark-password'
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _seed_users(client, count):
+    """Register users and set their passwords through the API"""
+    from modules.database import db_connection
+    emails = [f'bench{i}@example.com' for i in range(count)]
+    for email in emails:
+        client.post('/api/register', json={'first_name': 'Bench', 'email': email})
+    with db_connection() as conn:
+        tokens = conn.execute("SELECT token FROM password_tokens WHERE token_type = 'create_password'").fetchall()
+    for row in tokens:
+        client.post('/api/create-password', json={'token': row['token'], 'password': PASSWORD})
+    return emails, [row['token'] for row in tokens]
+
+
+def run(threads: int, seconds: float, users: int):
+    from app import app
+    seed_client = app.test_client()
+    emails, tokens = _seed_users(seed_client, users)
+
+    operations = [
+        ('login', lambda c, i: c.post('/api/login', json={'email': emails[i % len(emails)], 'password': PASSWORD})),
+        ('verify-token', lambda c, i: c.post('/api/verify-token', json={'token': tokens[i % len(tokens)]})),
+        ('forgot-password', lambda c, i: c.post('/api/forgot-password',
+                                                json={'first_name': 'Bench', 'email': emails[i % len(emails)]})),
+    ]
+    latencies = {name: [] for name, _ in operations}
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def worker(offset):
+        client = app.test_client()
+        local = {name: [] for name, _ in operations}
+        failed = 0
+        i = offset
+        while time.monotonic() < stop_at:
+            name, call = operations[i % len(operations)]
+            started = time.perf_counter()
+            response = call(client, i)
+            local[name].append(time.perf_counter() - started)
+            if response.status_code != 200:
+                failed += 1
+            i += 1
+        with lock:
+            for name, values in local.items():
+                latencies[name].extend(values)
+            errors[0] += failed
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{threads} threads, {seconds:.0f}s: {total / seconds:.0f} requests/s, {errors[0]} errors")
+    for name, values in latencies.items():
+        print(f"  {name:16} {len(values) / seconds:7.0f}/s  p50 {_percentile(values, 0.5) * 1000:6.2f} ms"
+              f"  p99 {_percentile(values, 0.99) * 1000:6.2f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark auth endpoint throughput")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='auth-bench-')
+    database.DB_PATH = os.path.join(scratch, 'stock_data.db')
+    os.environ.setdefault('CACHE_DB_PATH', os.path.join(scratch, 'cache.db'))
+    try:
+        run(args.threads, args.seconds, args.users)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,220 @@
+"""
+Parsing and analysis hot paths over stored company pages, with regression gates.
+
+Pages come from benchmarks/fixtures/*.html and from company pages recorded
+into the upstream fixture corpus (python -m modules.upstream_fixtures record
+SYMBOL ...), so results do not depend on screener.in. Each case reports
+operations per second (median of --repeat rounds); per-page cases report
+pages per second over the whole page set.
+
+Results are compared with a JSON baseline: a case slower than the baseline
+by more than --threshold (default BENCH_REGRESSION_THRESHOLD, 15%) is a
+regression and the run exits non-zero. Baselines are machine specific;
+record one on the machine that runs the gate.
+
+Usage:
+    python -m benchmarks.hot_paths [--save-baseline] [--threshold 0.15] [-k extract]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Tuple
+
+# The scraper's resolver and cache write to scratch databases (see run())
+import modules.database as database
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGE_FIXTURES = os.path.join(BENCH_DIR, 'fixtures')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baselines', 'hot_paths.json')
+REGRESSION_THRESHOLD = float(os.getenv('BENCH_REGRESSION_THRESHOLD', '0.15'))
+
+SECTION_EXTRACTORS = [
+    'company_name', 'price', 'market_cap', 'pe', 'book_value', 'roe', 'roce', '52w_high', '52w_low',
+    'dividend_yield', 'sector', 'peer_comparison', 'quarterly_results', 'peg', 'debt_to_equity',
+    'profit_margin', 'annual_results',
+]
+
+# Trading days in the history periods the frontend requests
+HISTORY_SIZES = {'1y': 250, '5y': 1250}
+
+
+def load_pages() -> List[Tuple[str, bytes]]:
+    """(name, html) for every stored company page"""
+    from modules.upstream_fixtures import FIXTURES_DIR, response_body
+    pages = []
+    for path in sorted(glob.glob(os.path.join(PAGE_FIXTURES, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read()))
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'www.screener.in', '*.json'))):
+        with open(path) as f:
+            fixture = json.load(f)
+        if '/company/' in fixture['request']['url'] and fixture['response']['status'] == 200:
+            pages.append((fixture['request']['url'], response_body(fixture['response'])))
+    return pages
+
+
+def synthetic_history(days: int) -> List[Dict]:
+    """Rows shaped like DataFetcher.fetch_historical_data output"""
+    rows, close, day = [], 1000.0, date(2020, 1, 1)
+    for i in range(days):
+        close *= 1 + ((i * 7919) % 41 - 20) / 2000
+        rows.append({"date": (day + timedelta(days=i)).strftime("%Y-%m-%d"), "open": round(close * 0.995, 2),
+                     "high": round(close * 1.01, 2), "low": round(close * 0.99, 2), "close": round(close, 2),
+                     "volume": 1_000_000 + (i * 104729) % 500_000})
+    return rows
+
+
+def measure(func: Callable, min_time: float, repeat: int) -> float:
+    """Median calls per second over `repeat` rounds of at least `min_time` seconds"""
+    func()
+    rates = []
+    for _ in range(repeat):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        rates.append(calls / elapsed)
+    return statistics.median(rates)
+
+
+def build_cases(pages: List[Tuple[str, bytes]]) -> List[Tuple[str, str, int, Callable]]:
+    """(name, unit, items per call, callable) for every case"""
+    from bs4 import BeautifulSoup
+    from flask import Flask
+    from modules.screener_scraper import ScreenerScraper
+    from modules.stock_screener import StockScreener
+    from modules.swot_analyzer import SWOTAnalyzer
+
+    scraper, screener, swot = ScreenerScraper(), StockScreener(), SWOTAnalyzer()
+    contents = [content for _, content in pages]
+    soups = [BeautifulSoup(content, 'html.parser') for content in contents]
+    parsed = [scraper.parse_company_page('BENCH', content) for content in contents]
+    count = len(pages)
+
+    cases = [
+        ('scraper.parse_html', 'pages/s', count,
+         lambda: [BeautifulSoup(content, 'html.parser') for content in contents]),
+        ('scraper.full_extraction', 'pages/s', count,
+         lambda: [scraper.parse_company_page('BENCH', content) for content in contents]),
+    ]
+    for section in SECTION_EXTRACTORS:
+        extract = getattr(scraper, f'_extract_{section}')
+        cases.append((f'scraper.extract.{section}', 'pages/s', count,
+                      lambda extract=extract: [extract(soup) for soup in soups]))
+
+    quarterly = [data['quarterly_results'] for data in parsed]
+    annual = [data['annual_results'] for data in parsed]
+    stock_data = [dict(data, revenue_growth=0, earnings_growth=0, volatility=0, beta=1.0) for data in parsed]
+    perf = [screener.analyze_quarterly_results(table) for table in quarterly]
+    debt = [screener.analyze_annual_debt_trend(table) for table in annual]
+    cases += [
+        ('screener.analyze_quarterly_results', 'ops/s', count,
+         lambda: [screener.analyze_quarterly_results(table) for table in quarterly]),
+        ('screener.analyze_annual_debt_trend', 'ops/s', count,
+         lambda: [screener.analyze_annual_debt_trend(table) for table in annual]),
+        ('screener.calculate_match_score', 'ops/s', count,
+         lambda: [screener._calculate_match_score(*args) for args in zip(stock_data, perf, debt)]),
+        ('swot.generate_from_data', 'ops/s', count,
+         lambda: [swot._generate_swot_from_data(data) for data in stock_data]),
+    ]
+
+    # What /api/historical returns: jsonify of the fetch_historical_data rows
+    json_app = Flask(__name__)
+    for period, days in HISTORY_SIZES.items():
+        payload = {"success": True, "symbol": "BENCH", "period": period, "data": synthetic_history(days)}
+        cases.append((f'history.serialize.{period}', 'ops/s', 1,
+                      lambda payload=payload: json_app.json.response(payload)))
+    return cases
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Names of cases slower than the baseline by more than `threshold`"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        change = result['rate'] / previous['rate'] - 1
+        result['change'] = round(change, 4)
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def run(args) -> int:
+    pages = load_pages()
+    if not pages:
+        print("No company pages found; add HTML to benchmarks/fixtures or record some with modules.upstream_fixtures")
+        return 1
+    print(f"{len(pages)} company pages, {args.repeat} rounds of {args.min_time}s per case")
+
+    results = {}
+    for name, unit, items, func in build_cases(pages):
+        if args.k and args.k not in name:
+            continue
+        rate = measure(func, args.min_time, args.repeat) * items
+        results[name] = {"rate": round(rate, 2), "unit": unit}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+
+    for name, result in results.items():
+        change = f"{result['change'] * 100:+6.1f}%" if 'change' in result else '      -'
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"  {name:38} {result['rate']:12.1f} {result['unit']:8} {change}{flag}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                "recorded_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                "machine": platform.node(),
+                "python": platform.python_version(),
+                "pages": [name for name, _ in pages],
+                "results": {**baseline.get('results', {}),
+                            **{name: {"rate": r["rate"], "unit": r["unit"]} for name, r in results.items()}},
+            }, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark parsing and analysis hot paths")
+    parser.add_argument('--min-time', type=float, default=0.5, help="seconds per round")
+    parser.add_argument('--repeat', type=int, default=5, help="rounds per case (the median is reported)")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="allowed slowdown against the baseline, as a fraction")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('-k', help="only run cases whose name contains this")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='hot-paths-bench-')
+    database.DB_PATH = os.path.join(scratch, 'stock_data.db')
+    os.environ.setdefault('CACHE_DB_PATH', os.path.join(scratch, 'cache.db'))
+    try:
+        database.init_db()
+        raise SystemExit(run(args))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
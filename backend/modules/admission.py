@@ -0,0 +1,151 @@
+"""
+Admission Module
+Admission control for expensive API routes (stock screening, SWOT, bulk
+deals, max-period history), so one heavy user cannot tie up the workers that
+serve everyone's interactive page loads.
+
+Every route class has:
+- a per-user token-bucket quota (sustained rate + burst),
+- a per-user concurrency limit,
+- a global concurrency limit, with a short queue: a request waits up to
+  `queue_seconds` for a free slot before it is turned away.
+
+Quota and per-user concurrency rejections are 429s, a full global queue is a
+503; both carry a Retry-After. Limits are per process.
+
+Usage:
+    with admission.admit('screen', user_id):
+        ...  # may raise AdmissionRejected
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, NamedTuple
+from .rate_limiter import TokenBucket
+
+
+class AdmissionPolicy(NamedTuple):
+    user_concurrency: int
+    global_concurrency: int
+    rate: float          # requests per second per user, sustained
+    burst: float         # requests per user that can be made back to back
+    queue_seconds: float  # how long to wait for a global slot
+
+
+POLICIES: Dict[str, AdmissionPolicy] = {
+    # Full-universe screen: a minute of scraping
+    'screen': AdmissionPolicy(user_concurrency=1, global_concurrency=2, rate=6 / 3600, burst=3, queue_seconds=10),
+    'swot': AdmissionPolicy(user_concurrency=2, global_concurrency=8, rate=0.5, burst=10, queue_seconds=5),
+    'swot_batch': AdmissionPolicy(user_concurrency=1, global_concurrency=2, rate=1 / 60, burst=2, queue_seconds=10),
+    'bulk_deals': AdmissionPolicy(user_concurrency=2, global_concurrency=4, rate=0.2, burst=6, queue_seconds=5),
+    'historical_max': AdmissionPolicy(user_concurrency=1, global_concurrency=4, rate=0.1, burst=3, queue_seconds=5),
+}
+
+# Retry-After for a user already at their concurrency limit
+BUSY_RETRY_SECONDS = 5
+
+# Per-user quota buckets kept (least recently used are dropped)
+MAX_TRACKED_USERS = 10000
+
+
+class AdmissionRejected(Exception):
+    """Request turned away: status is 429 (user over quota/concurrency) or 503 (server busy)"""
+
+    def __init__(self, message: str, status: int, retry_after: float):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class _Slots:
+    """Counting semaphore with a timed, FIFO-ish wait"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.in_use >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.in_use += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.in_use -= 1
+            self._cond.notify()
+
+
+class AdmissionController:
+    """Quotas and concurrency limits per route class and user"""
+
+    def __init__(self, policies: Dict[str, AdmissionPolicy] = POLICIES):
+        self.policies = policies
+        self._global = {name: _Slots(policy.global_concurrency) for name, policy in policies.items()}
+        self._active: Dict[tuple, int] = {}
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, route_class: str, user: str) -> TokenBucket:
+        key = (route_class, user)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                policy = self.policies[route_class]
+                bucket = TokenBucket(f"{route_class}:{user}", policy.rate, policy.burst)
+                self._buckets[key] = bucket
+                while len(self._buckets) > MAX_TRACKED_USERS:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(key)
+            return bucket
+
+    @contextmanager
+    def admit(self, route_class: str, user: str):
+        """Hold a slot for the block, or raise AdmissionRejected"""
+        policy = self.policies[route_class]
+        key = (route_class, user)
+        with self._lock:
+            if self._active.get(key, 0) >= policy.user_concurrency:
+                raise AdmissionRejected(
+                    f"Too many concurrent {route_class} requests; wait for the running one to finish",
+                    429, BUSY_RETRY_SECONDS)
+            self._active[key] = self._active.get(key, 0) + 1
+
+        try:
+            wait = self._bucket(route_class, user).try_acquire()
+            if wait > 0:
+                raise AdmissionRejected(f"{route_class} quota exceeded", 429, wait)
+            slots = self._global[route_class]
+            if not slots.acquire(policy.queue_seconds):
+                raise AdmissionRejected("Server busy, try again shortly", 503, policy.queue_seconds)
+            try:
+                yield
+            finally:
+                slots.release()
+        finally:
+            with self._lock:
+                self._active[key] -= 1
+                if not self._active[key]:
+                    del self._active[key]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: {"in_use": slots.in_use, "waiting": slots.waiting, "limit": slots.limit}
+                for name, slots in self._global.items()}
+
+
+# Shared by the API process
+admission = AdmissionController()
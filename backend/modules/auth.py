@@ -1,11 +1,32 @@
 import hashlib
 import secrets
 import re
+import os
+import threading
+import time
 import jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from modules.database import get_db_connection
+from modules.database import db_connection
 
-SECRET_KEY = "your-secret-key-change-in-production"
+DEFAULT_SECRET_KEY = "your-secret-key-change-in-production"
+SECRET_KEY = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
+
+# Accounts whose session tokens carry the admin claim (comma separated, none by default)
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv('ADMIN_EMAILS', '').split(',') if e.strip()}
+
+# With the built-in secret anyone can sign tokens, so admin access stays off until SECRET_KEY is set
+ADMIN_ENABLED = SECRET_KEY != DEFAULT_SECRET_KEY
+
+# Verified session tokens are remembered (until their exp) so repeat requests skip the HS256 decode;
+# rejected ones are remembered briefly so a client retrying a bad token stays cheap too
+JWT_CACHE_SIZE = 10000
+JWT_REJECT_CACHE_SIZE = 1024
+JWT_REJECT_TTL_SECONDS = 60
+
+# Used and expired password tokens are purged this often, this many rows per delete
+TOKEN_SWEEP_INTERVAL_SECONDS = 3600
+TOKEN_SWEEP_BATCH = 500
 
 def hash_password(password):
     """Hash password using SHA256"""
@@ -24,17 +45,20 @@ def generate_token():
     """Generate a secure random token"""
     return secrets.token_urlsafe(32)
 
-def generate_jwt_token(user_id, email):
+def is_admin_email(email):
+    return ADMIN_ENABLED and email.lower() in ADMIN_EMAILS
+
+def generate_jwt_token(user_id, email, allow_admin=True):
     """Generate JWT token for session"""
     payload = {
         'user_id': user_id,
         'email': email,
+        'admin': allow_admin and is_admin_email(email),
         'exp': datetime.utcnow() + timedelta(days=7)
     }
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
-def verify_jwt_token(token):
-    """Verify and decode JWT token"""
+def _decode_jwt_token(token):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
         return payload
@@ -43,11 +67,74 @@ def verify_jwt_token(token):
     except jwt.InvalidTokenError:
         return None
 
+class JWTVerifier:
+    """
+    JWT verification with an LRU of verified tokens, keyed by the token's
+    SHA-256 digest and valid until the token's exp, and a small short-lived
+    cache of rejected tokens.
+    """
+    
+    def __init__(self, size=JWT_CACHE_SIZE, reject_size=JWT_REJECT_CACHE_SIZE, reject_ttl=JWT_REJECT_TTL_SECONDS):
+        self.size = size
+        self.reject_size = reject_size
+        self.reject_ttl = reject_ttl
+        self._verified = OrderedDict()  # digest -> (payload, exp)
+        self._rejected = OrderedDict()  # digest -> retry after
+        self._lock = threading.Lock()
+    
+    def _reject(self, key, now):
+        self._rejected[key] = now + self.reject_ttl
+        self._rejected.move_to_end(key)
+        while len(self._rejected) > self.reject_size:
+            self._rejected.popitem(last=False)
+    
+    def verify(self, token):
+        """Decoded payload, or None if the token is invalid or expired"""
+        if not isinstance(token, str):
+            return None
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            cached = self._verified.get(key)
+            if cached is not None:
+                payload, exp = cached
+                if now < exp:
+                    self._verified.move_to_end(key)
+                    return dict(payload)
+                # Expired since it was verified
+                del self._verified[key]
+                self._reject(key, now)
+                return None
+            retry_after = self._rejected.get(key)
+            if retry_after is not None:
+                if now < retry_after:
+                    return None
+                del self._rejected[key]
+        
+        payload = _decode_jwt_token(token)
+        with self._lock:
+            if payload is None:
+                self._reject(key, now)
+            elif isinstance(payload.get('exp'), (int, float)):
+                self._verified[key] = (payload, payload['exp'])
+                self._verified.move_to_end(key)
+                while len(self._verified) > self.size:
+                    self._verified.popitem(last=False)
+        return dict(payload) if payload is not None else None
+    
+    def clear(self):
+        with self._lock:
+            self._verified.clear()
+            self._rejected.clear()
+
+jwt_verifier = JWTVerifier()
+
+def verify_jwt_token(token):
+    """Verify and decode JWT token"""
+    return jwt_verifier.verify(token)
+
 def login_user(username, password):
     """Authenticate user login"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     # Check for default admin login
     if username.lower() == "admin" and password == "password":
         return {
@@ -58,13 +145,13 @@ def login_user(username, password):
                 'last_name': 'User',
                 'email': 'admin@stockanalysis.com'
             },
-            'token': generate_jwt_token(0, 'admin@stockanalysis.com')
+            # Demo login only: never an admin session
+            'token': generate_jwt_token(0, 'admin@stockanalysis.com', allow_admin=False)
         }
     
     # Check for user by email
-    cursor.execute("SELECT * FROM users WHERE email = ? AND is_active = 1", (username,))
-    user = cursor.fetchone()
-    conn.close()
+    with db_connection() as conn:
+        user = conn.execute("SELECT * FROM users WHERE email = ? AND is_active = 1", (username,)).fetchone()
     
     if user and user['password_hash'] and verify_password(password, user['password_hash']):
         return {
@@ -89,36 +176,27 @@ def register_user(first_name, last_name, email, phone):
     if not first_name or not first_name.strip():
         return {'success': False, 'error': 'First name is mandatory'}
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if email already exists
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-    existing_user = cursor.fetchone()
-    
-    if existing_user:
-        conn.close()
-        return {'success': False, 'error': 'Email already registered'}
-    
-    # Insert new user without password
     try:
-        cursor.execute("""
-            INSERT INTO users (first_name, last_name, email, phone, created_at, is_active)
-            VALUES (?, ?, ?, ?, ?, 1)
-        """, (first_name.strip(), last_name.strip() if last_name else '', email.lower(), phone or '', datetime.now().isoformat()))
-        
-        # Generate token for password creation
-        token = generate_token()
-        expires_at = datetime.now() + timedelta(hours=24)
-        
-        cursor.execute("""
-            INSERT INTO password_tokens (email, token, token_type, created_at, expires_at, used)
-            VALUES (?, ?, ?, ?, ?, 0)
-        """, (email.lower(), token, 'create_password', datetime.now().isoformat(), expires_at.isoformat()))
-        
-        conn.commit()
-        user_id = cursor.lastrowid
-        conn.close()
+        with db_connection() as conn:
+            # Check if email already exists
+            existing_user = conn.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
+            if existing_user:
+                return {'success': False, 'error': 'Email already registered'}
+            
+            # Insert new user without password
+            conn.execute("""
+                INSERT INTO users (first_name, last_name, email, phone, created_at, is_active)
+                VALUES (?, ?, ?, ?, ?, 1)
+            """, (first_name.strip(), last_name.strip() if last_name else '', email.lower(), phone or '', datetime.now().isoformat()))
+            
+            # Generate token for password creation
+            token = generate_token()
+            expires_at = datetime.now() + timedelta(hours=24)
+            
+            conn.execute("""
+                INSERT INTO password_tokens (email, token, token_type, created_at, expires_at, used)
+                VALUES (?, ?, ?, ?, ?, 0)
+            """, (email.lower(), token, 'create_password', datetime.now().isoformat(), expires_at.isoformat()))
         
         return {
             'success': True,
@@ -126,7 +204,6 @@ def register_user(first_name, last_name, email, phone):
             'token': token  # This will be used in the email link
         }
     except Exception as e:
-        conn.close()
         return {'success': False, 'error': str(e)}
 
 def forgot_password(first_name, last_name, email, phone):
@@ -137,37 +214,34 @@ def forgot_password(first_name, last_name, email, phone):
     if not first_name or not first_name.strip():
         return {'success': False, 'error': 'First name is mandatory'}
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Verify user exists and details match
-    cursor.execute("""
-        SELECT * FROM users 
-        WHERE email = ? AND first_name = ? AND is_active = 1
-    """, (email.lower(), first_name.strip()))
-    
-    user = cursor.fetchone()
-    
-    if not user:
-        conn.close()
-        return {'success': False, 'error': 'User not found or details do not match'}
-    
-    # Check if last_name matches (if provided)
-    if last_name and last_name.strip() and user['last_name'] != last_name.strip():
-        conn.close()
-        return {'success': False, 'error': 'Details do not match'}
-    
-    # Generate reset token
-    token = generate_token()
-    expires_at = datetime.now() + timedelta(hours=24)
-    
-    cursor.execute("""
-        INSERT INTO password_tokens (email, token, token_type, created_at, expires_at, used)
-        VALUES (?, ?, ?, ?, ?, 0)
-    """, (email.lower(), token, 'reset_password', datetime.now().isoformat(), expires_at.isoformat()))
-    
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        # Verify user exists and details match
+        user = conn.execute("""
+            SELECT * FROM users 
+            WHERE email = ? AND first_name = ? AND is_active = 1
+        """, (email.lower(), first_name.strip())).fetchone()
+        
+        if not user:
+            return {'success': False, 'error': 'User not found or details do not match'}
+        
+        # Check if last_name matches (if provided)
+        if last_name and last_name.strip() and user['last_name'] != last_name.strip():
+            return {'success': False, 'error': 'Details do not match'}
+        
+        # Only the newest reset link stays valid; earlier ones are left to the sweeper
+        conn.execute("""
+            UPDATE password_tokens SET used = 1
+            WHERE email = ? AND token_type = 'reset_password' AND used = 0
+        """, (email.lower(),))
+        
+        # Generate reset token
+        token = generate_token()
+        expires_at = datetime.now() + timedelta(hours=24)
+        
+        conn.execute("""
+            INSERT INTO password_tokens (email, token, token_type, created_at, expires_at, used)
+            VALUES (?, ?, ?, ?, ?, 0)
+        """, (email.lower(), token, 'reset_password', datetime.now().isoformat(), expires_at.isoformat()))
     
     return {
         'success': True,
@@ -177,16 +251,11 @@ def forgot_password(first_name, last_name, email, phone):
 
 def verify_token(token, token_type):
     """Verify if token is valid and not expired"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT * FROM password_tokens 
-        WHERE token = ? AND token_type = ? AND used = 0
-    """, (token, token_type))
-    
-    token_record = cursor.fetchone()
-    conn.close()
+    with db_connection() as conn:
+        token_record = conn.execute("""
+            SELECT * FROM password_tokens 
+            WHERE token = ? AND token_type = ? AND used = 0
+        """, (token, token_type)).fetchone()
     
     if not token_record:
         return {'success': False, 'error': 'Invalid or expired token'}
@@ -216,25 +285,19 @@ def create_or_reset_password(token, password, token_type):
     # Hash password
     password_hash = hash_password(password)
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Update user password
-    cursor.execute("""
-        UPDATE users SET password_hash = ? WHERE email = ?
-    """, (password_hash, email))
-    
-    # Mark token as used
-    cursor.execute("""
-        UPDATE password_tokens SET used = 1 WHERE token = ?
-    """, (token,))
-    
-    conn.commit()
-    
-    # Get user details
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-    user = cursor.fetchone()
-    conn.close()
+    with db_connection() as conn:
+        # Update user password
+        conn.execute("""
+            UPDATE users SET password_hash = ? WHERE email = ?
+        """, (password_hash, email))
+        
+        # Mark token as used
+        conn.execute("""
+            UPDATE password_tokens SET used = 1 WHERE token = ?
+        """, (token,))
+        
+        # Get user details
+        user = conn.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
     
     return {
         'success': True,
@@ -248,3 +311,42 @@ def create_or_reset_password(token, password, token_type):
         'token': generate_jwt_token(user['id'], user['email'])
     }
 
+def purge_spent_tokens(batch_size=TOKEN_SWEEP_BATCH):
+    """Delete used and expired password tokens in batches (short write locks); returns rows removed"""
+    now = datetime.now().isoformat()
+    removed = 0
+    while True:
+        with db_connection() as conn:
+            cursor = conn.execute("""
+                DELETE FROM password_tokens WHERE id IN (
+                    SELECT id FROM password_tokens WHERE used = 1
+                    UNION ALL
+                    SELECT id FROM password_tokens WHERE used = 0 AND expires_at < ?
+                    LIMIT ?
+                )
+            """, (now, batch_size))
+        removed += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            break
+    
+    if removed:
+        # Return the freed pages to the filesystem (executescript steps the pragma to completion)
+        with db_connection() as conn:
+            conn.executescript("PRAGMA incremental_vacuum;")
+    return removed
+
+def start_token_sweeper(interval=TOKEN_SWEEP_INTERVAL_SECONDS):
+    """Purge spent password tokens every `interval` seconds on a daemon thread"""
+    def loop():
+        while True:
+            try:
+                removed = purge_spent_tokens()
+                if removed:
+                    print(f"Purged {removed} used or expired password tokens")
+            except Exception as e:
+                print(f"Password token sweep failed: {e}")
+            time.sleep(interval)
+    
+    thread = threading.Thread(target=loop, name='token-sweeper', daemon=True)
+    thread.start()
+    return thread
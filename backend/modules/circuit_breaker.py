@@ -0,0 +1,176 @@
+"""
+Circuit Breaker Module
+Per-upstream circuit breakers so a slow or failing upstream fails fast
+instead of pinning every worker for the full request timeout.
+
+A breaker watches a rolling time window of calls. It opens when enough calls
+in the window failed or were slow; while open every call raises
+CircuitOpenError immediately. After a cool-down a single half-open probe is
+let through: success closes the breaker, failure re-opens it.
+
+Usage:
+    info = guarded_call('yfinance', lambda: ticker.info)
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+from .rate_limiter import limiter_for
+from . import deadline
+from .metrics import span
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Rolling-window breaker on error rate and slow-call rate"""
+
+    def __init__(self, name: str, window_seconds: float = 60, min_calls: int = 5,
+                 failure_ratio: float = 0.5, slow_call_seconds: float = 5.0,
+                 slow_ratio: float = 0.8, open_seconds: float = 30):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_ratio = slow_ratio
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._calls = deque()  # (timestamp, ok, latency)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def check(self):
+        """Raise CircuitOpenError if calls should not go through right now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: one probe at a time
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._probe_in_flight = True
+
+    def cancel(self):
+        """Forget a check() that did not lead to a call (frees the half-open probe)"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record(self, ok: bool, latency: float):
+        """Record the outcome of a call that check() let through"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if ok and latency < self.slow_call_seconds:
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._calls.append((now, ok, latency))
+            self._trim(now)
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+            slow = sum(1 for _, _, call_latency in self._calls if call_latency >= self.slow_call_seconds)
+            if failures / total >= self.failure_ratio or slow / total >= self.slow_ratio:
+                self._open(now)
+
+    def _open(self, now: float):
+        if self.state != OPEN:
+            print(f"Circuit breaker for {self.name} opened")
+        self.state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls_in_window": len(self._calls),
+                "failures_in_window": sum(1 for _, ok, _ in self._calls if not ok)
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(upstream: str) -> CircuitBreaker:
+    """Shared breaker for an upstream ('screener.in', 'yfinance', ...)"""
+    with _breakers_lock:
+        breaker = _breakers.get(upstream)
+        if breaker is None:
+            breaker = CircuitBreaker(upstream)
+            _breakers[upstream] = breaker
+        return breaker
+
+
+def guarded_call(upstream: str, func: Callable, *args, failed: Optional[Callable] = None,
+                 with_timeout: bool = False, **kwargs):
+    """
+    Call an upstream through its breaker and rate limiter.
+    `failed(result)` can flag a returned value as a failure (e.g. HTTP 5xx).
+    Within a request deadline, waiting for the rate limiter is bounded by the
+    remaining budget (DeadlineExceeded if it runs out). With `with_timeout`,
+    func gets `timeout=` from what is left of the budget once the limiter
+    slot is acquired, so the wait is not counted twice.
+    """
+    breaker = breaker_for(upstream)
+    breaker.check()
+    left = deadline.remaining()
+    with span('ratelimit.wait'):
+        acquired = limiter_for(upstream).acquire(timeout=None if left is None else left - deadline.MIN_CALL_SECONDS)
+    if not acquired:
+        breaker.cancel()
+        raise deadline.DeadlineExceeded(f"request deadline exceeded waiting for {upstream}")
+    if with_timeout:
+        try:
+            kwargs['timeout'] = deadline.upstream_timeout()
+        except deadline.DeadlineExceeded:
+            breaker.cancel()
+            raise
+    started = time.monotonic()
+    try:
+        with span(upstream, 'upstream'):
+            result = func(*args, **kwargs)
+    except Exception:
+        if deadline.exhausted():
+            # Cut short by our own budget, not a sign the upstream is unhealthy
+            breaker.cancel()
+        else:
+            breaker.record(False, time.monotonic() - started)
+        raise
+    breaker.record(not (failed and failed(result)), time.monotonic() - started)
+    return result
@@ -3,6 +3,15 @@ from bs4 import BeautifulSoup
 import re
 import xml.etree.ElementTree as ET
 import os
+from datetime import timedelta
+from .tiered_cache import cache
+from .market_hours import now_ist
+from .deadline import upstream_timeout, budget_allows, DeadlineExceeded
+
+# Tweets per (handle, symbol) are reused for this long
+TWEETS_TTL = timedelta(minutes=15)
+# Tweets are optional: a handle is only queried with at least this much request budget left
+TWEETS_MIN_SECONDS = 1.5
 
 class CompanyInfo:
     def __init__(self):
@@ -81,7 +90,7 @@ class CompanyInfo:
         
         # Fetch tweets for each handle
         for handle_info in handles:
-            tweets = self._fetch_tweets_from_handle(handle_info["handle"], symbol)
+            tweets = self._fetch_tweets_from_handle(handle_info["handle"], symbol) if budget_allows(TWEETS_MIN_SECONDS) else []
             twitter_feeds.append({
                 "handle": handle_info["handle"],
                 "name": handle_info["name"],
@@ -103,6 +112,11 @@ class CompanyInfo:
                 print(f"Twitter API Bearer Token not configured. Please set TWITTER_BEARER_TOKEN environment variable.")
                 return []
             
+            cache_key = f"{handle_name}:{symbol}"
+            cached = cache.get('tweets', cache_key)
+            if cached and now_ist() < cached.expires_at:
+                return cached.value
+            
             # Step 1: Verify user exists (optional - API will handle invalid users)
             # Step 2: Search for tweets from this user mentioning the symbol
             try:
@@ -120,7 +134,7 @@ class CompanyInfo:
                     'expansions': 'author_id'
                 }
                 
-                response = requests.get(search_url, headers=headers, params=params, timeout=10)
+                response = requests.get(search_url, headers=headers, params=params, timeout=upstream_timeout())
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -145,12 +159,16 @@ class CompanyInfo:
                     print(f"Error fetching tweets: {response.status_code} - {response.text[:200]}")
                     return []
                     
+            except DeadlineExceeded as e:
+                print(f"Skipping tweets from {handle_name} for {symbol}: {e}")
+                return []
             except Exception as e:
                 print(f"Error searching tweets from {handle_name} for {symbol}: {e}")
                 import traceback
                 traceback.print_exc()
                 return []
             
+            cache.set('tweets', cache_key, tweets[:15], ttl=TWEETS_TTL)
             return tweets[:15]
             
         except Exception as e:
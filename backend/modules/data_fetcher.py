@@ -1,9 +1,24 @@
 import requests
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import os
 import yfinance as yf
+from .number_parser import to_float
+from .circuit_breaker import guarded_call, CircuitOpenError
+from .deadline import budget_allows, call_with_budget, MIN_CALL_SECONDS, DeadlineExceeded
+from .metrics import span
+from .market_hours import now_ist, market_expiry
+from .revalidate import revalidator, freshness, STALE, EXPIRED
+from .tiered_cache import cache
+
+# Daily bars only move during the session: cached for HISTORY_TTL then, until the next open otherwise
+HISTORY_TTL = timedelta(minutes=15)
+HISTORY_GRACE = timedelta(hours=1)
+HISTORY_MAX_STALENESS = timedelta(days=3)
+
+# Index quotes are reused for this long during the session
+QUOTE_TTL = timedelta(seconds=60)
 
 # NSE and BSE libraries
 try:
@@ -41,22 +56,47 @@ class DataFetcher:
         else:
             self.bse = None
     
+    def _cached_quote(self, name, fetch_live):
+        """
+        Index quote from the 'quotes' cache while fresh, else fetched live.
+        If the live sources fail, the last cached quote (however old) is better than mock data.
+        """
+        cached = cache.get('quotes', name)
+        if cached and now_ist() < cached.expires_at:
+            return cached.value
+        quote = fetch_live()
+        if quote:
+            fetched_at = now_ist()
+            cache.set('quotes', name, quote, expires_at=market_expiry(fetched_at, QUOTE_TTL), fetched_at=fetched_at)
+            return quote
+        return cached.value if cached else None
+    
     def fetch_nifty50(self):
+        quote = self._cached_quote('NIFTY 50', self._fetch_nifty50_live)
+        if quote:
+            return quote
+        
+        # Fallback: return mock data if API fails
+        return {
+            "index_name": "NIFTY 50",
+            "current_value": round(22000 + random.uniform(-200, 200), 2),
+            "change": round(random.uniform(-200, 200), 2),
+            "change_percent": round(random.uniform(-1, 1), 2),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _fetch_nifty50_live(self):
         try:
             if NSE_AVAILABLE:
                 # Try nsepython first - NIFTY 50
                 try:
-                    quote = nse_get_index_quote("NIFTY 50")
+                    quote = guarded_call('nse', call_with_budget, nse_get_index_quote, "NIFTY 50")
                     if quote and isinstance(quote, dict):
                         # nsepython returns dict with keys like 'last', 'percChange', etc.
-                        # Values may have commas, so we need to clean them
-                        last_str = str(quote.get('last', quote.get('lastPrice', '0'))).replace(',', '')
-                        prev_close_str = str(quote.get('previousClose', '0')).replace(',', '')
-                        change_pct_str = str(quote.get('percChange', quote.get('pChange', '0'))).replace(',', '')
-                        
-                        current = float(last_str)
-                        change_pct = float(change_pct_str)
-                        prev_close = float(prev_close_str)
+                        # Values may be strings with commas
+                        current = to_float(quote.get('last', quote.get('lastPrice')))
+                        change_pct = to_float(quote.get('percChange', quote.get('pChange')))
+                        prev_close = to_float(quote.get('previousClose'))
                         change = current - prev_close if prev_close > 0 else 0
                         
                         if current > 0:
@@ -71,9 +111,9 @@ class DataFetcher:
                     print(f"nsepython NIFTY50 error: {e}")
                 
                 # Try nsetools as fallback
-                if self.nse:
+                if self.nse and budget_allows(MIN_CALL_SECONDS):
                     try:
-                        quote = self.nse.get_index_quote('NIFTY 50')
+                        quote = guarded_call('nse', call_with_budget, self.nse.get_index_quote, 'NIFTY 50')
                         if quote and isinstance(quote, dict):
                             current = float(quote.get('last', quote.get('lastPrice', quote.get('value', 0))))
                             change_pct = float(quote.get('percChange', quote.get('pChange', 0)))
@@ -92,23 +132,29 @@ class DataFetcher:
                         print(f"nsetools NIFTY50 error: {e}")
         except Exception as e:
             print(f"Error fetching Nifty50: {e}")
+        return None
+    
+    def fetch_sensex(self):
+        quote = self._cached_quote('SENSEX', self._fetch_sensex_live)
+        if quote:
+            return quote
         
         # Fallback: return mock data if API fails
         return {
-            "index_name": "NIFTY 50",
-            "current_value": round(22000 + random.uniform(-200, 200), 2),
-            "change": round(random.uniform(-200, 200), 2),
+            "index_name": "SENSEX",
+            "current_value": round(73000 + random.uniform(-300, 300), 2),
+            "change": round(random.uniform(-300, 300), 2),
             "change_percent": round(random.uniform(-1, 1), 2),
             "timestamp": datetime.now().isoformat()
         }
     
-    def fetch_sensex(self):
+    def _fetch_sensex_live(self):
         try:
             # Try bsedata first for SENSEX (BSE index)
             if BSE_AVAILABLE and self.bse:
                 try:
                     # Get indices from market_cap/broad category where SENSEX is located
-                    data = self.bse.getIndices('market_cap/broad')
+                    data = guarded_call('bse', call_with_budget, self.bse.getIndices, 'market_cap/broad')
                     if data and 'indices' in data:
                         # Find SENSEX in the indices list
                         sensex_data = None
@@ -119,13 +165,9 @@ class DataFetcher:
                         
                         if sensex_data:
                             # Extract values - bsedata returns values with commas
-                            current_str = str(sensex_data.get('currentValue', '0')).replace(',', '')
-                            change_str = str(sensex_data.get('change', '0')).replace(',', '')
-                            change_pct_str = str(sensex_data.get('pChange', '0')).replace(',', '')
-                            
-                            current = float(current_str)
-                            change = float(change_str)
-                            change_pct = float(change_pct_str)
+                            current = to_float(sensex_data.get('currentValue'))
+                            change = to_float(sensex_data.get('change'))
+                            change_pct = to_float(sensex_data.get('pChange'))
                             
                             if current > 0:
                                 return {
@@ -142,17 +184,15 @@ class DataFetcher:
             if NSE_AVAILABLE:
                 sensex_names = ["S&P BSE SENSEX", "SENSEX"]
                 for sensex_name in sensex_names:
+                    if not budget_allows(MIN_CALL_SECONDS):
+                        break
                     try:
-                        quote = nse_get_index_quote(sensex_name)
+                        quote = guarded_call('nse', call_with_budget, nse_get_index_quote, sensex_name)
                         if quote and isinstance(quote, dict):
-                            # Values may have commas, so we need to clean them
-                            last_str = str(quote.get('last', quote.get('lastPrice', '0'))).replace(',', '')
-                            prev_close_str = str(quote.get('previousClose', '0')).replace(',', '')
-                            change_pct_str = str(quote.get('percChange', quote.get('pChange', '0'))).replace(',', '')
-                            
-                            current = float(last_str)
-                            change_pct = float(change_pct_str)
-                            prev_close = float(prev_close_str)
+                            # Values may be strings with commas
+                            current = to_float(quote.get('last', quote.get('lastPrice')))
+                            change_pct = to_float(quote.get('percChange', quote.get('pChange')))
+                            prev_close = to_float(quote.get('previousClose'))
                             change = current - prev_close if prev_close > 0 else 0
                             
                             if current > 0:
@@ -167,47 +207,71 @@ class DataFetcher:
                         continue
         except Exception as e:
             print(f"Error fetching Sensex: {e}")
-        
-        # Fallback: return mock data if API fails
-        return {
-            "index_name": "SENSEX",
-            "current_value": round(73000 + random.uniform(-300, 300), 2),
-            "change": round(random.uniform(-300, 300), 2),
-            "change_percent": round(random.uniform(-1, 1), 2),
-            "timestamp": datetime.now().isoformat()
-        }
+        return None
     
     def fetch_historical_data(self, symbol, period="1y"):
         """
         Fetch historical price data for a stock
         period options: "1y", "3y", "5y", "max" (all time)
+        
+        Cached per (symbol, period); an expired entry within HISTORY_GRACE is
+        returned immediately while one background refresh replaces it.
         """
+        cached = cache.get('history', f"{symbol}:{period}")
+        if cached:
+            data, fetched_at, expires_at = cached
+            state = freshness(fetched_at, expires_at, now_ist(), HISTORY_GRACE, HISTORY_MAX_STALENESS)
+            if state == STALE:
+                revalidator.submit(('history', symbol, period), self._load_historical_data, symbol, period)
+            if state != EXPIRED:
+                return data
+        return self._load_historical_data(symbol, period)
+    
+    def history_age(self, symbol, period="1y"):
+        """(stale, age in seconds) of the cached history served for (symbol, period)"""
+        cached = cache.get('history', f"{symbol}:{period}")
+        if not cached:
+            return False, 0
+        now = now_ist()
+        return now >= cached.expires_at, int((now - cached.fetched_at).total_seconds())
+    
+    def _load_historical_data(self, symbol, period):
         try:
             stock = yf.Ticker(f"{symbol}.NS")  # .NS for NSE stocks
-            data = stock.history(period=period)
+            data = guarded_call('yfinance', stock.history, period=period, with_timeout=True)
             
-            if data.empty:
+            if data.empty and budget_allows(MIN_CALL_SECONDS * 2):
                 # Try without .NS suffix
                 stock = yf.Ticker(symbol)
-                data = stock.history(period=period)
+                data = guarded_call('yfinance', stock.history, period=period, with_timeout=True)
             
             if data.empty:
                 return None
             
             # Convert to list of dictionaries with date and close price
             historical_data = []
-            for date, row in data.iterrows():
-                historical_data.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "open": round(float(row['Open']), 2),
-                    "high": round(float(row['High']), 2),
-                    "low": round(float(row['Low']), 2),
-                    "close": round(float(row['Close']), 2),
-                    "volume": int(row['Volume'])
-                })
+            with span('history.convert'):
+                for date, row in data.iterrows():
+                    historical_data.append({
+                        "date": date.strftime("%Y-%m-%d"),
+                        "open": round(float(row['Open']), 2),
+                        "high": round(float(row['High']), 2),
+                        "low": round(float(row['Low']), 2),
+                        "close": round(float(row['Close']), 2),
+                        "volume": int(row['Volume'])
+                    })
             
+            fetched_at = now_ist()
+            cache.set('history', f"{symbol}:{period}", historical_data,
+                      expires_at=market_expiry(fetched_at, HISTORY_TTL), fetched_at=fetched_at)
             return historical_data
             
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            # yfinance is degraded or the request is out of time - serve the last good copy,
+            # however old (history_age reports it as stale)
+            print(f"Skipping yfinance history for {symbol}: {e}")
+            cached = cache.get('history', f"{symbol}:{period}")
+            return cached.value if cached else None
         except Exception as e:
             print(f"Error fetching historical data for {symbol}: {e}")
             return None
@@ -1,19 +1,159 @@
+import os
 import sqlite3
 import hashlib
 import secrets
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 DB_PATH = "stock_data.db"
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Connection tuning: WAL lets readers run alongside a writer, NORMAL sync is
+# durable under WAL except on power loss, and the page cache/mmap keep hot
+# tables (users, tokens, outbox) in memory.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+)
+BUSY_TIMEOUT_SECONDS = 30
+
+# Prepared statements kept per connection (reused across calls on the same thread)
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_SECONDS, cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+@contextmanager
+def db_connection():
+    """
+    This thread's pooled connection. Commits when the outermost block exits
+    and rolls back if it raises; nested blocks share the transaction.
+
+        with db_connection() as conn:
+            conn.execute(...)
+    """
+    conn = getattr(_local, 'conn', None)
+    # Connections are not carried across a fork (e.g. preloaded gunicorn workers)
+    if conn is None or _local.pid != os.getpid():
+        conn = _connect()
+        _local.conn, _local.pid, _local.depth = conn, os.getpid(), 0
+
+    _local.depth += 1
+    try:
+        yield conn
+        if _local.depth == 1:
+            conn.commit()
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+
+# Schema changes to tables that already exist, applied in order once per
+# database (tracked in PRAGMA user_version). Append only; never edit or reorder.
+MIGRATIONS = (
+    # 1: password_tokens - the sweeper deletes by (used, expires_at); forgot_password
+    #    retires earlier tokens by (email, token_type). Lookups by token use the UNIQUE index.
+    (
+        "CREATE INDEX IF NOT EXISTS idx_password_tokens_spent ON password_tokens (used, expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_password_tokens_email ON password_tokens (email, token_type, used)",
+    ),
+    # 2: incremental auto-vacuum, so pages freed by the sweepers can be returned to the filesystem
+    (
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        "VACUUM",
+    ),
+    # 3: job_leases - hot symbol refreshes are no longer gated by a lease
+    (
+        "DROP TABLE IF EXISTS job_leases",
+    ),
+    # 4: swot_reports - SWOT reports live in the tiered cache, nothing reads this table
+    (
+        "DROP TABLE IF EXISTS swot_reports",
+    ),
+)
+
 def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_connection() as conn:
+        _create_tables(conn.cursor())
+    migrate()
+    print("Database initialized")
+
+def migrate():
+    """Apply pending MIGRATIONS; each runs in its own transaction (VACUUM cannot run inside one)"""
+    with db_connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        with db_connection() as conn:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+        print(f"Database migrated to version {number}")
+
+def _create_tables(cursor):
     cursor.execute("CREATE TABLE IF NOT EXISTS stocks (symbol TEXT PRIMARY KEY, name TEXT, sector TEXT)")
-    cursor.execute("CREATE TABLE IF NOT EXISTS swot_reports (symbol TEXT PRIMARY KEY, swot_data TEXT, created_at TEXT)")
+    # Resolved screener.in company URL per symbol (url NULL = negatively cached)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS symbol_urls (
+            symbol TEXT PRIMARY KEY,
+            url TEXT,
+            variant TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    # Daily OHLCV bars (see price_store)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_bars (
+            symbol TEXT NOT NULL,
+            date TEXT NOT NULL,
+            open REAL, high REAL, low REAL, close REAL, volume REAL,
+            PRIMARY KEY (symbol, date)
+        )
+    """)
+    # Beta/volatility/volume computed from daily_bars (see price_analytics)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS price_analytics (
+            symbol TEXT PRIMARY KEY,
+            beta REAL, volatility REAL, volume REAL, avg_volume REAL, previous_close REAL,
+            as_of TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    # Token buckets shared by all workers when RATE_LIMIT_SHARED=1 (see rate_limiter)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    # Warm-up runs and per-symbol checkpoints (see warmup)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS warmup_runs (
+            run_id TEXT PRIMARY KEY,
+            started_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            finished_at TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS warmup_progress (
+            run_id TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            status TEXT NOT NULL,
+            finished_at TEXT NOT NULL,
+            PRIMARY KEY (run_id, symbol)
+        )
+    """)
     cursor.execute("INSERT OR IGNORE INTO stocks VALUES ('RELIANCE', 'Reliance Industries', 'Oil & Gas'), ('TCS', 'TCS', 'IT'), ('HDFCBANK', 'HDFC Bank', 'Banking')")
     
     # Create users table
@@ -43,13 +183,29 @@ def init_db():
         )
     """)
     
+    # Outgoing mail, delivered by the background sender (see email_outbox)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            to_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            html_body TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            last_error TEXT,
+            claimed_by TEXT,
+            claimed_at TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at)")
+    
     # Create default admin user if it doesn't exist
     admin_password_hash = hashlib.sha256("password".encode()).hexdigest()
     cursor.execute("""
         INSERT OR IGNORE INTO users (first_name, last_name, email, phone, password_hash, created_at)
         VALUES ('Admin', 'User', 'admin@stockanalysis.com', '', ?, ?)
     """, (admin_password_hash, datetime.now().isoformat()))
-    
-    conn.commit()
-    conn.close()
-    print("Database initialized")
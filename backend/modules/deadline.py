@@ -0,0 +1,105 @@
+"""
+Deadline Module
+Per-request time budgets. A route sets a deadline; every upstream call made
+while serving it uses the remaining budget as its timeout, and optional work
+(fallback sources, extra lookups) is skipped once too little is left, so the
+worst-case latency of each endpoint is bounded.
+
+The deadline lives in a context variable: it follows the request's thread,
+not background work handed to other threads (revalidation, prefetch). Work
+fanned out to a pool on the request's behalf must run in a copy of the
+request's context (contextvars.copy_context().run) to keep the budget.
+
+Usage:
+    with request_deadline(15):
+        requests.get(url, timeout=upstream_timeout())   # min(UPSTREAM_TIMEOUT, remaining)
+        if budget_allows(3):
+            ...  # optional work
+        quote = call_with_budget(nse_get_index_quote, 'NIFTY 50')   # clients without a timeout
+"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+# Timeout of a single upstream call (also the cap when a deadline leaves more)
+UPSTREAM_TIMEOUT = 10
+
+# An upstream call is not started with less budget than this
+MIN_CALL_SECONDS = 0.5
+
+# Threads running calls bounded by call_with_budget
+BOUNDED_CALL_WORKERS = 8
+
+_deadline: ContextVar[Optional[float]] = ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting an upstream call the request has no time left for"""
+
+
+def set_deadline(seconds: float):
+    """Start a budget of `seconds` (never extending an outer one); returns a token for reset_deadline"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    return _deadline.set(deadline if current is None else min(current, deadline))
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    token = set_deadline(seconds)
+    try:
+        yield
+    finally:
+        reset_deadline(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None without a deadline"""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def budget_allows(seconds: float) -> bool:
+    """True if there is no deadline or at least `seconds` are left"""
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def exhausted() -> bool:
+    return not budget_allows(MIN_CALL_SECONDS)
+
+
+def upstream_timeout(default: float = UPSTREAM_TIMEOUT) -> float:
+    """Timeout for the next upstream call; raises DeadlineExceeded if the budget is spent"""
+    left = remaining()
+    if left is None:
+        return default
+    if left < MIN_CALL_SECONDS:
+        raise DeadlineExceeded(f"request deadline exceeded ({left:.2f}s left)")
+    return min(default, left)
+
+
+_bounded_pool = ThreadPoolExecutor(max_workers=BOUNDED_CALL_WORKERS, thread_name_prefix='bounded-call')
+
+
+def call_with_budget(func: Callable, *args, **kwargs):
+    """
+    func(*args, **kwargs) for clients that take no timeout (nsepython, bsedata),
+    waited for at most upstream_timeout(); raises DeadlineExceeded after that.
+    A call given up on finishes on its helper thread and its result is dropped.
+    """
+    timeout = upstream_timeout()
+    future = _bounded_pool.submit(contextvars.copy_context().run, func, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise DeadlineExceeded(f"{getattr(func, '__name__', 'call')} did not finish within {timeout:.1f}s")
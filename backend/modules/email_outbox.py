@@ -0,0 +1,292 @@
+"""
+Email Outbox Module
+Outgoing mail is written to the `email_outbox` table and delivered by a
+background sender, so request handlers never wait on the mail relay.
+
+- OutboxSender keeps one authenticated SMTP connection open and reuses it
+  for every message; it is re-established after errors and closed when idle.
+- Due messages are claimed in batches, so several processes can run a sender
+  against the same database without sending a message twice.
+- Failed sends are retried with exponential backoff; permanent rejections
+  (e.g. unknown recipient) and messages out of attempts are marked failed.
+
+Without SMTP credentials or an explicit SMTP_SERVER, messages are printed
+instead of sent (development). To test against a local SMTP stand-in, point
+SMTP_SERVER/SMTP_PORT at it and set SMTP_STARTTLS=0.
+
+Usage:
+    outbox.enqueue('user@example.com', subject, body, html_body)
+    outbox.start()                  # background sender in this process
+    python -m modules.email_outbox  # or drain the outbox once and exit
+"""
+
+import os
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+from .database import db_connection
+
+# Email configuration - you can set these via environment variables
+SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') == '1'
+SMTP_TIMEOUT_SECONDS = 30
+EMAIL_USER = os.getenv('EMAIL_USER', '')
+EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
+FROM_EMAIL = os.getenv('FROM_EMAIL', EMAIL_USER or 'noreply@stockanalysis.com')
+
+BATCH_SIZE = 20
+POLL_INTERVAL_SECONDS = 5
+
+# Idle SMTP connections are closed before the relay drops them
+CONNECTION_IDLE_SECONDS = 60
+
+# Retry after 30s, 1m, 2m, ... capped at 1h; give up after MAX_ATTEMPTS
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+# Messages claimed by a sender that died mid-batch are released after this long
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def build_message(to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> MIMEMultipart:
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = FROM_EMAIL
+    msg['To'] = to_email
+
+    # Add both plain text and HTML versions
+    msg.attach(MIMEText(body, 'plain'))
+    if html_body:
+        msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _is_permanent(error: Exception) -> bool:
+    """5xx replies for a message or its recipients will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError)):
+        return error.smtp_code >= 500
+    return False
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """The relay is unreachable or refused the session (SMTPException subclasses OSError, so rule out replies)"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class OutboxSender:
+    """Delivers queued messages over one reused SMTP connection"""
+
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT, user: str = EMAIL_USER,
+                 password: str = EMAIL_PASSWORD, starttls: bool = SMTP_STARTTLS,
+                 dry_run: Optional[bool] = None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        if dry_run is None:
+            # No credentials and no relay configured: just log (for development)
+            dry_run = not (user and password) and not os.getenv('SMTP_SERVER')
+        self.dry_run = dry_run
+        self.sender_id = uuid.uuid4().hex
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._thread = None
+
+    # Queue
+
+    def enqueue(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> int:
+        """Queue a message for delivery; returns its outbox id"""
+        now = datetime.now().isoformat()
+        with db_connection() as conn:
+            cursor = conn.execute("""
+                INSERT INTO email_outbox (to_email, subject, body, html_body, status, attempts, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, 'pending', 0, ?, ?)
+            """, (to_email, subject, body, html_body, now, now))
+            message_id = cursor.lastrowid
+        self._wake.set()
+        return message_id
+
+    def _claim(self, limit: int = BATCH_SIZE) -> List[Dict]:
+        """Claim up to `limit` due messages for this sender"""
+        now = datetime.now()
+        with db_connection() as conn:
+            conn.execute("""
+                UPDATE email_outbox SET status = 'pending', claimed_by = NULL
+                WHERE status = 'sending' AND claimed_at < ?
+            """, ((now - CLAIM_TIMEOUT).isoformat(),))
+            conn.execute("""
+                UPDATE email_outbox SET status = 'sending', claimed_by = ?, claimed_at = ?
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= ?
+                    ORDER BY id LIMIT ?
+                )
+            """, (self.sender_id, now.isoformat(), now.isoformat(), limit))
+            rows = conn.execute(
+                "SELECT * FROM email_outbox WHERE status = 'sending' AND claimed_by = ? ORDER BY id",
+                (self.sender_id,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+    def _release(self, message_ids: List[int]):
+        """Return claimed messages to the queue without counting an attempt"""
+        if not message_ids:
+            return
+        with db_connection() as conn:
+            conn.execute(
+                f"UPDATE email_outbox SET status = 'pending', claimed_by = NULL WHERE id IN ({','.join('?' * len(message_ids))})",
+                message_ids
+            )
+
+    def _mark_sent(self, message_id: int):
+        with db_connection() as conn:
+            conn.execute("""
+                UPDATE email_outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?,
+                    last_error = NULL, claimed_by = NULL
+                WHERE id = ?
+            """, (datetime.now().isoformat(), message_id))
+
+    def _mark_failed(self, message: Dict, error: Exception):
+        """Schedule a retry with backoff, or give up"""
+        attempts = message['attempts'] + 1
+        give_up = _is_permanent(error) or attempts >= MAX_ATTEMPTS
+        with db_connection() as conn:
+            conn.execute("""
+                UPDATE email_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, claimed_by = NULL
+                WHERE id = ?
+            """, ('failed' if give_up else 'pending', attempts,
+                  (datetime.now() + _backoff(attempts)).isoformat(), str(error)[:500], message['id']))
+        if give_up:
+            print(f"Giving up on email {message['id']} to {message['to_email']} after {attempts} attempts: {error}")
+
+    # SMTP connection
+
+    def _connection(self) -> smtplib.SMTP:
+        """The open SMTP connection, (re)connecting and logging in if needed"""
+        if self._smtp is not None and time.monotonic() - self._last_used > CONNECTION_IDLE_SECONDS:
+            self.close()
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+            try:
+                if self.starttls:
+                    smtp.starttls()
+                if self.user and self.password:
+                    smtp.login(self.user, self.password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+        self._last_used = time.monotonic()
+        return self._smtp
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+    def _deliver(self, message: Dict):
+        if self.dry_run:
+            print(f"[EMAIL NOT CONFIGURED] Would send email to {message['to_email']}")
+            print(f"Subject: {message['subject']}")
+            print(f"Body: {message['body']}")
+            if message['html_body']:
+                print(f"HTML Body: {message['html_body']}")
+            return
+        msg = build_message(message['to_email'], message['subject'], message['body'], message['html_body'])
+        reused = self._smtp is not None
+        try:
+            self._connection().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            if not reused:
+                raise
+            # The relay closed the kept-alive connection; reconnect once
+            self.close()
+            self._connection().send_message(msg)
+
+    # Sending
+
+    def send_batch(self, limit: int = BATCH_SIZE) -> Dict[str, int]:
+        """Send one batch of due messages; returns sent/failed counts"""
+        counts = {'sent': 0, 'failed': 0}
+        messages = self._claim(limit)
+        for index, message in enumerate(messages):
+            try:
+                self._deliver(message)
+            except Exception as e:
+                self._mark_failed(message, e)
+                counts['failed'] += 1
+                if _is_connection_error(e):
+                    # Connection-level problem: release the rest of the batch for a later retry
+                    self.close()
+                    self._release([pending['id'] for pending in messages[index + 1:]])
+                    break
+                if not isinstance(e, smtplib.SMTPResponseException):
+                    self.close()
+                continue
+            self._mark_sent(message['id'])
+            counts['sent'] += 1
+        return counts
+
+    def drain(self) -> Dict[str, int]:
+        """Send batches until nothing is due"""
+        totals = {'sent': 0, 'failed': 0}
+        while True:
+            counts = self.send_batch()
+            totals['sent'] += counts['sent']
+            totals['failed'] += counts['failed']
+            if counts['sent'] + counts['failed'] < BATCH_SIZE or counts['failed']:
+                return totals
+
+    def pending_count(self) -> int:
+        with db_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM email_outbox WHERE status IN ('pending', 'sending')").fetchone()[0]
+
+    def start(self, interval: float = POLL_INTERVAL_SECONDS) -> threading.Thread:
+        """Run the sender on a daemon thread; enqueue() wakes it immediately"""
+        if self._thread is not None:
+            return self._thread
+
+        def loop():
+            while True:
+                try:
+                    self.drain()
+                except Exception as e:
+                    print(f"Email outbox sender failed: {e}")
+                    self.close()
+                self._wake.wait(interval)
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=loop, name='email-outbox', daemon=True)
+        self._thread.start()
+        return self._thread
+
+
+# Shared by the API process
+outbox = OutboxSender()
+
+
+if __name__ == '__main__':
+    print(f"Email outbox: {outbox.pending_count()} messages pending")
+    print(f"Email outbox drained: {outbox.drain()}")
+    outbox.close()
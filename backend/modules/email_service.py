@@ -1,53 +1,17 @@
-import smtplib
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-# Email configuration - you can set these via environment variables
-SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
-EMAIL_USER = os.getenv('EMAIL_USER', '')
-EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
-FROM_EMAIL = os.getenv('FROM_EMAIL', EMAIL_USER)
+from .email_outbox import outbox
 
 def send_email(to_email, subject, body, html_body=None):
-    """Send email using SMTP"""
+    """Queue an email for the background sender (see email_outbox)"""
     try:
-        # If email credentials are not configured, just log (for development)
-        if not EMAIL_USER or not EMAIL_PASSWORD:
-            print(f"[EMAIL NOT CONFIGURED] Would send email to {to_email}")
-            print(f"Subject: {subject}")
-            print(f"Body: {body}")
-            if html_body:
-                print(f"HTML Body: {html_body}")
-            return True
-        
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = FROM_EMAIL
-        msg['To'] = to_email
-        
-        # Add both plain text and HTML versions
-        part1 = MIMEText(body, 'plain')
-        part2 = MIMEText(html_body or body, 'html')
-        
-        msg.attach(part1)
-        if html_body:
-            msg.attach(part2)
-        
-        # Send email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASSWORD)
-            server.send_message(msg)
-        
+        outbox.enqueue(to_email, subject, body, html_body)
         return True
     except Exception as e:
-        print(f"Error sending email: {str(e)}")
+        print(f"Error queueing email: {str(e)}")
         return False
 
 def send_password_create_email(email, first_name, token):
-    """Send password creation email"""
+    """Queue the password creation email"""
     base_url = os.getenv('BASE_URL', 'http://localhost:3000')
     create_password_url = f"{base_url}/create-password?token={token}"
     
@@ -88,7 +52,7 @@ Stock Analysis Team
     return send_email(email, subject, body, html_body)
 
 def send_password_reset_email(email, first_name, token):
-    """Send password reset email"""
+    """Queue the password reset email"""
     base_url = os.getenv('BASE_URL', 'http://localhost:3000')
     reset_password_url = f"{base_url}/reset-password?token={token}"
     
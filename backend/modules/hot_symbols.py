@@ -0,0 +1,161 @@
+"""
+Hot Symbols Module
+Tracks how often each symbol is opened and keeps the hottest ones warm.
+
+- DecayedCounter: per-symbol access scores with exponential decay, so the
+  ranking follows current traffic rather than all-time totals.
+- HotSymbolPrefetcher: a background thread that re-fetches the hottest
+  symbols shortly before their financials cache entry expires, and prefetches
+  the listed peers of every opened symbol at low priority.
+
+Every worker process runs a prefetcher over its own traffic. Expiry is
+checked against the shared L2, so a symbol another worker has just
+refreshed is skipped rather than fetched again.
+
+Usage:
+    prefetcher.record_access('TCS', stock_data.get('peer_comparison'))
+    prefetcher.start()
+"""
+
+import heapq
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from .market_hours import now_ist
+from .rate_limiter import batch_lane
+from .screener_scraper import ScreenerScraper
+from .tiered_cache import cache
+
+HALF_LIFE_SECONDS = 30 * 60
+MAX_TRACKED = 5000
+
+HOT_TOP_N = int(os.getenv('HOT_PREFETCH_TOP_N', '30'))
+HOT_MIN_SCORE = 3.0
+
+# Hot entries are refreshed when they are this close to expiring
+REFRESH_LEAD = timedelta(minutes=2)
+PREFETCH_INTERVAL_SECONDS = 30
+
+# Peers prefetched per cycle, and how many can wait in the queue
+PEERS_PER_CYCLE = 10
+PEER_QUEUE_MAX = 200
+
+
+class DecayedCounter:
+    """Access scores that halve every `half_life` seconds"""
+
+    def __init__(self, half_life: float = HALF_LIFE_SECONDS, max_tracked: int = MAX_TRACKED):
+        self.decay = math.log(2) / half_life
+        self.max_tracked = max_tracked
+        self._scores: Dict[str, Tuple[float, float]] = {}  # symbol -> (score, as of)
+        self._lock = threading.Lock()
+
+    def _current(self, entry: Tuple[float, float], now: float) -> float:
+        score, as_of = entry
+        return score * math.exp(-self.decay * (now - as_of))
+
+    def touch(self, symbol: str, weight: float = 1.0):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._scores.get(symbol)
+            self._scores[symbol] = ((self._current(entry, now) if entry else 0.0) + weight, now)
+            if len(self._scores) > self.max_tracked:
+                # Forget the coldest half
+                keep = heapq.nlargest(self.max_tracked // 2, self._scores.items(),
+                                      key=lambda item: self._current(item[1], now))
+                self._scores = dict(keep)
+
+    def score(self, symbol: str) -> float:
+        with self._lock:
+            entry = self._scores.get(symbol)
+            return self._current(entry, time.monotonic()) if entry else 0.0
+
+    def top(self, count: int, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Hottest symbols with their current scores, hottest first"""
+        now = time.monotonic()
+        with self._lock:
+            scored = [(symbol, self._current(entry, now)) for symbol, entry in self._scores.items()]
+        return [item for item in heapq.nlargest(count, scored, key=lambda item: item[1]) if item[1] >= min_score]
+
+
+class HotSymbolPrefetcher:
+    """Keeps hot symbols and the peers of opened symbols in the financials cache"""
+
+    def __init__(self, counter: Optional[DecayedCounter] = None):
+        self.counter = counter or DecayedCounter()
+        self.scraper = ScreenerScraper()
+        self._peers = deque()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record_access(self, symbol: str, peers: Optional[list] = None):
+        """Count an opened symbol and queue its listed peers for prefetch"""
+        symbol = symbol.upper()
+        self.counter.touch(symbol)
+        for peer in peers or []:
+            peer_symbol = peer.get('symbol') if isinstance(peer, dict) else None
+            if not peer_symbol or peer_symbol == symbol:
+                continue
+            with self._lock:
+                if peer_symbol not in self._queued and len(self._peers) < PEER_QUEUE_MAX:
+                    self._queued.add(peer_symbol)
+                    self._peers.append(peer_symbol)
+
+    def _expires_soon(self, symbol: str) -> bool:
+        # L2, not this worker's L1 copy: another worker may have refreshed it already
+        cached = cache.get('financials', symbol, skip_l1=True)
+        return cached is None or cached.expires_at - now_ist() <= REFRESH_LEAD
+
+    def refresh_hot(self) -> int:
+        """Refresh hot symbols whose cache entry is about to expire; returns how many"""
+        refreshed = 0
+        for symbol, _ in self.counter.top(HOT_TOP_N, HOT_MIN_SCORE):
+            if self._expires_soon(symbol):
+                self.scraper.fetch_financial_data(symbol, force_refresh=True)
+                refreshed += 1
+        return refreshed
+
+    def prefetch_peers(self, limit: int = PEERS_PER_CYCLE) -> int:
+        """Fetch up to `limit` queued peers that are not already cached; returns how many"""
+        fetched = 0
+        while fetched < limit:
+            with self._lock:
+                if not self._peers:
+                    break
+                symbol = self._peers.popleft()
+                self._queued.discard(symbol)
+            cached = cache.get('financials', symbol, skip_l1=True)
+            if cached is None or now_ist() >= cached.expires_at:
+                self.scraper.fetch_financial_data(symbol, force_refresh=True)
+                fetched += 1
+        return fetched
+
+    def run_once(self) -> Dict:
+        # Batch lane: prefetching always yields to interactive requests
+        with batch_lane():
+            return {"refreshed": self.refresh_hot(), "peers": self.prefetch_peers()}
+
+    def start(self, interval: float = PREFETCH_INTERVAL_SECONDS) -> threading.Thread:
+        if self._thread is not None:
+            return self._thread
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Hot symbol prefetch failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name='hot-symbol-prefetcher', daemon=True)
+        self._thread.start()
+        return self._thread
+
+
+# Shared by the API process
+prefetcher = HotSymbolPrefetcher()
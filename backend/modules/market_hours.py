@@ -0,0 +1,49 @@
+"""
+Market Hours Module
+NSE trading session times (IST) used to decide how long market data stays valid.
+
+Prices only move while the market is open, so data fetched after the close
+stays current until the next session opens. Exchange holidays are not
+tracked; the worst case is one extra refresh on a holiday morning.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
+
+
+def now_ist() -> datetime:
+    return datetime.now(IST)
+
+
+def is_market_open(at: datetime = None) -> bool:
+    at = (at or now_ist()).astimezone(IST)
+    return at.weekday() < 5 and MARKET_OPEN <= at.time() < MARKET_CLOSE
+
+
+def next_market_open(at: datetime = None) -> datetime:
+    """Start of the next trading session strictly after `at`"""
+    at = (at or now_ist()).astimezone(IST)
+    day = at.date() if at.time() < MARKET_OPEN else at.date() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=IST)
+
+
+def session_date(at: datetime = None) -> date:
+    """Trading day data is served for: today during a session, else the next session's day"""
+    at = (at or now_ist()).astimezone(IST)
+    return at.date() if is_market_open(at) else next_market_open(at).date()
+
+
+def market_expiry(fetched_at: datetime, ttl: timedelta) -> datetime:
+    """
+    When data fetched at `fetched_at` goes stale: after `ttl` during a session,
+    `ttl` after the next session opens otherwise (as if fetched at the open, so
+    a fetch just before the open does not expire again right away).
+    """
+    if is_market_open(fetched_at):
+        return fetched_at + ttl
+    return next_market_open(fetched_at) + ttl
@@ -0,0 +1,152 @@
+"""
+Metrics Module
+Lightweight latency instrumentation: spans record into per-process
+histograms (exposed in Prometheus text format at /metrics) and, while a
+request is being served, into that request's Server-Timing header.
+
+Span kinds and the histogram they feed:
+- 'route':    http_request_duration_seconds{route, method, status}
+- 'upstream': upstream_call_duration_seconds{upstream}
+- 'stage':    stage_duration_seconds{stage}   (parsing, extraction, rules, JSON, ...)
+
+Usage:
+    with span('parse.html'):
+        soup = BeautifulSoup(...)
+
+    @timed('swot.rules')
+    def evaluate(...): ...
+
+Spans in pool threads reach the request's Server-Timing only if the work
+runs in a copy of the request's context (contextvars.copy_context().run);
+parallel spans of one name are summed, so they can exceed the total.
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds, seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+FAMILIES = {
+    'route': ('http_request_duration_seconds', ('route', 'method', 'status'), 'API request latency'),
+    'upstream': ('upstream_call_duration_seconds', ('upstream',), 'Upstream call latency (DNS, connect, download)'),
+    'stage': ('stage_duration_seconds', ('stage',), 'Latency of instrumented processing stages'),
+}
+
+_SERVER_TIMING_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]')
+
+# (name, seconds) spans recorded for the request being served; None outside requests
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('request_timings', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Latency histograms per (kind, labels)"""
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = {kind: {} for kind in FAMILIES}
+        self._lock = threading.Lock()
+
+    def observe(self, kind: str, labels: tuple, seconds: float):
+        with self._lock:
+            histogram = self._histograms[kind].get(labels)
+            if histogram is None:
+                histogram = self._histograms[kind][labels] = Histogram()
+            histogram.observe(seconds)
+
+    def render(self) -> str:
+        """All histograms in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, (name, label_names, help_text) in FAMILIES.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self._histograms[kind].items()):
+                    label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in zip(label_names, labels))
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(float(bound))
+                        lines.append(f'{name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{label_text}}} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{{{label_text}}} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Shared by the API process
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def span(name: str, kind: str = 'stage'):
+    """Time the block into the `kind` histogram and the current request's Server-Timing"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe(kind, (name,), elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def timed(name: str, kind: str = 'stage'):
+    """Decorator form of span()"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request_timings():
+    """Collect spans for the current request; returns a token for end_request_timings"""
+    return _timings.set([])
+
+
+def end_request_timings(token):
+    _timings.reset(token)
+
+
+def server_timing_header(total_seconds: Optional[float] = None) -> str:
+    """Server-Timing value for the spans recorded so far (repeated names are summed)"""
+    totals: Dict[str, List[float]] = {}
+    # Snapshot: spans may be appended from pool threads working for this request
+    for name, seconds in list(_timings.get() or ()):
+        entry = totals.setdefault(_SERVER_TIMING_NAME_RE.sub('-', name), [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = []
+    for name, (seconds, count) in totals.items():
+        part = f"{name};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="{count} calls"'
+        parts.append(part)
+    if total_seconds is not None:
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ', '.join(parts)
@@ -0,0 +1,104 @@
+"""
+Number Parser Module
+Single place that turns Indian market number strings into floats.
+
+Handles the formats seen across screener.in, NSE/BSE and yfinance:
+- currency and separators: "₹1,23,456.78", "1,234"
+- percentages: "23.5%" (value stays in percent units)
+- negatives: "-56", "−56", "(56)"
+- unit suffixes: "Cr", "Crore", "Lakh", "L Cr", "K", "M", "B", "T"
+
+Values are parsed once where data enters the app (scraper / fetch layer);
+downstream code works with floats only.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable
+import numpy as np
+
+# Longest suffixes first so "L Cr" wins over "L" and "Cr"
+UNIT_MULTIPLIERS = [
+    (re.compile(r'^(l\s*cr|lakh\s*crores?|lac\s*crores?)\b', re.IGNORECASE), 1e12),
+    (re.compile(r'^(cr|crores?)\b', re.IGNORECASE), 1e7),
+    (re.compile(r'^(lakhs?|lacs?|l)\b', re.IGNORECASE), 1e5),
+    (re.compile(r'^(tn|t|trillions?)\b', re.IGNORECASE), 1e12),
+    (re.compile(r'^(bn|b|billions?)\b', re.IGNORECASE), 1e9),
+    (re.compile(r'^(mn|m|millions?)\b', re.IGNORECASE), 1e6),
+    (re.compile(r'^(k|thousands?)\b', re.IGNORECASE), 1e3),
+]
+
+_NUMBER_RE = re.compile(r'-?(?:\d+(?:\.\d*)?|\.\d+)')
+_STRIP_CHARS = str.maketrans({',': None, '₹': None, '\xa0': ' ', '−': '-', '–': '-'})
+
+
+@lru_cache(maxsize=8192)
+def _parse_text(text: str, absolute: bool) -> float:
+    """Parse one string (cached - table cells repeat a lot)"""
+    cleaned = text.translate(_STRIP_CHARS).strip()
+    if not cleaned:
+        return float('nan')
+
+    negative = cleaned.startswith('(') and ')' in cleaned
+    match = _NUMBER_RE.search(cleaned)
+    if not match:
+        return float('nan')
+
+    value = float(match.group())
+    if negative:
+        value = -abs(value)
+
+    if absolute:
+        remainder = cleaned[match.end():].lstrip(' )%.')
+        for pattern, multiplier in UNIT_MULTIPLIERS:
+            if pattern.match(remainder):
+                value *= multiplier
+                break
+
+    return value
+
+
+def parse_number(value, absolute: bool = False) -> float:
+    """
+    Convert a number-like value to float, NaN if it holds no number.
+
+    Args:
+        value: str, int, float or None
+        absolute: scale unit suffixes to absolute rupees ("9,552 Cr" -> 9.552e10)
+    """
+    if value is None or isinstance(value, bool):
+        return float('nan')
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return _parse_text(str(value), absolute)
+
+
+def parse_numbers(values: Iterable, absolute: bool = False) -> np.ndarray:
+    """Batch version of parse_number returning a float64 array (NaN for missing)"""
+    values = list(values)
+    return np.fromiter((parse_number(v, absolute) for v in values), dtype=np.float64, count=len(values))
+
+
+def to_float(value, default: float = 0.0) -> float:
+    """parse_number with a default for missing values"""
+    result = parse_number(value)
+    return default if np.isnan(result) else result
+
+
+def format_market_cap(value) -> str:
+    """Format an absolute market cap in rupees for display"""
+    amount = parse_number(value, absolute=True)
+    if np.isnan(amount):
+        return str(value)
+    if amount >= 1e12:
+        return f"{amount / 1e12:.2f} T"
+    if amount >= 1e9:
+        return f"{amount / 1e9:.2f} B"
+    if amount >= 1e7:
+        return f"{amount / 1e7:.2f} Cr"
+    return f"{amount:,.0f}"
+
+
+def fraction_to_percent(value) -> float:
+    """Convert a fractional ratio (yfinance style, 0.29) to percent units (29.0); missing -> 0"""
+    return to_float(value) * 100
@@ -0,0 +1,177 @@
+"""
+Price Analytics Module
+Risk and liquidity figures computed locally from stored daily bars:
+
+- beta against NIFTY 50 (^NSEI)
+- annualized volatility of daily returns (percent)
+- latest and average daily volume
+- the true previous close
+
+Everything is computed for the whole universe at once on an aligned
+symbols x dates matrix, and stored in `price_analytics` so request paths
+read it with no network round trip. refresh() tops up the bars (only the
+missing days) and recomputes only symbols that received new bars.
+
+Usage:
+    python -m modules.price_analytics            # daily refresh of the screener universe
+    stats = price_analytics.get('TCS')           # {'beta': 0.62, 'volatility': 21.4, ...} or None
+"""
+
+import warnings
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+import numpy as np
+from .database import db_connection
+from .price_store import price_store
+from .metrics import timed
+from .market_hours import session_date
+
+BENCHMARK = '^NSEI'
+TRADING_DAYS = 252
+
+# Look-back used for beta and volatility, and for the average volume
+LOOKBACK_DAYS = 366
+AVG_VOLUME_DAYS = 63
+
+# Fewer overlapping daily returns than this and beta/volatility are left unset
+MIN_OBSERVATIONS = 60
+
+ANALYTICS_FIELDS = ('beta', 'volatility', 'volume', 'avg_volume', 'previous_close')
+
+
+def _last_valid(matrix: np.ndarray) -> np.ndarray:
+    """Last non-NaN value of every row (NaN for empty rows)"""
+    valid = ~np.isnan(matrix)
+    if matrix.shape[1] == 0:
+        return np.full(matrix.shape[0], np.nan)
+    last = matrix.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    values = matrix[np.arange(matrix.shape[0]), last]
+    return np.where(valid.any(axis=1), values, np.nan)
+
+
+def _last_dates(closes: np.ndarray, dates: list) -> list:
+    """Date of the newest close per row (None for rows with no bars)"""
+    valid = ~np.isnan(closes)
+    last = closes.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    return [dates[j] if valid[i].any() else None for i, j in enumerate(last)]
+
+
+@timed('analytics.compute')
+def compute(closes: np.ndarray, volumes: np.ndarray, benchmark: np.ndarray, dates: list) -> Dict[str, np.ndarray]:
+    """
+    Vectorized analytics for aligned bars.
+
+    Args:
+        closes, volumes: symbols x dates (NaN where a symbol has no bar)
+        benchmark: benchmark closes on the same date axis
+        dates: ISO dates of the columns, oldest first
+    """
+    # Symbols with no bars in the window are all-NaN rows; their stats are NaN, not warnings
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        returns = closes[:, 1:] / closes[:, :-1] - 1
+        market = benchmark[1:] / benchmark[:-1] - 1
+
+        # Only days where both the stock and the benchmark moved count towards beta
+        valid = ~np.isnan(returns) & ~np.isnan(market)
+        count = valid.sum(axis=1)
+        stock = np.where(valid, returns, 0.0)
+        bench = np.where(valid, market, 0.0)
+        stock_mean = stock.sum(axis=1) / count
+        bench_mean = bench.sum(axis=1) / count
+        stock_dev = np.where(valid, stock - stock_mean[:, None], 0.0)
+        bench_dev = np.where(valid, bench - bench_mean[:, None], 0.0)
+        covariance = (stock_dev * bench_dev).sum(axis=1) / (count - 1)
+        variance = (bench_dev ** 2).sum(axis=1) / (count - 1)
+        beta = covariance / variance
+
+        stock_valid = ~np.isnan(returns)
+        stock_count = stock_valid.sum(axis=1)
+        volatility = np.nanstd(np.where(stock_valid, returns, np.nan), axis=1, ddof=1) * np.sqrt(TRADING_DAYS) * 100
+
+        avg_volume = np.nanmean(volumes[:, -AVG_VOLUME_DAYS:], axis=1)
+
+    enough = count >= MIN_OBSERVATIONS
+    # Previous close = last close before the session being served: during a session today's
+    # bar is live and excluded; after the close it is the next session's previous close
+    session = session_date().isoformat()
+    before_session = np.array([d < session for d in dates], dtype=bool)
+    return {
+        'beta': np.where(enough, beta, np.nan),
+        'volatility': np.where(stock_count >= MIN_OBSERVATIONS, volatility, np.nan),
+        'volume': _last_valid(volumes),
+        'avg_volume': avg_volume,
+        'previous_close': _last_valid(closes[:, before_session]),
+    }
+
+
+class PriceAnalytics:
+    """Stored per-symbol analytics, recomputed in batches from price_store"""
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Dict]:
+        """Stored analytics keyed by symbol (missing values are None)"""
+        symbols = [s.upper() for s in symbols]
+        if not symbols:
+            return {}
+        with db_connection() as conn:
+            placeholders = ','.join('?' * len(symbols))
+            rows = conn.execute(
+                f"SELECT * FROM price_analytics WHERE symbol IN ({placeholders})", symbols
+            ).fetchall()
+            return {row['symbol']: dict(row) for row in rows}
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        return self.get_many([symbol]).get(symbol.upper())
+
+    def recompute(self, symbols: Iterable[str]) -> int:
+        """Recompute and store analytics for symbols from the bars already stored. Returns rows written."""
+        symbols = [s.upper() for s in symbols]
+        if not symbols:
+            return 0
+        dates, bars = price_store.load_matrix(symbols + [BENCHMARK], LOOKBACK_DAYS)
+        if not dates:
+            return 0
+        closes, volumes = bars['close'], bars['volume']
+        stats = compute(closes[:-1], volumes[:-1], closes[-1], dates)
+        as_of = _last_dates(closes[:-1], dates)
+
+        now = datetime.now().isoformat()
+        rows = []
+        for i, symbol in enumerate(symbols):
+            if as_of[i] is None:
+                continue
+            values = [None if np.isnan(stats[field][i]) else round(float(stats[field][i]), 4)
+                      for field in ANALYTICS_FIELDS]
+            rows.append((symbol, *values, as_of[i], now))
+
+        with db_connection() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO price_analytics
+                (symbol, beta, volatility, volume, avg_volume, previous_close, as_of, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        return len(rows)
+
+    def refresh(self, symbols: Iterable[str]) -> Dict[str, int]:
+        """
+        Daily incremental refresh: top up bars for the universe and the benchmark,
+        then recompute only symbols that received bars newer than their analytics.
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        bars_stored = price_store.refresh(symbols + [BENCHMARK])
+
+        last_bars = price_store.last_dates(symbols)
+        existing = self.get_many(symbols)
+        stale = [s for s in symbols if s in last_bars
+                 and (s not in existing or existing[s]['as_of'] < last_bars[s])]
+        return {"bars_stored": bars_stored, "recomputed": self.recompute(stale)}
+
+
+# Shared by every module in the process
+price_analytics = PriceAnalytics()
+
+
+if __name__ == '__main__':
+    from .stock_screener import StockScreener
+    result = price_analytics.refresh(StockScreener().get_indian_stocks_list())
+    print(f"Price analytics refreshed: {result['bars_stored']} bars stored, {result['recomputed']} symbols recomputed")
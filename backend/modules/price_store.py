@@ -0,0 +1,189 @@
+"""
+Price Store Module
+Local daily OHLCV bars per symbol (SQLite table `daily_bars`).
+
+Bars are fetched from yfinance once and then only topped up with the days
+that are missing, so repeat history lookups cost no network round trip.
+
+Usage:
+    bars = price_store.history('TCS')      # stored bars, fetched/topped up if stale
+    bars = price_store.load('TCS')         # stored bars only, never hits the network
+    price_store.refresh(symbols)            # batched daily top-up for a whole universe
+    bars['close'][-1], bars['volume'].mean()
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+import numpy as np
+import yfinance as yf
+from .database import db_connection
+from .circuit_breaker import guarded_call
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# Stored bars are considered current if the last one is at most this old (covers weekends/holidays)
+STALE_AFTER = timedelta(days=4)
+
+# Tickers per batched yfinance download
+DOWNLOAD_CHUNK = 50
+
+PERIOD_DAYS = {'1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '3y': 1096, '5y': 1827}
+
+
+def yahoo_symbol(symbol: str) -> str:
+    """NSE symbol as yfinance knows it ('^NSEI' and other index tickers are left alone)"""
+    return symbol if symbol.startswith('^') or '.' in symbol else f"{symbol}.NS"
+
+
+def frame_to_rows(frame) -> list:
+    """yfinance history DataFrame -> [(date, open, high, low, close, volume), ...]"""
+    if frame is None or frame.empty:
+        return []
+    dates = [d.strftime("%Y-%m-%d") for d in frame.index]
+    columns = [frame[field.capitalize()].to_numpy(dtype=np.float64) for field in BAR_FIELDS]
+    return [(d, *(float(col[i]) for col in columns)) for i, d in enumerate(dates)]
+
+
+class PriceStore:
+    """SQLite-backed daily bars with numpy reads"""
+
+    def __init__(self, stale_after: timedelta = STALE_AFTER):
+        self.stale_after = stale_after
+
+    def load(self, symbol: str, days: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Stored bars for a symbol, oldest first, as {'date': [...], 'close': array, ...}.
+        Returns None if nothing is stored.
+        """
+        with db_connection() as conn:
+            query = "SELECT date, open, high, low, close, volume FROM daily_bars WHERE symbol = ?"
+            params = [symbol.upper()]
+            if days:
+                query += " AND date >= ?"
+                params.append((date.today() - timedelta(days=days)).isoformat())
+            rows = conn.execute(query + " ORDER BY date", params).fetchall()
+        if not rows:
+            return None
+        bars = {'date': [row['date'] for row in rows]}
+        for field in BAR_FIELDS:
+            bars[field] = np.array([row[field] for row in rows], dtype=np.float64)
+        return bars
+
+    def load_matrix(self, symbols: Iterable[str], days: Optional[int] = None):
+        """
+        Stored bars for many symbols aligned on a common date axis (one query).
+        Returns (dates, {'close': 2D array symbols x dates, ...}) with NaN where a symbol has no bar.
+        """
+        symbols = [s.upper() for s in symbols]
+        with db_connection() as conn:
+            placeholders = ','.join('?' * len(symbols))
+            query = f"SELECT symbol, date, open, high, low, close, volume FROM daily_bars WHERE symbol IN ({placeholders})"
+            params = list(symbols)
+            if days:
+                query += " AND date >= ?"
+                params.append((date.today() - timedelta(days=days)).isoformat())
+            rows = conn.execute(query, params).fetchall() if symbols else []
+
+        dates = sorted({row['date'] for row in rows})
+        row_index = {symbol: i for i, symbol in enumerate(symbols)}
+        col_index = {d: j for j, d in enumerate(dates)}
+        matrix = {field: np.full((len(symbols), len(dates)), np.nan) for field in BAR_FIELDS}
+        if rows:
+            r = np.fromiter((row_index[row['symbol']] for row in rows), dtype=np.intp, count=len(rows))
+            c = np.fromiter((col_index[row['date']] for row in rows), dtype=np.intp, count=len(rows))
+            for field in BAR_FIELDS:
+                matrix[field][r, c] = np.array([row[field] for row in rows], dtype=np.float64)
+        return dates, matrix
+
+    def last_dates(self, symbols: Iterable[str]) -> Dict[str, str]:
+        """Date of the newest stored bar per symbol (symbols with no bars are left out)"""
+        symbols = [s.upper() for s in symbols]
+        if not symbols:
+            return {}
+        with db_connection() as conn:
+            placeholders = ','.join('?' * len(symbols))
+            rows = conn.execute(
+                f"SELECT symbol, MAX(date) AS last FROM daily_bars WHERE symbol IN ({placeholders}) GROUP BY symbol",
+                symbols
+            ).fetchall()
+            return {row['symbol']: row['last'] for row in rows}
+
+    def save(self, symbol: str, rows: list):
+        """Insert or replace bars given as (date, open, high, low, close, volume) tuples"""
+        if not rows:
+            return
+        with db_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO daily_bars (symbol, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(symbol.upper(), *row) for row in rows]
+            )
+
+    def is_current(self, last: Optional[str]) -> bool:
+        return bool(last) and date.today() - date.fromisoformat(last) <= self.stale_after
+
+    def history(self, symbol: str, period: str = '1y') -> Optional[Dict[str, np.ndarray]]:
+        """
+        Daily bars for the last `period`, served locally when the store is current.
+        Otherwise only the missing days are fetched from yfinance and stored first.
+        """
+        symbol = symbol.upper()
+        days = PERIOD_DAYS.get(period, 366)
+        last = self.last_dates([symbol]).get(symbol)
+        if not self.is_current(last):
+            try:
+                ticker = yf.Ticker(yahoo_symbol(symbol))
+                if last:
+                    start = (date.fromisoformat(last) + timedelta(days=1)).isoformat()
+                    frame = guarded_call('yfinance', ticker.history, start=start)
+                else:
+                    frame = guarded_call('yfinance', ticker.history, period=period)
+                self.save(symbol, frame_to_rows(frame))
+            except Exception as e:
+                print(f"Error fetching price history for {symbol}: {e}")
+        return self.load(symbol, days)
+
+    def refresh(self, symbols: Iterable[str], period: str = '1y') -> int:
+        """
+        Top up stored bars for a whole universe with batched yfinance downloads.
+        Symbols are grouped by the first missing day so a daily run is usually a
+        single download per DOWNLOAD_CHUNK tickers. Returns the number of bars stored.
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        last = self.last_dates(symbols)
+        today = date.today()
+
+        groups: Dict[Optional[str], list] = {}
+        for symbol in symbols:
+            if symbol not in last:
+                groups.setdefault(None, []).append(symbol)
+            elif date.fromisoformat(last[symbol]) < today:
+                start = (date.fromisoformat(last[symbol]) + timedelta(days=1)).isoformat()
+                groups.setdefault(start, []).append(symbol)
+
+        stored = 0
+        for start, group in groups.items():
+            for i in range(0, len(group), DOWNLOAD_CHUNK):
+                chunk = group[i:i + DOWNLOAD_CHUNK]
+                kwargs = {'start': start} if start else {'period': period}
+                try:
+                    frame = guarded_call('yfinance', yf.download, [yahoo_symbol(s) for s in chunk],
+                                         group_by='ticker', progress=False, **kwargs)
+                except Exception as e:
+                    print(f"Error downloading price history for {len(chunk)} symbols: {e}")
+                    continue
+                if frame is None or frame.empty:
+                    continue
+                multi = frame.columns.nlevels > 1
+                for symbol in chunk:
+                    ticker = yahoo_symbol(symbol)
+                    if multi and ticker not in frame.columns.get_level_values(0):
+                        continue
+                    bars = (frame[ticker] if multi else frame).dropna(subset=['Close'])
+                    rows = frame_to_rows(bars)
+                    self.save(symbol, rows)
+                    stored += len(rows)
+        return stored
+
+
+# Shared by every module in the process
+price_store = PriceStore()
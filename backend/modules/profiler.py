@@ -0,0 +1,207 @@
+"""
+Profiler Module
+On-demand statistical profiling of single API requests, for finding the
+pages that make ScreenerScraper or SWOTAnalyzer slow in production.
+
+An admin opts a request in with `?_profile=1` or an `X-Profile: 1` header;
+PROFILE_SAMPLE_RATE (0-1) controls what fraction of opted-in requests are
+actually profiled. A sampler thread snapshots the request thread's stack
+every PROFILE_INTERVAL_MS, so the request runs at close to full speed
+(unlike cProfile, which traces every call).
+
+Each profile is written to PROFILE_DIR as:
+- <name>.speedscope.json  open at https://www.speedscope.app
+- <name>.folded           collapsed stacks for flamegraph.pl / inferno
+- <name>.txt              summary: duration, top functions by self and total time
+
+Usage:
+    profile = RequestProfiler(threading.get_ident())
+    profile.start()
+    ...                       # serve the request
+    profile.stop()
+    profile.write('GET /api/swot/TCS', status=200)
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '1.0'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+
+# Opt-in flags; only honoured for admin sessions
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+
+# Profiles kept in PROFILE_DIR; the oldest are removed beyond this
+MAX_PROFILES = 200
+
+SUMMARY_TOP = 25
+
+_SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+# (qualified name, file, first line of the function)
+Frame = Tuple[str, str, int]
+
+
+def should_profile(rate: float = PROFILE_SAMPLE_RATE) -> bool:
+    return rate > 0 and random.random() < rate
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return (getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno)
+
+
+class RequestProfiler:
+    """Samples one thread's stack at a fixed interval until stopped"""
+
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        # Root-first stack -> [samples, seconds]
+        self.stacks: Dict[Tuple[Frame, ...], List] = {}
+        self.samples = 0
+        self.started = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - self.started
+
+    def _sample_loop(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            entry = self.stacks.setdefault(tuple(reversed(stack)), [0, 0.0])
+            entry[0] += 1
+            entry[1] += now - last
+            self.samples += 1
+            last = now
+
+    # Output
+
+    def speedscope(self, name: str) -> Dict:
+        frames: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, (_, seconds) in self.stacks.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(round(seconds, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "stock-analysis request profiler",
+            "shared": {"frames": [{"name": qualname, "file": filename, "line": line}
+                                  for qualname, filename, line in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def folded(self) -> str:
+        lines = []
+        for stack, (count, _) in self.stacks.items():
+            names = ';'.join(f"{qualname} ({os.path.basename(filename)}:{line})" for qualname, filename, line in stack)
+            lines.append(f"{names} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self, name: str, status: Optional[int] = None) -> str:
+        self_samples, total_samples = Counter(), Counter()
+        for stack, (count, _) in self.stacks.items():
+            self_samples[stack[-1]] += count
+            for frame in set(stack):
+                total_samples[frame] += count
+
+        def table(counter: Counter) -> List[str]:
+            rows = []
+            for (qualname, filename, line), count in counter.most_common(SUMMARY_TOP):
+                share = count / self.samples * 100 if self.samples else 0
+                rows.append(f"  {share:5.1f}%  {count:6d}  {qualname}  {filename}:{line}")
+            return rows
+
+        lines = [
+            f"Request:  {name}",
+            f"Status:   {status if status is not None else '-'}",
+            f"Duration: {self.duration * 1000:.1f} ms",
+            f"Samples:  {self.samples} every {self.interval * 1000:g} ms",
+            "",
+            "Top functions by self time (share, samples, function):",
+            *table(self_samples),
+            "",
+            "Top functions by total time (share, samples, function):",
+            *table(total_samples),
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, name: str, status: Optional[int] = None, directory: str = PROFILE_DIR) -> str:
+        """Write the speedscope, folded-stack and summary files; returns their common base name"""
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        base = f"{stamp}-{_SAFE_NAME_RE.sub('_', name).strip('_')[:80]}"
+        path = os.path.join(directory, base)
+        with open(path + '.speedscope.json', 'w') as f:
+            json.dump(self.speedscope(name), f)
+        with open(path + '.folded', 'w') as f:
+            f.write(self.folded())
+        with open(path + '.txt', 'w') as f:
+            f.write(self.summary(name, status))
+        _prune(directory)
+        return base
+
+
+def _prune(directory: str, keep: int = MAX_PROFILES):
+    summaries = sorted(name for name in os.listdir(directory) if name.endswith('.txt'))
+    for summary in summaries[:-keep] if len(summaries) > keep else []:
+        base = summary[:-len('.txt')]
+        for suffix in ('.txt', '.folded', '.speedscope.json'):
+            try:
+                os.remove(os.path.join(directory, base + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(directory: str = PROFILE_DIR, limit: int = 50) -> List[Dict]:
+    """Most recent profiles first, with the header of each summary"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for summary in sorted((n for n in os.listdir(directory) if n.endswith('.txt')), reverse=True)[:limit]:
+        with open(os.path.join(directory, summary)) as f:
+            header = dict(line.split(':', 1) for line in f.read().split('\n\n', 1)[0].splitlines() if ':' in line)
+        profiles.append({
+            "name": summary[:-len('.txt')],
+            **{key.strip().lower(): value.strip() for key, value in header.items()},
+        })
+    return profiles
@@ -0,0 +1,158 @@
+"""
+Rate Limiter Module
+Process-wide token buckets for upstream hosts (screener.in, yfinance).
+
+- One bucket per upstream, safe across threads.
+- Waiters are served in order: interactive requests first, then batch work
+  (stock screening, warm-ups), FIFO within each lane.
+- Set RATE_LIMIT_SHARED=1 to keep the token state in SQLite so all gunicorn
+  workers on the host draw from the same bucket.
+
+Usage:
+    limiter_for('screener.in').acquire()
+
+    with batch_lane():
+        ...  # every acquire() in this block queues behind interactive requests
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from .database import db_connection
+
+INTERACTIVE = 0
+BATCH = 1
+
+# (requests per second, burst capacity)
+UPSTREAM_LIMITS: Dict[str, Tuple[float, float]] = {
+    'screener.in': (float(os.getenv('SCREENER_RATE_LIMIT', '2')), 4),
+    'yfinance': (float(os.getenv('YFINANCE_RATE_LIMIT', '2')), 4),
+}
+DEFAULT_LIMIT = (1.0, 2)
+
+SHARED = os.getenv('RATE_LIMIT_SHARED', '0') == '1'
+
+_lane: ContextVar[int] = ContextVar('rate_limit_lane', default=INTERACTIVE)
+
+
+@contextmanager
+def batch_lane():
+    """Mark upstream calls made inside the block as low-priority batch work"""
+    token = _lane.set(BATCH)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    """Token bucket with a fair, two-lane wait queue"""
+
+    def __init__(self, name: str, rate: float, capacity: float, shared: bool = False):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.shared = shared
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def _refill(self, tokens: float, elapsed: float) -> float:
+        return min(self.capacity, tokens + max(0.0, elapsed) * self.rate)
+
+    def _take_local(self, penalty: float = 0.0) -> float:
+        now = time.monotonic()
+        self._tokens = self._refill(self._tokens, now - self._updated)
+        self._updated = now
+        if penalty:
+            self._tokens = min(self._tokens, -penalty * self.rate)
+            return 0.0
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _take_shared(self, penalty: float = 0.0) -> float:
+        with db_connection() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+            tokens = self._refill(row['tokens'], now - row['updated_at']) if row else float(self.capacity)
+            wait = 0.0
+            if penalty:
+                tokens = min(tokens, -penalty * self.rate)
+            elif tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            conn.execute("INSERT OR REPLACE INTO rate_limits (name, tokens, updated_at) VALUES (?, ?, ?)",
+                         (self.name, tokens, now))
+            return wait
+
+    def _try_take(self) -> float:
+        """Take a token if one is available; otherwise return seconds until the next one"""
+        return self._take_shared() if self.shared else self._take_local()
+
+    def try_acquire(self) -> float:
+        """Take a token without waiting; returns 0, or the seconds until one is available"""
+        with self._cond:
+            return self._try_take()
+
+    def acquire(self, lane: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a token is available. Returns False if `timeout` seconds pass first.
+        `lane` defaults to the caller's context (see batch_lane).
+        """
+        ticket = (_lane.get() if lane is None else lane, next(self._seq))
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._waiters[0] == ticket:
+                        wait = self._try_take()
+                        if wait == 0:
+                            return True
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def penalize(self, seconds: float):
+        """Stop handing out tokens for `seconds` (e.g. after an upstream 429)"""
+        with self._cond:
+            if self.shared:
+                self._take_shared(penalty=seconds)
+            else:
+                self._take_local(penalty=seconds)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def limiter_for(upstream: str) -> TokenBucket:
+    """Shared bucket for an upstream ('screener.in', 'yfinance', ...)"""
+    with _buckets_lock:
+        bucket = _buckets.get(upstream)
+        if bucket is None:
+            rate, capacity = UPSTREAM_LIMITS.get(upstream, DEFAULT_LIMIT)
+            bucket = TokenBucket(upstream, rate, capacity, shared=SHARED)
+            _buckets[upstream] = bucket
+        return bucket
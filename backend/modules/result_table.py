@@ -0,0 +1,121 @@
+"""
+Result Table Module
+Compact numeric form of the screener.in quarterly / annual result tables.
+
+screener.in lays these tables out with one row per metric (Sales, Net Profit,
+OPM %, ...) and one column per period (Mar 2023, Jun 2023, ...), oldest period
+first. The scraper parses every cell exactly once into a float matrix so the
+analyzers never touch strings again; blank or non-numeric cells become NaN.
+"""
+
+from typing import Dict, List, Optional
+import numpy as np
+from .number_parser import parse_numbers
+
+
+def _clean_label(label: str) -> str:
+    """Strip the expand marker ("Sales +") and stray whitespace from a metric label"""
+    return label.replace('\xa0', ' ').rstrip('+').strip()
+
+
+def _unit_for(label: str, default_unit: str) -> str:
+    """Infer the unit of a metric row from its label"""
+    lower = label.lower()
+    if '%' in label:
+        return '%'
+    if lower.startswith('eps') or 'in rs' in lower:
+        return 'Rs'
+    return default_unit
+
+
+class ResultTable:
+    """Metric x period float matrix with labels and units"""
+
+    def __init__(self, periods: List[str], metrics: List[str], units: List[str], values: np.ndarray):
+        self.periods = periods
+        self.metrics = metrics
+        self.units = units
+        self.values = values
+
+    @classmethod
+    def from_cells(cls, headers: List[str], rows: List[List[str]], default_unit: str = 'Cr') -> Optional['ResultTable']:
+        """Build a table from raw header cells and row cells (first cell of each row is the metric label)"""
+        periods = [h.strip() for h in headers[1:]]
+        if not periods:
+            return None
+
+        metrics = []
+        units = []
+        matrix = []
+        for cells in rows:
+            if not cells:
+                continue
+            label = _clean_label(cells[0])
+            parsed = np.full(len(periods), np.nan)
+            row_values = parse_numbers(cells[1:len(periods) + 1])
+            parsed[:len(row_values)] = row_values
+            # Rows with no numbers at all (e.g. "Raw PDF" links) carry no data
+            if not label or np.isnan(parsed).all():
+                continue
+            metrics.append(label)
+            units.append(_unit_for(label, default_unit))
+            matrix.append(parsed)
+
+        if not metrics:
+            return None
+
+        return cls(periods, metrics, units, np.array(matrix, dtype=np.float64))
+
+    def row(self, *names: str) -> Optional[np.ndarray]:
+        """Return the value row of the first metric whose label contains any of the given names"""
+        names = [n.lower() for n in names]
+        for idx, metric in enumerate(self.metrics):
+            lower = metric.lower()
+            if any(n in lower for n in names):
+                return self.values[idx]
+        return None
+
+    @staticmethod
+    def recent(values: Optional[np.ndarray], count: int) -> np.ndarray:
+        """Last `count` non-missing values of a row, oldest first"""
+        if values is None:
+            return np.empty(0, dtype=np.float64)
+        finite = values[~np.isnan(values)]
+        return finite[-count:]
+
+    def to_dict(self) -> Dict:
+        """Compact JSON-serializable form (NaN stored as None)"""
+        return {
+            "periods": self.periods,
+            "metrics": self.metrics,
+            "units": self.units,
+            "values": [[None if np.isnan(v) else float(v) for v in row] for row in self.values]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional['ResultTable']:
+        """Inverse of to_dict"""
+        if not data:
+            return None
+        values = np.array([[np.nan if v is None else v for v in row] for row in data['values']], dtype=np.float64)
+        return cls(list(data['periods']), list(data['metrics']), list(data['units']), values)
+
+    def to_display(self) -> Dict:
+        """Headers/rows of formatted strings, as rendered by the frontend"""
+        rows = []
+        for metric, unit, values in zip(self.metrics, self.units, self.values):
+            cells = [metric]
+            for value in values:
+                if np.isnan(value):
+                    cells.append('')
+                elif unit == '%':
+                    cells.append(f"{value:.0f}%")
+                elif float(value).is_integer():
+                    cells.append(f"{value:,.0f}")
+                else:
+                    cells.append(f"{value:,.2f}")
+            rows.append(cells)
+        return {
+            "headers": [''] + self.periods,
+            "rows": rows
+        }
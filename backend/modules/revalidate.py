@@ -0,0 +1,71 @@
+"""
+Revalidate Module
+Stale-while-revalidate support shared by the financials cache, the history
+cache and the SWOT store.
+
+An entry past its expiry but inside the grace window is served as is while a
+single background refresh replaces it; past the grace window (or older than
+the hard max staleness) callers fetch synchronously.
+
+Usage:
+    state = freshness(fetched_at, expires_at, now, grace, max_staleness)
+    if state == STALE:
+        revalidator.submit(('financials', symbol), refresh, symbol)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Hashable
+
+FRESH = 'fresh'
+STALE = 'stale'
+EXPIRED = 'expired'
+
+REVALIDATE_WORKERS = 4
+
+
+def freshness(fetched_at: datetime, expires_at: datetime, now: datetime,
+              grace: timedelta, max_staleness: timedelta) -> str:
+    """FRESH before expiry, STALE within the grace window, EXPIRED after it or past max_staleness"""
+    if now < expires_at:
+        return FRESH
+    if now - expires_at < grace and now - fetched_at < max_staleness:
+        return STALE
+    return EXPIRED
+
+
+class Revalidator:
+    """Runs background refreshes, at most one in flight per key"""
+
+    def __init__(self, max_workers: int = REVALIDATE_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='revalidate')
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, func: Callable, *args, **kwargs) -> bool:
+        """Schedule func(*args, **kwargs) unless a refresh for `key` is already running"""
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+
+        def run():
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Background refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(key)
+
+        self._executor.submit(run)
+        return True
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._in_flight
+
+
+# Shared by every cache in the process
+revalidator = Revalidator()
@@ -1,8 +1,33 @@
 import requests
 from bs4 import BeautifulSoup
-import re
 from typing import Dict, Optional
 from datetime import datetime, timedelta
+import re
+import numpy as np
+from .result_table import ResultTable
+from .number_parser import parse_number, parse_numbers, to_float
+from .symbol_resolver import resolver, UNKNOWN
+from .rate_limiter import limiter_for
+from .circuit_breaker import guarded_call, CircuitOpenError
+from .market_hours import now_ist, market_expiry
+from .tiered_cache import cache
+from .revalidate import revalidator, freshness, FRESH, STALE
+from .deadline import budget_allows, DeadlineExceeded
+from .metrics import span
+
+# Parsed company pages stay fresh this long during market hours, and until the next open otherwise
+FINANCIALS_TTL = timedelta(minutes=15)
+# Past expiry, entries are served while refreshing in the background for this long,
+# unless they are older than FINANCIALS_MAX_STALENESS (covers a weekend)
+FINANCIALS_GRACE = timedelta(hours=1)
+FINANCIALS_MAX_STALENESS = timedelta(days=3)
+
+_COMPANY_PATH_RE = re.compile(r'^/company/([^/]+)/')
+
+# Statuses that mean the page is gone, so the symbol is resolved again; anything else
+# (429, 5xx) is throttling or an outage and goes to the breaker / stale path instead
+RERESOLVE_STATUSES = (404, 410)
+
 
 class ScreenerScraper:
     """Scraper to fetch stock financial data from screener.in"""
@@ -12,43 +37,131 @@ class ScreenerScraper:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.resolver = resolver
+    
+    def _get(self, url: str) -> requests.Response:
+        """GET a screener.in page through the screener.in circuit breaker and rate limit"""
+        response = guarded_call('screener.in', requests.get, url, headers=self.headers, with_timeout=True,
+                                failed=lambda r: r.status_code >= 500 or r.status_code == 429)
+        if response.status_code == 429:
+            limiter_for('screener.in').penalize(to_float(response.headers.get('Retry-After'), default=5))
+        return response
+    
+    def _search_company_url(self, symbol: str) -> Optional[str]:
+        """Search for stock and return company URL (raises on network errors)"""
+        search_url = f"{self.base_url}/search/?q={symbol}"
+        response = self._get(search_url)
+        response.raise_for_status()
+        
+        soup = BeautifulSoup(response.content, 'html.parser')
+        
+        # Find first result link
+        results = soup.find_all('a', class_='company-card', href=True)
+        if results:
+            company_path = results[0]['href']
+            return f"{self.base_url}{company_path}"
+        return None
     
     def search_stock(self, symbol: str) -> Optional[str]:
         """Search for stock and return company URL"""
         try:
-            search_url = f"{self.base_url}/search/?q={symbol}"
-            response = requests.get(search_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find first result link
-            results = soup.find_all('a', class_='company-card', href=True)
-            if results:
-                company_path = results[0]['href']
-                return f"{self.base_url}{company_path}"
-            return None
+            return self._search_company_url(symbol)
         except Exception as e:
             print(f"Error searching for {symbol}: {e}")
             return None
     
-    def fetch_financial_data(self, symbol: str) -> Optional[Dict]:
-        """Fetch all financial metrics from screener.in"""
+    def _fetch_company_page(self, symbol: str) -> Optional[requests.Response]:
+        """
+        Fetch the company page for a symbol via the resolution cache.
+        Tries the cached URL, then /company/<SYMBOL>/, then search; returns None
+        for symbols screener.in does not know (negatively cached).
+        """
+        symbol = symbol.upper()
+        cached_url = self.resolver.lookup(symbol)
+        if cached_url is UNKNOWN:
+            return None
+        
+        if cached_url:
+            response = self._get(cached_url)
+            if response.status_code == 200:
+                return response
+            self._raise_unless_gone(response)
+            # Symbol renamed or page moved - resolve again
+            self.resolver.invalidate(symbol)
+        
+        # Try direct company URL first
+        company_url = f"{self.base_url}/company/{symbol}/"
+        response = self._get(company_url)
+        if response.status_code == 200:
+            self.resolver.record(symbol, company_url, 'standalone')
+            return response
+        self._raise_unless_gone(response)
+        direct_status = response.status_code
+        
+        # Search + refetch needs two more round trips; not worth starting on a nearly spent budget
+        if not budget_allows(2):
+            raise DeadlineExceeded(f"no budget left to search screener.in for {symbol}")
+        
+        # If direct access fails, try search
+        company_url = self._search_company_url(symbol)
+        if not company_url:
+            # Only a definite "not found" is cached; throttling or outages are retried next time
+            if direct_status == 404:
+                self.resolver.record_missing(symbol)
+            return None
+        
+        response = self._get(company_url)
+        response.raise_for_status()
+        variant = 'consolidated' if '/consolidated' in company_url else 'search'
+        self.resolver.record(symbol, company_url, variant)
+        return response
+    
+    @staticmethod
+    def _raise_unless_gone(response: requests.Response):
+        """Raise for a failed page fetch that more requests to screener.in would not fix"""
+        if response.status_code not in RERESOLVE_STATUSES:
+            response.raise_for_status()
+            raise requests.HTTPError(f"Unexpected status {response.status_code} from screener.in", response=response)
+    
+    def fetch_financial_data(self, symbol: str, force_refresh: bool = False) -> Optional[Dict]:
+        """Fetch all financial metrics from screener.in (served from the 'financials' cache while fresh)"""
+        cached = cache.get('financials', symbol.upper())
+        if cached and not force_refresh:
+            data, fetched_at, expires_at = cached
+            now = now_ist()
+            state = freshness(fetched_at, expires_at, now, FINANCIALS_GRACE, FINANCIALS_MAX_STALENESS)
+            if state == FRESH:
+                return dict(data, age_seconds=int((now - fetched_at).total_seconds()))
+            if state == STALE:
+                revalidator.submit(('financials', symbol.upper()), self.fetch_financial_data, symbol, force_refresh=True)
+                return dict(data, stale=True, age_seconds=int((now - fetched_at).total_seconds()))
         try:
-            # Try direct company URL first
-            company_url = f"{self.base_url}/company/{symbol.upper()}/"
-            response = requests.get(company_url, headers=self.headers, timeout=10)
-            
-            # If direct access fails, try search
-            if response.status_code != 200:
-                company_url = self.search_stock(symbol)
-                if not company_url:
-                    return None
-                response = requests.get(company_url, headers=self.headers, timeout=10)
+            response = self._fetch_company_page(symbol)
+            if response is None:
+                return None
             
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            data = self.parse_company_page(symbol, response.content)
             
+            fetched_at = now_ist()
+            cache.set('financials', symbol.upper(), data,
+                      expires_at=market_expiry(fetched_at, FINANCIALS_TTL), fetched_at=fetched_at)
+            return dict(data, age_seconds=0)
+        except (CircuitOpenError, DeadlineExceeded, requests.RequestException) as e:
+            # screener.in is degraded, throttling or the request is out of time - serve the last good copy if we have one
+            print(f"Skipping screener.in for {symbol}: {e}")
+            if not cached:
+                return None
+            return dict(cached.value, stale=True, age_seconds=int((now_ist() - cached.fetched_at).total_seconds()))
+        except Exception as e:
+            print(f"Error fetching data for {symbol} from screener.in: {e}")
+            return None
+    
+    def parse_company_page(self, symbol: str, content) -> Dict:
+        """Parse a screener.in company page (HTML bytes or text) into the financials dict"""
+        with span('parse.html'):
+            soup = BeautifulSoup(content, 'html.parser')
+        
+        with span('parse.extract'):
             data = {
                 'symbol': symbol.upper(),
                 'name': self._extract_company_name(soup),
@@ -69,11 +182,10 @@ class ScreenerScraper:
                 'profit_margin': self._extract_profit_margin(soup),
                 'annual_results': self._extract_annual_results(soup)
             }
-            
-            return data
-        except Exception as e:
-            print(f"Error fetching data for {symbol} from screener.in: {e}")
-            return None
+            # Absolute rupee value alongside the display text, parsed once here
+            data['market_cap_value'] = to_float(parse_number(data['market_cap'], absolute=True))
+        
+        return data
     
     def _extract_company_name(self, soup):
         """Extract company name"""
@@ -96,159 +208,75 @@ class ScreenerScraper:
             pass
         return "Unknown"
     
+    def _find_stat(self, soup, *keywords) -> Optional[str]:
+        """Return the value text of the first top-ratio entry whose label contains all keywords"""
+        for stat in soup.find_all('li', class_='flex flex-space-between'):
+            label = stat.find('span', class_='name')
+            if label and all(k in label.get_text() for k in keywords):
+                value_span = stat.find('span', class_='value')
+                if value_span:
+                    return value_span.get_text(strip=True)
+        return None
+    
+    def _stat_number(self, soup, *keywords) -> float:
+        """Parse a top-ratio entry into a float (0 if missing)"""
+        try:
+            return to_float(self._find_stat(soup, *keywords))
+        except Exception:
+            return 0
+    
     def _extract_price(self, soup):
         """Extract current price"""
-        try:
-            # Look in stats section
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'Current Price' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        price_text = value_span.get_text(strip=True)
-                        # Extract number (could be "₹493" or "493")
-                        # Remove currency symbols and commas
-                        cleaned = price_text.replace('₹', '').replace(',', '').strip()
-                        match = re.search(r'[\d]+\.?\d*', cleaned)
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'Current Price')
     
     def _extract_market_cap(self, soup):
-        """Extract market cap"""
+        """Extract market cap display text (e.g. "₹9,552 Cr.")"""
         try:
-            # Find market cap in stats
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'Market Cap' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        return value_span.get_text(strip=True)
-        except:
-            pass
-        return "0"
+            return self._find_stat(soup, 'Market Cap') or "0"
+        except Exception:
+            return "0"
     
     def _extract_pe(self, soup):
         """Extract P/E ratio"""
-        try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'Stock P/E' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        pe_text = value_span.get_text(strip=True)
-                        match = re.search(r'[\d,]+\.?\d*', pe_text.replace(',', ''))
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'Stock P/E')
     
     def _extract_book_value(self, soup):
         """Extract book value"""
-        try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'Book Value' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        bv_text = value_span.get_text(strip=True)
-                        match = re.search(r'[\d,]+\.?\d*', bv_text.replace(',', ''))
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'Book Value')
     
     def _extract_roe(self, soup):
         """Extract ROE"""
-        try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'ROE' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        roe_text = value_span.get_text(strip=True)
-                        match = re.search(r'[\d,]+\.?\d*', roe_text.replace(',', ''))
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'ROE')
     
     def _extract_roce(self, soup):
         """Extract ROCE"""
-        try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'ROCE' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        roce_text = value_span.get_text(strip=True)
-                        match = re.search(r'[\d,]+\.?\d*', roce_text.replace(',', ''))
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'ROCE')
     
     def _extract_52w_high(self, soup):
         """Extract 52 week high"""
         try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'High / Low' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        hl_text = value_span.get_text(strip=True)
-                        # Format: "123 / 456"
-                        parts = hl_text.split('/')
-                        if len(parts) >= 1:
-                            high = parts[0].strip()
-                            match = re.search(r'[\d,]+\.?\d*', high.replace(',', ''))
-                            if match:
-                                return float(match.group())
-        except:
+            # Format: "123 / 456"
+            parts = (self._find_stat(soup, 'High / Low') or '').split('/')
+            if len(parts) > 0:
+                return to_float(parts[0])
+        except Exception:
             pass
         return 0
     
     def _extract_52w_low(self, soup):
         """Extract 52 week low"""
         try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'High / Low' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        hl_text = value_span.get_text(strip=True)
-                        # Format: "123 / 456"
-                        parts = hl_text.split('/')
-                        if len(parts) >= 2:
-                            low = parts[1].strip()
-                            match = re.search(r'[\d,]+\.?\d*', low.replace(',', ''))
-                            if match:
-                                return float(match.group())
-        except:
+            # Format: "123 / 456"
+            parts = (self._find_stat(soup, 'High / Low') or '').split('/')
+            if len(parts) > 1:
+                return to_float(parts[1])
+        except Exception:
             pass
         return 0
     
     def _extract_dividend_yield(self, soup):
         """Extract dividend yield"""
-        try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'Dividend Yield' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        div_text = value_span.get_text(strip=True).replace('%', '')
-                        match = re.search(r'[\d,]+\.?\d*', div_text.replace(',', ''))
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'Dividend Yield')
     
     def _extract_sector(self, soup):
         """Extract sector - look for common Indian market sectors"""
@@ -365,6 +393,13 @@ class ScreenerScraper:
                             
                             # Extract data using mapped indices
                             name = cells[name_idx].get_text(strip=True) if len(cells) > name_idx else ""
+                            # Peer links point at /company/<SYMBOL>/...: keep the symbol and remember the URL
+                            link = cells[name_idx].find('a', href=True) if len(cells) > name_idx else None
+                            match = _COMPANY_PATH_RE.match(link['href']) if link else None
+                            peer_symbol = match.group(1).upper() if match else None
+                            if peer_symbol and self.resolver.lookup(peer_symbol) is None:
+                                self.resolver.record(peer_symbol, f"{self.base_url}{link['href']}",
+                                                     'consolidated' if '/consolidated' in link['href'] else 'standalone')
                             cmp_text = cells[cmp_idx].get_text(strip=True) if len(cells) > cmp_idx else "0"
                             pe_text = cells[pe_idx].get_text(strip=True) if len(cells) > pe_idx else "0"
                             mar_cap_text = cells[mar_cap_idx].get_text(strip=True) if len(cells) > mar_cap_idx else "0"
@@ -372,32 +407,15 @@ class ScreenerScraper:
                             roe_text = cells[roe_idx].get_text(strip=True) if len(cells) > roe_idx else "0"
                             roce_text = cells[roce_idx].get_text(strip=True) if len(cells) > roce_idx else "0"
                             
-                            # Parse CMP
-                            cmp = re.search(r'[\d,]+\.?\d*', cmp_text.replace(',', '').replace('₹', ''))
-                            cmp_value = float(cmp.group()) if cmp else 0
-                            
-                            # Parse P/E
-                            pe = re.search(r'[\d,]+\.?\d*', pe_text.replace(',', ''))
-                            pe_value = float(pe.group()) if pe else 0
-                            
-                            # Market Cap is already in text format (e.g., "50,000 Cr")
+                            # Parse numeric columns in one pass; market cap stays as display text
+                            cmp_value, pe_value, div_yld_value, roe_value, roce_value = np.nan_to_num(
+                                parse_numbers([cmp_text, pe_text, div_yld_text, roe_text, roce_text])).tolist()
                             mar_cap = mar_cap_text
                             
-                            # Parse Dividend Yield
-                            div_yld = re.search(r'[\d,]+\.?\d*', div_yld_text.replace(',', '').replace('%', ''))
-                            div_yld_value = float(div_yld.group()) if div_yld else 0
-                            
-                            # Parse ROE
-                            roe = re.search(r'[\d,]+\.?\d*', roe_text.replace(',', '').replace('%', ''))
-                            roe_value = float(roe.group()) if roe else 0
-                            
-                            # Parse ROCE
-                            roce = re.search(r'[\d,]+\.?\d*', roce_text.replace(',', '').replace('%', ''))
-                            roce_value = float(roce.group()) if roce else 0
-                            
                             peers.append({
                                 "sno": idx,
                                 "name": name,
+                                "symbol": peer_symbol,
                                 "cmp": round(cmp_value, 2),
                                 "pe": round(pe_value, 2) if pe_value > 0 else None,
                                 "mar_cap": mar_cap,
@@ -414,8 +432,39 @@ class ScreenerScraper:
             print(f"Error extracting peer comparison: {e}")
             return []
     
+    def _parse_result_table(self, table) -> Optional[ResultTable]:
+        """Parse a results table into a numeric ResultTable (metric rows x period columns)"""
+        # Extract headers
+        headers = []
+        thead = table.find('thead')
+        if thead:
+            header_row = thead.find('tr')
+            if header_row:
+                headers = [th.get_text(strip=True) for th in header_row.find_all(['th', 'td'])]
+        
+        if not headers:
+            # Try to find headers in first row if no thead
+            first_row = table.find('tr')
+            if first_row:
+                headers = [th.get_text(strip=True) for th in first_row.find_all(['th', 'td'])]
+        
+        # Extract rows
+        rows = []
+        tbody = table.find('tbody')
+        table_rows = tbody.find_all('tr') if tbody else table.find_all('tr')[1:]  # Skip header row
+        
+        for tr in table_rows:
+            cells = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
+            if cells:
+                rows.append(cells)
+        
+        if headers and rows:
+            return ResultTable.from_cells(headers, rows)
+        
+        return None
+    
     def _extract_quarterly_results(self, soup):
-        """Extract quarterly results table from screener.in with headers and rows"""
+        """Extract quarterly results table from screener.in as a numeric ResultTable"""
         try:
             # Find h2 with "Quarterly" or "Results" text
             quarterly_h2 = None
@@ -442,37 +491,7 @@ class ScreenerScraper:
             if not quarterly_table:
                 return None
             
-            # Extract headers
-            headers = []
-            thead = quarterly_table.find('thead')
-            if thead:
-                header_row = thead.find('tr')
-                if header_row:
-                    headers = [th.get_text(strip=True) for th in header_row.find_all(['th', 'td'])]
-            
-            if not headers:
-                # Try to find headers in first row if no thead
-                first_row = quarterly_table.find('tr')
-                if first_row:
-                    headers = [th.get_text(strip=True) for th in first_row.find_all(['th', 'td'])]
-            
-            # Extract rows
-            rows = []
-            tbody = quarterly_table.find('tbody')
-            table_rows = tbody.find_all('tr') if tbody else quarterly_table.find_all('tr')[1:]  # Skip header row
-            
-            for tr in table_rows:
-                cells = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
-                if cells and len(cells) > 0:
-                    rows.append(cells)
-            
-            if headers and rows:
-                return {
-                    "headers": headers,
-                    "rows": rows
-                }
-            
-            return None
+            return self._parse_result_table(quarterly_table)
         except Exception as e:
             print(f"Error extracting quarterly results: {e}")
             return None
@@ -480,19 +499,12 @@ class ScreenerScraper:
     def fetch_bulk_deals(self, symbol: str, days: int = 30) -> Optional[list]:
         """Fetch bulk deals data for the last N days from screener.in"""
         try:
-            # Try direct company URL first
-            company_url = f"{self.base_url}/company/{symbol.upper()}/"
-            response = requests.get(company_url, headers=self.headers, timeout=10)
-            
-            # If direct access fails, try search
-            if response.status_code != 200:
-                company_url = self.search_stock(symbol)
-                if not company_url:
-                    return []
-                response = requests.get(company_url, headers=self.headers, timeout=10)
+            response = self._fetch_company_page(symbol)
+            if response is None:
+                return []
             
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            with span('parse.html'):
+                soup = BeautifulSoup(response.content, 'html.parser')
             
             bulk_deals = []
             
@@ -517,7 +529,7 @@ class ScreenerScraper:
                             bulk_url = f"{self.base_url}/{bulk_url}"
                         
                         try:
-                            bulk_response = requests.get(bulk_url, headers=self.headers, timeout=10)
+                            bulk_response = self._get(bulk_url)
                             if bulk_response.status_code == 200:
                                 soup = BeautifulSoup(bulk_response.content, 'html.parser')
                                 bulk_section = soup.find('h2') or soup.find('h3')
@@ -636,26 +648,23 @@ class ScreenerScraper:
                     # Extract quantity
                     qty_idx = column_map.get('quantity', 3)
                     if len(cells) > qty_idx:
-                        qty_text = cells[qty_idx].get_text(strip=True).replace(',', '')
-                        qty_match = re.search(r'[\d]+', qty_text)
-                        if qty_match:
-                            deal['quantity'] = int(qty_match.group())
+                        quantity = parse_number(cells[qty_idx].get_text(strip=True))
+                        if not np.isnan(quantity):
+                            deal['quantity'] = int(quantity)
                     
                     # Extract price
                     price_idx = column_map.get('price', 4)
                     if len(cells) > price_idx:
-                        price_text = cells[price_idx].get_text(strip=True).replace(',', '').replace('₹', '')
-                        price_match = re.search(r'[\d]+\.?\d*', price_text)
-                        if price_match:
-                            deal['price'] = round(float(price_match.group()), 2)
+                        price = parse_number(cells[price_idx].get_text(strip=True))
+                        if not np.isnan(price):
+                            deal['price'] = round(price, 2)
                     
                     # Extract value
                     value_idx = column_map.get('value', 5)
                     if len(cells) > value_idx:
-                        value_text = cells[value_idx].get_text(strip=True).replace(',', '').replace('₹', '')
-                        value_match = re.search(r'[\d]+\.?\d*', value_text)
-                        if value_match:
-                            deal['value'] = round(float(value_match.group()), 2)
+                        value = parse_number(cells[value_idx].get_text(strip=True))
+                        if not np.isnan(value):
+                            deal['value'] = round(value, 2)
                     
                     if deal:
                         bulk_deals.append(deal)
@@ -676,54 +685,18 @@ class ScreenerScraper:
     
     def _extract_peg(self, soup):
         """Extract PEG ratio"""
-        try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and 'PEG' in label.get_text():
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        peg_text = value_span.get_text(strip=True)
-                        match = re.search(r'[\d,]+\.?\d*', peg_text.replace(',', ''))
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'PEG')
     
     def _extract_debt_to_equity(self, soup):
         """Extract Debt to Equity ratio"""
-        try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and ('Debt' in label.get_text() and 'Equity' in label.get_text()):
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        debt_text = value_span.get_text(strip=True)
-                        match = re.search(r'[\d,]+\.?\d*', debt_text.replace(',', ''))
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'Debt', 'Equity')
     
     def _extract_profit_margin(self, soup):
         """Extract Profit Margin"""
-        try:
-            for stat in soup.find_all('li', class_='flex flex-space-between'):
-                label = stat.find('span', class_='name')
-                if label and ('Profit' in label.get_text() and 'Margin' in label.get_text()):
-                    value_span = stat.find('span', class_='value')
-                    if value_span:
-                        margin_text = value_span.get_text(strip=True).replace('%', '')
-                        match = re.search(r'[\d,]+\.?\d*', margin_text.replace(',', ''))
-                        if match:
-                            return float(match.group())
-        except:
-            pass
-        return 0
+        return self._stat_number(soup, 'Profit', 'Margin')
     
     def _extract_annual_results(self, soup):
-        """Extract annual results table for historical debt analysis"""
+        """Extract annual results table (numeric ResultTable) for historical debt analysis"""
         try:
             # Find h2 with "Annual" or "Yearly" text
             annual_h2 = None
@@ -750,36 +723,7 @@ class ScreenerScraper:
             if not annual_table:
                 return None
             
-            # Extract headers
-            headers = []
-            thead = annual_table.find('thead')
-            if thead:
-                header_row = thead.find('tr')
-                if header_row:
-                    headers = [th.get_text(strip=True) for th in header_row.find_all(['th', 'td'])]
-            
-            if not headers:
-                first_row = annual_table.find('tr')
-                if first_row:
-                    headers = [th.get_text(strip=True) for th in first_row.find_all(['th', 'td'])]
-            
-            # Extract rows
-            rows = []
-            tbody = annual_table.find('tbody')
-            table_rows = tbody.find_all('tr') if tbody else annual_table.find_all('tr')[1:]
-            
-            for tr in table_rows:
-                cells = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
-                if cells and len(cells) > 0:
-                    rows.append(cells)
-            
-            if headers and rows:
-                return {
-                    "headers": headers,
-                    "rows": rows
-                }
-            
-            return None
+            return self._parse_result_table(annual_table)
         except Exception as e:
             print(f"Error extracting annual results: {e}")
             return None
@@ -7,12 +7,20 @@ Filters Indian stocks based on:
 - Recent performance improvements (sales, profits, margins, deals, capacity expansion)
 """
 
-import re
 from typing import Dict, List, Optional
 from datetime import datetime
 from .screener_scraper import ScreenerScraper
+from .result_table import ResultTable
+from .rate_limiter import batch_lane
+from .circuit_breaker import guarded_call
+from .deadline import budget_allows
+import numpy as np
 import yfinance as yf
 
+# A symbol is only started with this much request budget left; otherwise the
+# matches found so far are returned
+SYMBOL_MIN_SECONDS = 3
+
 class StockScreener:
     def __init__(self):
         self.screener = ScreenerScraper()
@@ -64,70 +72,34 @@ class StockScreener:
         peg = pe_ratio / earnings_growth
         return peg
     
-    def analyze_quarterly_results(self, quarterly_results: Optional[Dict]) -> Dict:
+    def analyze_quarterly_results(self, quarterly_results: Optional[ResultTable]) -> Dict:
         """
         Analyze quarterly results to determine recent performance trends
         Returns dict with: sales_growth, profit_growth, margin_improvement, quarters_analyzed
         """
-        if not quarterly_results or not quarterly_results.get('rows'):
-            return {
-                'sales_growth': 0,
-                'profit_growth': 0,
-                'margin_improvement': False,
-                'quarters_analyzed': 0
-            }
-        
-        headers = quarterly_results.get('headers', [])
-        rows = quarterly_results.get('rows', [])
-        
-        if not headers or not rows or len(rows) < 2:
-            return {
-                'sales_growth': 0,
-                'profit_growth': 0,
-                'margin_improvement': False,
-                'quarters_analyzed': 0
-            }
-        
-        # Find indices for key columns
-        sales_idx = None
-        profit_idx = None
+        empty = {
+            'sales_growth': 0,
+            'profit_growth': 0,
+            'margin_improvement': False,
+            'quarters_analyzed': 0
+        }
         
-        for i, header in enumerate(headers):
-            header_lower = header.lower()
-            if 'sales' in header_lower or 'revenue' in header_lower or 'income' in header_lower:
-                sales_idx = i
-            if 'profit' in header_lower and ('net' in header_lower or 'after' in header_lower):
-                profit_idx = i
+        if quarterly_results is None or len(quarterly_results.periods) < 2:
+            return empty
         
-        if sales_idx is None or profit_idx is None:
-            return {
-                'sales_growth': 0,
-                'profit_growth': 0,
-                'margin_improvement': False,
-                'quarters_analyzed': 0
-            }
+        sales_row = quarterly_results.row('sales', 'revenue')
+        profit_row = quarterly_results.row('net profit')
         
-        # Get last 4 quarters (most recent)
-        recent_rows = rows[:4] if len(rows) >= 4 else rows
+        if sales_row is None or profit_row is None:
+            return empty
         
-        sales_values = []
-        profit_values = []
+        # Last 4 quarters (columns are oldest -> newest)
+        sales = sales_row[-4:]
+        profit = profit_row[-4:]
+        both = ~np.isnan(sales) & ~np.isnan(profit)
         
-        for row in recent_rows:
-            if len(row) > max(sales_idx, profit_idx):
-                try:
-                    sales_text = row[sales_idx].replace(',', '').replace('₹', '').strip()
-                    profit_text = row[profit_idx].replace(',', '').replace('₹', '').strip()
-                    
-                    sales_match = re.search(r'[\d.]+', sales_text)
-                    profit_match = re.search(r'[\d.]+', profit_text)
-                    
-                    if sales_match:
-                        sales_values.append(float(sales_match.group()))
-                    if profit_match:
-                        profit_values.append(float(profit_match.group()))
-                except:
-                    continue
+        sales_values = sales[~np.isnan(sales)]
+        profit_values = profit[~np.isnan(profit)]
         
         sales_growth = 0
         profit_growth = 0
@@ -135,97 +107,60 @@ class StockScreener:
         
         if len(sales_values) >= 2:
             # Calculate growth from oldest to newest
-            oldest_sales = sales_values[-1]
-            newest_sales = sales_values[0]
+            oldest_sales, newest_sales = sales_values[0], sales_values[-1]
             if oldest_sales > 0:
-                sales_growth = ((newest_sales - oldest_sales) / oldest_sales) * 100
+                sales_growth = float((newest_sales - oldest_sales) / oldest_sales * 100)
         
         if len(profit_values) >= 2:
-            oldest_profit = profit_values[-1]
-            newest_profit = profit_values[0]
+            oldest_profit, newest_profit = profit_values[0], profit_values[-1]
             if oldest_profit > 0:
-                profit_growth = ((newest_profit - oldest_profit) / oldest_profit) * 100
-            
-            # Check margin improvement (profit margin trend)
-            if len(sales_values) >= 2 and len(profit_values) >= 2:
-                oldest_margin = (profit_values[-1] / sales_values[-1] * 100) if sales_values[-1] > 0 else 0
-                newest_margin = (profit_values[0] / sales_values[0] * 100) if sales_values[0] > 0 else 0
-                margin_improvement = newest_margin > oldest_margin
+                profit_growth = float((newest_profit - oldest_profit) / oldest_profit * 100)
+        
+        # Check margin improvement (profit margin trend) over quarters that have both figures
+        if np.count_nonzero(both) >= 2:
+            paired_sales = sales[both]
+            paired_profit = profit[both]
+            margins = np.divide(paired_profit, paired_sales,
+                                out=np.zeros_like(paired_profit), where=paired_sales > 0) * 100
+            margin_improvement = bool(margins[-1] > margins[0])
         
         return {
             'sales_growth': sales_growth,
             'profit_growth': profit_growth,
             'margin_improvement': margin_improvement,
-            'quarters_analyzed': len(recent_rows)
+            'quarters_analyzed': len(sales)
         }
     
-    def analyze_annual_debt_trend(self, annual_results: Optional[Dict]) -> Dict:
+    def analyze_annual_debt_trend(self, annual_results: Optional[ResultTable]) -> Dict:
         """
         Analyze annual results to determine debt trend over last 3 years
         Returns dict with: avg_debt_to_equity, debt_decreasing, years_analyzed
         """
-        if not annual_results or not annual_results.get('rows'):
-            return {
-                'avg_debt_to_equity': 0,
-                'debt_decreasing': False,
-                'years_analyzed': 0
-            }
+        empty = {
+            'avg_debt_to_equity': 0,
+            'debt_decreasing': False,
+            'years_analyzed': 0
+        }
         
-        headers = annual_results.get('headers', [])
-        rows = annual_results.get('rows', [])
+        if annual_results is None or len(annual_results.periods) < 2:
+            return empty
         
-        if not headers or not rows or len(rows) < 2:
-            return {
-                'avg_debt_to_equity': 0,
-                'debt_decreasing': False,
-                'years_analyzed': 0
-            }
+        # Find debt to equity row
+        debt_row = annual_results.row('debt to equity', 'debt/equity', 'debt / equity', 'd/e')
         
-        # Find debt to equity column
-        debt_idx = None
-        for i, header in enumerate(headers):
-            header_lower = header.lower()
-            if ('debt' in header_lower and 'equity' in header_lower) or 'd/e' in header_lower:
-                debt_idx = i
-                break
+        # Last 3 years with a reported value (oldest -> newest)
+        debt_values = ResultTable.recent(debt_row, 3)
         
-        if debt_idx is None:
-            return {
-                'avg_debt_to_equity': 0,
-                'debt_decreasing': False,
-                'years_analyzed': 0
-            }
-        
-        # Get last 3 years
-        recent_rows = rows[:3] if len(rows) >= 3 else rows
-        
-        debt_values = []
-        for row in recent_rows:
-            if len(row) > debt_idx:
-                try:
-                    debt_text = row[debt_idx].replace(',', '').strip()
-                    debt_match = re.search(r'[\d.]+', debt_text)
-                    if debt_match:
-                        debt_values.append(float(debt_match.group()))
-                except:
-                    continue
-        
-        if not debt_values:
-            return {
-                'avg_debt_to_equity': 0,
-                'debt_decreasing': False,
-                'years_analyzed': 0
-            }
-        
-        avg_debt = sum(debt_values) / len(debt_values)
+        if len(debt_values) == 0:
+            return empty
         
         # Check if debt is decreasing (newest < oldest)
         debt_decreasing = False
         if len(debt_values) >= 2:
-            debt_decreasing = debt_values[0] < debt_values[-1]
+            debt_decreasing = bool(debt_values[-1] < debt_values[0])
         
         return {
-            'avg_debt_to_equity': avg_debt,
+            'avg_debt_to_equity': float(debt_values.mean()),
             'debt_decreasing': debt_decreasing,
             'years_analyzed': len(debt_values)
         }
@@ -237,7 +172,7 @@ class StockScreener:
         """
         try:
             ticker = yf.Ticker(f"{symbol}.NS")
-            info = ticker.info
+            info = guarded_call('yfinance', lambda: ticker.info)
             
             if not info or not info.get('regularMarketPrice'):
                 return None
@@ -324,6 +259,7 @@ class StockScreener:
             print(f"Error fetching screener data for {symbol}: {e}")
             return basic_data  # Return basic data if screener fails
     
+    @batch_lane()
     def screen_stocks(self, 
                      max_peg: float = 3.0,  # Increased default
                      min_pe: float = 5.0,
@@ -362,8 +298,7 @@ class StockScreener:
         print(f"Screening {len(stocks_to_check)} stocks using screener.in (yfinance is rate-limited)...")
         
         # Use screener.in directly since yfinance is rate-limited
-        # Process stocks sequentially with small delays to avoid rate limits
-        import time
+        # Pacing comes from the shared upstream rate limiters (batch lane, see decorator)
         
         for idx, symbol in enumerate(stocks_to_check):
             try:
@@ -371,13 +306,12 @@ class StockScreener:
                 if len(matched_stocks) >= max_results * 2:
                     print(f"Found {len(matched_stocks)} matches, stopping early")
                     break
+                if not budget_allows(SYMBOL_MIN_SECONDS):
+                    print(f"Request deadline nearly spent, stopping after {idx} of {len(stocks_to_check)} stocks")
+                    break
                 
                 print(f"Processing {idx+1}/{len(stocks_to_check)}: {symbol}")
                 
-                # Add small delay to avoid rate limiting (except for first request)
-                if idx > 0:
-                    time.sleep(0.5)  # 500ms delay between requests
-                
                 # Fetch from screener.in (more reliable for Indian stocks)
                 screener_data = self.screener.fetch_financial_data(symbol)
                 
@@ -404,10 +338,8 @@ class StockScreener:
                 # Try to get PEG from yfinance only if screener didn't provide it (with retry)
                 if (not peg_ratio or peg_ratio == 0) and pe_ratio > 0:
                     try:
-                        # Add delay before yfinance call
-                        time.sleep(0.3)
                         ticker = yf.Ticker(f"{symbol}.NS")
-                        info = ticker.info
+                        info = guarded_call('yfinance', lambda: ticker.info)
                         if info:
                             peg_ratio = info.get('pegRatio', 0)
                             if not peg_ratio or peg_ratio == 0:
@@ -1,25 +1,66 @@
+import contextvars
 import random
-from datetime import datetime
+import json
+import hashlib
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import yfinance as yf
 from .screener_scraper import ScreenerScraper
+from .number_parser import to_float, fraction_to_percent
+from .circuit_breaker import guarded_call
+from .tiered_cache import cache
+from .market_hours import now_ist
+from .price_store import price_store
+from .price_analytics import price_analytics
+from .swot_rules import engine as swot_rules
+from .revalidate import revalidator, freshness, STALE, EXPIRED
+from .deadline import budget_allows
+from .metrics import span, timed
+
+# Stored reports are served without refetching for this long
+SWOT_MAX_AGE = timedelta(hours=6)
+# ...and for this much longer while a background refresh rechecks them
+SWOT_GRACE = timedelta(hours=18)
+
+# Budget the yfinance fallback needs (ticker.info has no timeout of its own), and the
+# daily-bar top-up for fields `info` lacks; with less left they are skipped
+YFINANCE_FALLBACK_SECONDS = 5
+HISTORY_FIELDS_SECONDS = 2
+
+# Concurrent fundamentals fetches for analyze_batch (upstream rate limits still apply)
+BATCH_FETCH_WORKERS = 4
+
+# yfinance fallback fields that can be derived from daily bars when `info` lacks them:
+# field -> (info key, function of the bars)
+HISTORY_FIELDS = {
+    'previous_close': ('previousClose', lambda bars: bars['close'][-2] if len(bars['close']) > 1 else bars['close'][-1]),
+    'volume': ('volume', lambda bars: bars['volume'][-1]),
+    'avg_volume': ('averageVolume', lambda bars: bars['volume'][-63:].mean()),  # ~3 months, as yfinance
+    '52w_high': ('fiftyTwoWeekHigh', lambda bars: bars['high'].max()),
+    '52w_low': ('fiftyTwoWeekLow', lambda bars: bars['low'].min()),
+}
 
 class SWOTAnalyzer:
     def __init__(self):
         self.screener = ScreenerScraper()
     
+    @timed('stock_data.fetch')
     def _fetch_stock_data(self, symbol):
         """Fetch real stock data from screener.in first, fallback to yfinance"""
         try:
             # Try screener.in first for accurate Indian stock data
             screener_data = self.screener.fetch_financial_data(symbol)
             if screener_data and screener_data.get('current_price', 0) > 0:
+                # Risk/liquidity figures from locally stored bars (no network); defaults if not computed yet
+                stats = price_analytics.get(symbol) or {}
                 return {
                     "symbol": symbol,
                     "name": screener_data.get('name', f"{symbol} Limited"),
                     "sector": screener_data.get('sector', 'Unknown'),
                     "current_price": screener_data.get('current_price', 0),
-                    "previous_close": screener_data.get('current_price', 0),  # Use current as proxy
+                    "previous_close": stats.get('previous_close') or screener_data.get('current_price', 0),
                     "market_cap": screener_data.get('market_cap', '0'),
+                    "market_cap_value": screener_data.get('market_cap_value', 0),
                     "pe_ratio": screener_data.get('pe_ratio', 0),
                     "forward_pe": 0,
                     "peg_ratio": 0,
@@ -33,20 +74,25 @@ class SWOTAnalyzer:
                     "gross_margin": 0,
                     "revenue_growth": 0,
                     "earnings_growth": 0,
-                    "beta": 1.0,
+                    "beta": stats.get('beta') or 1.0,
+                    "volatility": stats.get('volatility') or 0,
                     "52w_high": screener_data.get('52w_high', 0),
                     "52w_low": screener_data.get('52w_low', 0),
-                    "volume": 0,
-                    "avg_volume": 0,
+                    "volume": stats.get('volume') or 0,
+                    "avg_volume": stats.get('avg_volume') or 0,
                     "target_price": 0,
                     "peer_comparison": screener_data.get('peer_comparison'),
-                    "quarterly_results": screener_data.get('quarterly_results')
+                    "quarterly_results": screener_data.get('quarterly_results'),
+                    "stale": screener_data.get('stale', False),
+                    "age_seconds": screener_data.get('age_seconds', 0)
                 }
             
             # Fallback to yfinance if screener fails
+            if not budget_allows(YFINANCE_FALLBACK_SECONDS):
+                print(f"Skipping yfinance fallback for {symbol}: request deadline nearly spent")
+                return None
             ticker = yf.Ticker(f"{symbol}.NS")
-            info = ticker.info
-            hist = ticker.history(period="1y")
+            info = guarded_call('yfinance', lambda: ticker.info)
             
             if info:
                 # Calculate ROE and ROCE from available financial data
@@ -82,31 +128,36 @@ class SWOTAnalyzer:
                 if not roce_calculated or roce_calculated == 0:
                     roce_calculated = info.get('returnOnAssets', 0) or info.get('profitMargins', 0)
                 
+                history_fields = self._history_fields(symbol, info)
+                
+                # Normalize to the screener.in conventions at ingest: ratios in percent
+                # (yfinance returns 0.29 for 29%), D/E as a plain ratio (yfinance returns 35.2 for 0.352)
                 return {
                     "symbol": symbol,
                     "name": info.get('longName', f"{symbol} Limited"),
                     "sector": info.get('sector', 'Unknown'),
                     "current_price": info.get('currentPrice', info.get('regularMarketPrice', 0)),
-                    "previous_close": info.get('previousClose', 0),
+                    "previous_close": history_fields['previous_close'],
                     "market_cap": info.get('marketCap', 0),
+                    "market_cap_value": to_float(info.get('marketCap')),
                     "pe_ratio": info.get('trailingPE', 0),
                     "forward_pe": info.get('forwardPE', 0),
                     "peg_ratio": info.get('pegRatio', 0),
                     "dividend_yield": info.get('dividendYield', 0),
-                    "roe": roe_calculated,
-                    "roce": roce_calculated,
-                    "roa": info.get('returnOnAssets', 0),
+                    "roe": fraction_to_percent(roe_calculated),
+                    "roce": fraction_to_percent(roce_calculated),
+                    "roa": fraction_to_percent(info.get('returnOnAssets')),
                     "book_value": info.get('bookValue', 0),
-                    "debt_to_equity": info.get('debtToEquity', 0),
-                    "profit_margin": info.get('profitMargins', 0),
-                    "gross_margin": info.get('grossMargins', 0),
-                    "revenue_growth": info.get('revenueGrowth', 0),
-                    "earnings_growth": info.get('earningsGrowth', 0),
+                    "debt_to_equity": to_float(info.get('debtToEquity')) / 100,
+                    "profit_margin": fraction_to_percent(info.get('profitMargins')),
+                    "gross_margin": fraction_to_percent(info.get('grossMargins')),
+                    "revenue_growth": fraction_to_percent(info.get('revenueGrowth')),
+                    "earnings_growth": fraction_to_percent(info.get('earningsGrowth')),
                     "beta": info.get('beta', 1.0),
-                    "52w_high": info.get('fiftyTwoWeekHigh', 0),
-                    "52w_low": info.get('fiftyTwoWeekLow', 0),
-                    "volume": info.get('volume', 0),
-                    "avg_volume": info.get('averageVolume', 0),
+                    "52w_high": history_fields['52w_high'],
+                    "52w_low": history_fields['52w_low'],
+                    "volume": history_fields['volume'],
+                    "avg_volume": history_fields['avg_volume'],
                     "target_price": info.get('targetMeanPrice', 0)
                 }
         except Exception as e:
@@ -114,349 +165,110 @@ class SWOTAnalyzer:
         
         return None
     
-    def _format_percentage(self, value, is_yield=False):
-        """Format percentage value - handles both decimal (0.29) and percent (29) formats"""
-        try:
-            val = float(value) if value else 0
-            
-            # For dividend yield from screener: 0.21 means 0.21% (don't multiply by 100)
-            # For dividend yield from yfinance: same behavior
-            if is_yield:
-                # Dividend yields are already in percentage format (0.21 = 0.21%)
-                if val > 100:  # Edge case: already multiplied
-                    return round(val, 2)
-                else:
-                    return round(val, 2)  # Keep as is
-            else:
-                # For ROE/ROCE: value could be decimal (0.29) or percent (29)
-                if val > 100:
-                    # Already in percentage, use as is
-                    return round(val, 2)
-                elif val > 1:
-                    # Looks like percentage already (29)
-                    return round(val, 2)
-                else:
-                    # Decimal format, convert to percentage
-                    return round(val * 100, 2)
-        except (ValueError, TypeError):
-            return 0
-    
-    def _parse_market_cap(self, market_cap):
-        """Convert market cap to absolute numeric value"""
-        if isinstance(market_cap, str):
-            # Extract numeric value from string like "₹9,552Cr." or "10.28 B"
-            try:
-                import re
-                numbers = re.findall(r'[\d.]+', market_cap.replace(',', ''))
-                if numbers:
-                    market_cap_value = float(numbers[0])
-                    # Check if it's in Crores, Billions, etc.
-                    if 'Cr' in market_cap or 'crore' in market_cap.lower():
-                        market_cap_value = market_cap_value * 10000000  # Convert to absolute
-                    elif 'B' in market_cap or 'billion' in market_cap.lower():
-                        market_cap_value = market_cap_value * 1000000000  # Convert to absolute
-                    elif 'T' in market_cap or 'trillion' in market_cap.lower():
-                        market_cap_value = market_cap_value * 1000000000000  # Convert to absolute
-                else:
-                    market_cap_value = 0
-            except:
-                market_cap_value = 0
-        else:
-            market_cap_value = float(market_cap) if isinstance(market_cap, (int, float)) else 0
-        return market_cap_value
+    def _history_fields(self, symbol, info):
+        """
+        HISTORY_FIELDS from `info`, falling back to daily bars only for the ones it lacks.
+        The bars are loaded at most once, from the local price store when it is current.
+        """
+        bars = None
+        fields = {}
+        for field, (info_key, from_bars) in HISTORY_FIELDS.items():
+            value = info.get(info_key)
+            if not value:
+                if bars is None:
+                    bars = (price_store.history(symbol) if budget_allows(HISTORY_FIELDS_SECONDS) else None) or {}
+                value = float(from_bars(bars)) if bars else 0
+            fields[field] = value
+        return fields
     
     def _generate_swot_from_data(self, stock_data):
         """Generate SWOT analysis from real stock data"""
-        strengths = []
-        weaknesses = []
-        opportunities = []
-        threats = []
-        
-        # Analyze based on P/E ratio
-        pe = stock_data.get('pe_ratio', 0)
-        # Ensure pe is numeric
-        try:
-            pe = float(pe) if pe else 0
-        except (ValueError, TypeError):
-            pe = 0
-        
-        if 10 <= pe <= 25:
-            strengths.append(f"Attractive P/E ratio of {pe:.1f} indicating reasonable valuation")
-        elif pe > 30:
-            weaknesses.append(f"High P/E ratio of {pe:.1f} suggesting overvaluation")
-        
-        # Analyze Return on Equity
-        roe = stock_data.get('roe', 0) * 100 if isinstance(stock_data.get('roe'), (int, float)) else 0
-        if roe > 20:
-            strengths.append(f"Excellent Return on Equity ({roe:.1f}%) indicating highly efficient capital usage")
-        elif roe > 15:
-            strengths.append(f"Strong Return on Equity ({roe:.1f}%) indicating efficient capital usage")
-        elif roe > 0 and roe < 10:
-            weaknesses.append(f"Low Return on Equity ({roe:.1f}%) - needs improvement in capital efficiency")
-        elif roe <= 0:
-            weaknesses.append(f"Negative Return on Equity ({roe:.1f}%) indicating financial distress")
-        
-        # Analyze Return on Assets
-        roa = stock_data.get('roa', 0) * 100
-        if roa > 5:
-            strengths.append(f"Healthy Return on Assets ({roa:.1f}%)")
-        
-        # Analyze debt
-        debt_eq = stock_data.get('debt_to_equity', 0)
-        try:
-            debt_eq = float(debt_eq) if debt_eq else 0
-        except (ValueError, TypeError):
-            debt_eq = 0
-        
-        if debt_eq < 0.3:
-            strengths.append(f"Prudent debt management (D/E: {debt_eq:.2f}) - low financial risk")
-        elif debt_eq < 0.5:
-            strengths.append(f"Conservative debt levels (D/E: {debt_eq:.2f}) providing stability")
-        elif 0.5 <= debt_eq <= 1.0:
-            strengths.append(f"Moderate leverage (D/E: {debt_eq:.2f}) for growth")
-        elif debt_eq > 1.0 and debt_eq <= 2.0:
-            weaknesses.append(f"Elevated leverage (D/E: {debt_eq:.2f}) increasing financial risk")
-        elif debt_eq > 2.0:
-            weaknesses.append(f"Excessive leverage (D/E: {debt_eq:.2f}) - high financial risk")
-        
-        # Analyze profit margins
-        profit_margin = stock_data.get('profit_margin', 0) * 100 if isinstance(stock_data.get('profit_margin'), (int, float)) else 0
-        if profit_margin > 20:
-            strengths.append(f"Exceptional profit margins ({profit_margin:.1f}%) demonstrating strong operational efficiency")
-        elif profit_margin > 15:
-            strengths.append(f"Strong profit margins ({profit_margin:.1f}%) indicating efficient operations")
-        elif profit_margin > 10:
-            strengths.append(f"Healthy profit margins ({profit_margin:.1f}%)")
-        elif profit_margin > 0 and profit_margin < 5:
-            weaknesses.append(f"Thin profit margins ({profit_margin:.1f}%) - operational efficiency concerns")
-        elif profit_margin <= 0:
-            weaknesses.append(f"Negative profit margins indicating operational losses")
-        
-        # Analyze growth
-        revenue_growth = stock_data.get('revenue_growth', 0) * 100 if isinstance(stock_data.get('revenue_growth'), (int, float)) else 0
-        if revenue_growth > 20:
-            strengths.append(f"Exceptional revenue growth ({revenue_growth:.1f}%) - strong market expansion")
-        elif revenue_growth > 10:
-            strengths.append(f"Strong revenue growth ({revenue_growth:.1f}%) indicating market traction")
-        elif revenue_growth > 5:
-            strengths.append(f"Steady revenue growth ({revenue_growth:.1f}%)")
-        elif revenue_growth < -5:
-            weaknesses.append(f"Contracting revenues ({revenue_growth:.1f}%) - business challenges")
-        elif revenue_growth < 0:
-            weaknesses.append(f"Declining revenue ({revenue_growth:.1f}%)")
-        
-        earnings_growth = stock_data.get('earnings_growth', 0) * 100 if isinstance(stock_data.get('earnings_growth'), (int, float)) else 0
-        if earnings_growth > 25:
-            strengths.append(f"Outstanding earnings growth ({earnings_growth:.1f}%) - profitability momentum")
-        elif earnings_growth > 15:
-            strengths.append(f"Strong earnings growth ({earnings_growth:.1f}%)")
-        elif earnings_growth > 0 and earnings_growth < 5:
-            weaknesses.append(f"Sluggish earnings growth ({earnings_growth:.1f}%)")
-        elif earnings_growth < 0:
-            weaknesses.append(f"Earnings declining ({earnings_growth:.1f}%) - profitability concerns")
-        
-        # Analyze beta (volatility)
-        beta = stock_data.get('beta', 1.0)
-        try:
-            beta = float(beta) if beta else 1.0
-        except (ValueError, TypeError):
-            beta = 1.0
-        
-        if beta < 1.0:
-            strengths.append(f"Low volatility (beta: {beta:.2f}) - stable against market")
-        elif beta > 1.5:
-            weaknesses.append(f"High volatility (beta: {beta:.2f}) - more sensitive to market")
-        
-        # Dividend analysis
-        div_yield = stock_data.get('dividend_yield', 0) * 100 if isinstance(stock_data.get('dividend_yield'), (int, float)) else 0
-        if div_yield > 5:
-            strengths.append(f"Excellent dividend yield ({div_yield:.2f}%) for income investors")
-        elif div_yield > 2:
-            strengths.append(f"Attractive dividend yield ({div_yield:.2f}%) providing regular income")
-        elif div_yield > 0 and div_yield < 1:
-            weaknesses.append(f"Low dividend yield ({div_yield:.2f}%) - limited income generation")
-        elif div_yield == 0:
-            weaknesses.append("No dividend payment - reinvestment strategy preferred")
-        
-        # Market cap based opportunities
-        market_cap = stock_data.get('market_cap', 0)
-        market_cap_value = self._parse_market_cap(market_cap)
-        
-        if market_cap_value > 100000000000:  # Large cap
-            strengths.append("Large market capitalization providing stability")
-        elif market_cap_value > 5000000000:  # Mid cap
-            opportunities.append("Mid-cap position with growth potential")
-        
-        # Sector-specific opportunities
-        sector = stock_data.get('sector', '')
-        if sector:
-            opportunities.append(f"Growth potential in {sector} sector")
-        
-        # Generate sector-specific and data-driven opportunities
-        if not opportunities:
-            opportunities = [
-                "Digital transformation opportunities",
-                "Market expansion in Tier 2/3 cities",
-                "Government policy support",
-                "Strategic partnerships and acquisitions",
-                "Emerging technology adoption"
-            ]
-        
-        # Generate dynamic threats based on financial metrics and sector
-        threats = self._generate_threats(stock_data, sector)
-        
-        # If we don't have enough strengths/weaknesses, add generic ones
-        if len(strengths) < 3:
-            strengths.extend([
-                "Established market presence",
-                "Experienced management team"
-            ])
-        
-        if len(weaknesses) < 3:
-            weaknesses.extend([
-                "Dependence on domestic market",
-                "Regulatory compliance challenges"
-            ])
-        
+        return self._generate_swot_batch([stock_data])[0]
+    
+    def _generate_threats(self, stock_data, sector):
+        """Threats for one stock (thin wrapper over the rule engine)"""
+        return swot_rules.evaluate([dict(stock_data, sector=sector)])[0]['threats']
+    
+    def _financial_summary(self, stock_data, columns, row):
         return {
-            "symbol": stock_data['symbol'],
-            "name": stock_data.get('name', f"{stock_data['symbol']} Limited"),
-            "sector": stock_data.get('sector', 'Unknown'),
-            "analysis_date": datetime.now().strftime("%B %d, %Y"),
-            "strengths": strengths[:7],
-            "weaknesses": weaknesses[:7],
-            "opportunities": opportunities[:7],
-            "threats": threats[:7],
-            "financial_summary": {
-                "current_price": round(float(stock_data.get('current_price', 0)), 2),
-                "market_cap": str(stock_data.get('market_cap', 0)),  # Keep as string if from screener
-                "pe_ratio": round(float(stock_data.get('pe_ratio', 0)), 2),
-                "debt_to_equity": round(float(stock_data.get('debt_to_equity', 0)), 2),
-                "profit_margin": round(float(stock_data.get('profit_margin', 0)), 4),
-                "roe": self._format_percentage(stock_data.get('roe', 0)),
-                "dividend_yield": self._format_percentage(stock_data.get('dividend_yield', 0), is_yield=True)
-            }
+            "current_price": round(to_float(stock_data.get('current_price')), 2),
+            "market_cap": str(stock_data.get('market_cap', 0)),  # Keep as string if from screener
+            "pe_ratio": round(float(columns['pe_ratio'][row]), 2),
+            "debt_to_equity": round(float(columns['debt_to_equity'][row]), 2),
+            "profit_margin": round(float(columns['profit_margin'][row]), 2),
+            "roe": round(float(columns['roe'][row]), 2),
+            "dividend_yield": round(float(columns['dividend_yield'][row]), 2)
         }
     
-    def _generate_threats(self, stock_data, sector):
-        """Generate dynamic threats based on financial metrics and sector analysis"""
-        threats = []
-        
-        # Analyze financial distress indicators
-        debt_eq = stock_data.get('debt_to_equity', 0)
-        if debt_eq > 2.0:
-            threats.append(f"High leverage (D/E: {debt_eq:.2f}) increasing bankruptcy risk during economic downturn")
-        
-        # Analyze profitability trends
-        profit_margin = stock_data.get('profit_margin', 0) * 100 if isinstance(stock_data.get('profit_margin'), (int, float)) else 0
-        if profit_margin < 5:
-            threats.append("Thin profit margins vulnerable to cost inflation and competitive pressure")
-        elif profit_margin < 0:
-            threats.append("Operating losses - cash flow concerns and potential funding crisis")
-        
-        # Analyze revenue decline
-        revenue_growth = stock_data.get('revenue_growth', 0) * 100 if isinstance(stock_data.get('revenue_growth'), (int, float)) else 0
-        if revenue_growth < -10:
-            threats.append(f"Severe revenue contraction ({revenue_growth:.1f}%) indicating market share loss")
-        
-        # Analyze ROE decline - capital efficiency issue
-        roe = stock_data.get('roe', 0) * 100 if isinstance(stock_data.get('roe'), (int, float)) else 0
-        if roe < 0:
-            threats.append("Negative ROE indicating capital destruction and investor confidence loss")
-        elif roe < 10:
-            threats.append(f"Low ROE ({roe:.1f}%) - inefficient capital allocation vs peers")
-        
-        # Analyze beta - volatility risk
-        beta = stock_data.get('beta', 1.0)
-        if beta > 1.5:
-            threats.append(f"High volatility (beta: {beta:.2f}) - magnified losses during market corrections")
-        elif beta < 0.5:
-            threats.append(f"Unusually low volatility (beta: {beta:.2f}) may mask underlying risks")
-        
-        # Sector-specific threats
-        if sector.lower() == 'energy' or 'oil' in sector.lower() or 'gas' in sector.lower():
-            threats.extend([
-                "Volatile commodity prices (oil/gas) affecting margins",
-                "Regulatory changes towards renewable energy",
-                "Environmental regulations and carbon taxes",
-                "Geopolitical tensions affecting energy supply"
-            ])
-        elif sector.lower() == 'technology' or 'tech' in sector.lower() or 'software' in sector.lower() or 'IT' in sector:
-            threats.extend([
-                "Rapid technological obsolescence risks",
-                "Intense competition from global tech giants",
-                "Cybersecurity vulnerabilities and data breaches",
-                "Skill shortage in emerging technologies (AI, Cloud)"
-            ])
-        elif 'banking' in sector.lower() or 'finance' in sector.lower() or 'bank' in sector.lower() or 'financial' in sector.lower():
-            threats.extend([
-                "Rising non-performing assets (NPA) risk",
-                "Interest rate volatility impact on margins",
-                "Regulatory capital requirements (Basel norms)",
-                "Digital disruption from fintech companies",
-                "Economic slowdown increasing credit defaults"
-            ])
-        elif sector.lower() == 'fmcg' or 'consumer' in sector.lower():
-            threats.extend([
-                "Raw material cost inflation",
-                "Intensifying competition from unorganized sector",
-                "Changing consumer preferences towards health/wellness",
-                "Rural consumption slowdown"
-            ])
-        elif sector.lower() == 'healthcare' or 'pharma' in sector.lower():
-            threats.extend([
-                "Regulatory price controls on medicines",
-                "US FDA compliance and inspection risks",
-                "Patent expiration leading to generic competition",
-                "Supply chain disruptions from geopolitical tensions"
-            ])
-        elif 'telecom' in sector.lower():
-            threats.extend([
-                "Intense price wars from 5G competition",
-                "High capital expenditure requirements for network expansion",
-                "Regulatory spectrum auction costs",
-                "Customer churn due to service quality issues"
-            ])
-        
-        # High P/E ratio threat
-        pe = stock_data.get('pe_ratio', 0)
-        if pe > 30:
-            threats.append(f"Elevated valuation (P/E: {pe:.1f}) - correction risk if earnings disappoint")
-        
-        # Market cap based threats
-        market_cap = stock_data.get('market_cap', 0)
-        # Convert market_cap to numeric value (handles both string and number)
-        market_cap_value = self._parse_market_cap(market_cap)
-        
-        if market_cap_value < 1000000000:  # Small cap
-            threats.append("Low market cap - limited liquidity and vulnerability to market manipulation")
-        elif market_cap_value < 10000000000:  # Mid cap
-            threats.append("Mid-cap volatility - higher risk than large-cap peers during market corrections")
-        
-        # Earnings decline threat
-        earnings_growth = stock_data.get('earnings_growth', 0) * 100 if isinstance(stock_data.get('earnings_growth'), (int, float)) else 0
-        if earnings_growth < -20:
-            threats.append(f"Sharp earnings decline ({earnings_growth:.1f}%) indicating operational crisis")
-        
-        # Generic market threats (always applicable)
-        generic_threats = [
-            "Economic recession impacting demand",
-            "Global supply chain disruptions",
-            "Currency fluctuation affecting export competitiveness"
-        ]
-        
-        threats.extend(generic_threats)
-        
-        return threats[:10]  # Limit to top 10 most relevant threats
+    def _generate_swot_batch(self, stock_data_list):
+        """Generate SWOT analyses for many stocks in one pass of the rule engine"""
+        with span('swot.rules'):
+            columns = swot_rules.columns(stock_data_list)
+            quadrants = swot_rules.evaluate(stock_data_list, columns)
+        analysis_date = datetime.now().strftime("%B %d, %Y")
+        
+        reports = []
+        for row, (stock_data, swot) in enumerate(zip(stock_data_list, quadrants)):
+            reports.append({
+                "symbol": stock_data['symbol'],
+                "name": stock_data.get('name', f"{stock_data['symbol']} Limited"),
+                "sector": stock_data.get('sector', 'Unknown'),
+                "analysis_date": analysis_date,
+                "strengths": swot['strengths'],
+                "weaknesses": swot['weaknesses'],
+                "opportunities": swot['opportunities'],
+                "threats": swot['threats'],
+                "financial_summary": self._financial_summary(stock_data, columns, row)
+            })
+        return reports
     
-    def analyze(self, symbol):
-        # Fetch real stock data
-        stock_data = self._fetch_stock_data(symbol)
-        
-        if stock_data:
-            return self._generate_swot_from_data(stock_data)
-        
-        # Fallback: return generic SWOT if data unavailable
+    def _input_hash(self, stock_data):
+        """
+        Hash of the rule buckets the inputs fall into: price moves that leave every
+        ladder on the same rung (P/E 24.1 -> 24.6) keep the stored report
+        """
+        inputs = {'name': stock_data.get('name'), 'buckets': swot_rules.buckets([stock_data])[0]}
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def _load_reports(self, symbols):
+        """Stored report entries keyed by symbol (one cache lookup for the whole list)"""
+        return cache.get_many('swot', symbols)
+    
+    def _load_report(self, symbol):
+        """Stored report entry for a symbol, or None"""
+        return cache.get('swot', symbol)
+    
+    def _store_report(self, symbol, swot, input_hash):
+        """Store a report; the entry's fetched_at is when its fundamentals were last checked"""
+        cache.set('swot', symbol, {"swot": swot, "input_hash": input_hash}, ttl=SWOT_MAX_AGE)
+    
+    def _freshness(self, stored):
+        """FRESH / STALE / EXPIRED for a stored report (see SWOT_MAX_AGE, SWOT_GRACE)"""
+        if not stored:
+            return EXPIRED
+        return freshness(stored.fetched_at, stored.expires_at, now_ist(), SWOT_GRACE, SWOT_MAX_AGE + SWOT_GRACE)
+    
+    def _stored_swot(self, stored):
+        """Copy of a stored report (cache entries are shared; never mutate them)"""
+        swot = dict(stored.value['swot'])
+        swot['financial_summary'] = dict(swot['financial_summary'])
+        return swot
+    
+    def _serve_stored(self, stored, state):
+        swot = self._stored_swot(stored)
+        swot['stale'] = state == STALE
+        swot['age_seconds'] = int((now_ist() - stored.fetched_at).total_seconds())
+        return swot
+    
+    def _reuse_report(self, symbol, stored, stock_data):
+        """Same rule buckets - keep the report, refresh the figures in its summary"""
+        swot = self._stored_swot(stored)
+        swot['financial_summary'] = self._financial_summary(stock_data, swot_rules.columns([stock_data]), 0)
+        self._store_report(symbol, swot, stored.value['input_hash'])
+        return swot
+    
+    def _generic_swot(self, symbol):
+        """Fallback SWOT when no data is available (never stored)"""
         return {
             "symbol": symbol,
             "name": f"{symbol} Limited",
@@ -469,3 +281,87 @@ class SWOTAnalyzer:
             "financial_summary": {"current_price": 0, "market_cap": 0, "pe_ratio": 0, 
                                  "debt_to_equity": 0, "profit_margin": 0, "roe": 0, "dividend_yield": 0}
         }
+    
+    def analyze(self, symbol, force_refresh=False):
+        """
+        SWOT for a symbol, reusing the stored report when possible:
+        - checked within SWOT_MAX_AGE: served straight from the 'swot' cache
+        - up to SWOT_GRACE later: served as is (marked stale) while one background refresh rechecks it
+        - older: fundamentals are refetched and the report is regenerated only if they changed
+        """
+        stored = None if force_refresh else self._load_report(symbol)
+        state = self._freshness(stored)
+        if state == STALE:
+            revalidator.submit(('swot', symbol), self._refresh, symbol, stored)
+        if state != EXPIRED:
+            return self._serve_stored(stored, state)
+        return self._refresh(symbol, stored)
+    
+    def _refresh(self, symbol, stored):
+        """Refetch fundamentals and regenerate the report if they changed"""
+        # Fetch real stock data
+        stock_data = self._fetch_stock_data(symbol)
+        
+        if stock_data:
+            input_hash = self._input_hash(stock_data)
+            if stored and stored.value['input_hash'] == input_hash:
+                return self._reuse_report(symbol, stored, stock_data)
+            
+            swot = self._generate_swot_from_data(stock_data)
+            self._store_report(symbol, swot, input_hash)
+            return swot
+        
+        # Fallback: return generic SWOT if data unavailable
+        return self._generic_swot(symbol)
+    
+    def analyze_batch(self, symbols, max_workers=BATCH_FETCH_WORKERS):
+        """
+        SWOT for several symbols at once (same reuse rules as analyze).
+        
+        Stored reports are read in one query, only the symbols that need it are
+        fetched - concurrently, still bounded by the shared upstream rate limits -
+        and all new reports are generated in a single rule-engine pass.
+        
+        Returns {symbol: {"status": ..., "swot": ...}} where status is one of
+        'cached', 'unchanged', 'generated', 'unavailable'; cached reports carry
+        `stale` and `age_seconds` as in analyze.
+        """
+        stored = self._load_reports(symbols)
+        results = {}
+        to_fetch = []
+        for symbol in symbols:
+            state = self._freshness(stored.get(symbol))
+            if state == STALE:
+                revalidator.submit(('swot', symbol), self._refresh, symbol, stored[symbol])
+            if state != EXPIRED:
+                results[symbol] = {"status": "cached", "swot": self._serve_stored(stored[symbol], state)}
+            else:
+                to_fetch.append(symbol)
+        
+        fetched = {}
+        if to_fetch:
+            # Each fetch runs in a copy of this request's context, so it keeps the request deadline
+            contexts = [contextvars.copy_context() for _ in to_fetch]
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(to_fetch))) as pool:
+                fetched = dict(zip(to_fetch, pool.map(
+                    lambda context, symbol: context.run(self._fetch_stock_data, symbol), contexts, to_fetch)))
+        
+        changed = []
+        for symbol in to_fetch:
+            stock_data = fetched[symbol]
+            if not stock_data:
+                results[symbol] = {"status": "unavailable", "swot": self._generic_swot(symbol)}
+                continue
+            input_hash = self._input_hash(stock_data)
+            row = stored.get(symbol)
+            if row and row.value['input_hash'] == input_hash:
+                results[symbol] = {"status": "unchanged", "swot": self._reuse_report(symbol, row, stock_data)}
+            else:
+                changed.append((symbol, stock_data, input_hash))
+        
+        reports = self._generate_swot_batch([stock_data for _, stock_data, _ in changed])
+        for (symbol, _, input_hash), swot in zip(changed, reports):
+            self._store_report(symbol, swot, input_hash)
+            results[symbol] = {"status": "generated", "swot": swot}
+        
+        return results
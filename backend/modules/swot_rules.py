@@ -0,0 +1,321 @@
+"""
+SWOT Rules Module
+Declarative SWOT thresholds/messages and a batch rule engine.
+
+Each ladder reads one numeric field and lists (condition, quadrant, message)
+rungs; the first matching rung wins, exactly like an if/elif chain. The
+tables are compiled once at import and evaluated over column arrays, so a
+whole watchlist or universe is scored in one pass.
+
+Conditions are written as "x > 30", "0 < x < 10" or "10 <= x <= 25";
+messages are str.format templates that can use {x}.
+All ratio fields are in percent units (see SWOTAnalyzer._fetch_stock_data).
+"""
+
+import re
+from typing import Callable, Dict, List, Sequence, Tuple
+import numpy as np
+from .number_parser import to_float
+
+STRENGTH = 'strengths'
+WEAKNESS = 'weaknesses'
+OPPORTUNITY = 'opportunities'
+THREAT = 'threats'
+
+# field -> value used when the field is missing or zero-ish
+FIELD_DEFAULTS = {'beta': 1.0}
+
+SWOT_LADDERS = [
+    ('pe_ratio', [
+        ('10 <= x <= 25', STRENGTH, "Attractive P/E ratio of {x:.1f} indicating reasonable valuation"),
+        ('x > 30', WEAKNESS, "High P/E ratio of {x:.1f} suggesting overvaluation"),
+    ]),
+    ('roe', [
+        ('x > 20', STRENGTH, "Excellent Return on Equity ({x:.1f}%) indicating highly efficient capital usage"),
+        ('x > 15', STRENGTH, "Strong Return on Equity ({x:.1f}%) indicating efficient capital usage"),
+        ('0 < x < 10', WEAKNESS, "Low Return on Equity ({x:.1f}%) - needs improvement in capital efficiency"),
+        ('x <= 0', WEAKNESS, "Negative Return on Equity ({x:.1f}%) indicating financial distress"),
+    ]),
+    ('roa', [
+        ('x > 5', STRENGTH, "Healthy Return on Assets ({x:.1f}%)"),
+    ]),
+    ('debt_to_equity', [
+        ('x < 0.3', STRENGTH, "Prudent debt management (D/E: {x:.2f}) - low financial risk"),
+        ('x < 0.5', STRENGTH, "Conservative debt levels (D/E: {x:.2f}) providing stability"),
+        ('0.5 <= x <= 1.0', STRENGTH, "Moderate leverage (D/E: {x:.2f}) for growth"),
+        ('1.0 < x <= 2.0', WEAKNESS, "Elevated leverage (D/E: {x:.2f}) increasing financial risk"),
+        ('x > 2.0', WEAKNESS, "Excessive leverage (D/E: {x:.2f}) - high financial risk"),
+    ]),
+    ('profit_margin', [
+        ('x > 20', STRENGTH, "Exceptional profit margins ({x:.1f}%) demonstrating strong operational efficiency"),
+        ('x > 15', STRENGTH, "Strong profit margins ({x:.1f}%) indicating efficient operations"),
+        ('x > 10', STRENGTH, "Healthy profit margins ({x:.1f}%)"),
+        ('0 < x < 5', WEAKNESS, "Thin profit margins ({x:.1f}%) - operational efficiency concerns"),
+        ('x <= 0', WEAKNESS, "Negative profit margins indicating operational losses"),
+    ]),
+    ('revenue_growth', [
+        ('x > 20', STRENGTH, "Exceptional revenue growth ({x:.1f}%) - strong market expansion"),
+        ('x > 10', STRENGTH, "Strong revenue growth ({x:.1f}%) indicating market traction"),
+        ('x > 5', STRENGTH, "Steady revenue growth ({x:.1f}%)"),
+        ('x < -5', WEAKNESS, "Contracting revenues ({x:.1f}%) - business challenges"),
+        ('x < 0', WEAKNESS, "Declining revenue ({x:.1f}%)"),
+    ]),
+    ('earnings_growth', [
+        ('x > 25', STRENGTH, "Outstanding earnings growth ({x:.1f}%) - profitability momentum"),
+        ('x > 15', STRENGTH, "Strong earnings growth ({x:.1f}%)"),
+        ('0 < x < 5', WEAKNESS, "Sluggish earnings growth ({x:.1f}%)"),
+        ('x < 0', WEAKNESS, "Earnings declining ({x:.1f}%) - profitability concerns"),
+    ]),
+    ('beta', [
+        ('x < 1.0', STRENGTH, "Low volatility (beta: {x:.2f}) - stable against market"),
+        ('x > 1.5', WEAKNESS, "High volatility (beta: {x:.2f}) - more sensitive to market"),
+    ]),
+    ('dividend_yield', [
+        ('x > 5', STRENGTH, "Excellent dividend yield ({x:.2f}%) for income investors"),
+        ('x > 2', STRENGTH, "Attractive dividend yield ({x:.2f}%) providing regular income"),
+        ('0 < x < 1', WEAKNESS, "Low dividend yield ({x:.2f}%) - limited income generation"),
+        ('x == 0', WEAKNESS, "No dividend payment - reinvestment strategy preferred"),
+    ]),
+    ('market_cap_value', [
+        ('x > 100000000000', STRENGTH, "Large market capitalization providing stability"),
+        ('x > 5000000000', OPPORTUNITY, "Mid-cap position with growth potential"),
+    ]),
+]
+
+SECTOR_OPPORTUNITY = "Growth potential in {sector} sector"
+
+GENERIC_OPPORTUNITIES = [
+    "Digital transformation opportunities",
+    "Market expansion in Tier 2/3 cities",
+    "Government policy support",
+    "Strategic partnerships and acquisitions",
+    "Emerging technology adoption"
+]
+
+GENERIC_STRENGTHS = ["Established market presence", "Experienced management team"]
+GENERIC_WEAKNESSES = ["Dependence on domestic market", "Regulatory compliance challenges"]
+
+# Threat ladders evaluated before the sector-specific threats
+THREAT_LADDERS = [
+    ('debt_to_equity', [
+        ('x > 2.0', THREAT, "High leverage (D/E: {x:.2f}) increasing bankruptcy risk during economic downturn"),
+    ]),
+    ('profit_margin', [
+        ('x < 0', THREAT, "Operating losses - cash flow concerns and potential funding crisis"),
+        ('x < 5', THREAT, "Thin profit margins vulnerable to cost inflation and competitive pressure"),
+    ]),
+    ('revenue_growth', [
+        ('x < -10', THREAT, "Severe revenue contraction ({x:.1f}%) indicating market share loss"),
+    ]),
+    ('roe', [
+        ('x < 0', THREAT, "Negative ROE indicating capital destruction and investor confidence loss"),
+        ('x < 10', THREAT, "Low ROE ({x:.1f}%) - inefficient capital allocation vs peers"),
+    ]),
+    ('beta', [
+        ('x > 1.5', THREAT, "High volatility (beta: {x:.2f}) - magnified losses during market corrections"),
+        ('x < 0.5', THREAT, "Unusually low volatility (beta: {x:.2f}) may mask underlying risks"),
+    ]),
+]
+
+# Sector threats: first group whose matcher fits the sector string wins.
+# 'equals' / 'contains' compare lower-cased, 'contains_exact' is case-sensitive.
+SECTOR_THREATS = [
+    ({'equals': ['energy'], 'contains': ['oil', 'gas']}, [
+        "Volatile commodity prices (oil/gas) affecting margins",
+        "Regulatory changes towards renewable energy",
+        "Environmental regulations and carbon taxes",
+        "Geopolitical tensions affecting energy supply"
+    ]),
+    ({'equals': ['technology'], 'contains': ['tech', 'software'], 'contains_exact': ['IT']}, [
+        "Rapid technological obsolescence risks",
+        "Intense competition from global tech giants",
+        "Cybersecurity vulnerabilities and data breaches",
+        "Skill shortage in emerging technologies (AI, Cloud)"
+    ]),
+    ({'contains': ['banking', 'finance', 'bank', 'financial']}, [
+        "Rising non-performing assets (NPA) risk",
+        "Interest rate volatility impact on margins",
+        "Regulatory capital requirements (Basel norms)",
+        "Digital disruption from fintech companies",
+        "Economic slowdown increasing credit defaults"
+    ]),
+    ({'equals': ['fmcg'], 'contains': ['consumer']}, [
+        "Raw material cost inflation",
+        "Intensifying competition from unorganized sector",
+        "Changing consumer preferences towards health/wellness",
+        "Rural consumption slowdown"
+    ]),
+    ({'equals': ['healthcare'], 'contains': ['pharma']}, [
+        "Regulatory price controls on medicines",
+        "US FDA compliance and inspection risks",
+        "Patent expiration leading to generic competition",
+        "Supply chain disruptions from geopolitical tensions"
+    ]),
+    ({'contains': ['telecom']}, [
+        "Intense price wars from 5G competition",
+        "High capital expenditure requirements for network expansion",
+        "Regulatory spectrum auction costs",
+        "Customer churn due to service quality issues"
+    ]),
+]
+
+# Threat ladders evaluated after the sector-specific threats
+LATE_THREAT_LADDERS = [
+    ('pe_ratio', [
+        ('x > 30', THREAT, "Elevated valuation (P/E: {x:.1f}) - correction risk if earnings disappoint"),
+    ]),
+    ('market_cap_value', [
+        ('x < 1000000000', THREAT, "Low market cap - limited liquidity and vulnerability to market manipulation"),
+        ('x < 10000000000', THREAT, "Mid-cap volatility - higher risk than large-cap peers during market corrections"),
+    ]),
+    ('earnings_growth', [
+        ('x < -20', THREAT, "Sharp earnings decline ({x:.1f}%) indicating operational crisis"),
+    ]),
+]
+
+GENERIC_THREATS = [
+    "Economic recession impacting demand",
+    "Global supply chain disruptions",
+    "Currency fluctuation affecting export competitiveness"
+]
+
+MAX_ITEMS = 7
+
+_OPS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+}
+_NUM = r'(-?\d+(?:\.\d+)?)'
+_SINGLE_RE = re.compile(rf'^x\s*(<=|>=|==|<|>)\s*{_NUM}$')
+_RANGE_RE = re.compile(rf'^{_NUM}\s*(<=|<)\s*x\s*(<=|<)\s*{_NUM}$')
+
+
+def compile_condition(condition: str) -> Callable[[np.ndarray], np.ndarray]:
+    """Turn "x > 30" / "0 < x < 10" into a vectorized mask function"""
+    match = _SINGLE_RE.match(condition.strip())
+    if match:
+        op, bound = _OPS[match.group(1)], float(match.group(2))
+        return lambda x: op(x, bound)
+    match = _RANGE_RE.match(condition.strip())
+    if match:
+        low, low_op, high_op, high = float(match.group(1)), match.group(2), match.group(3), float(match.group(4))
+        # "low < x" is "x > low"
+        lower = np.greater if low_op == '<' else np.greater_equal
+        upper = _OPS[high_op]
+        return lambda x: lower(x, low) & upper(x, high)
+    raise ValueError(f"Unsupported SWOT condition: {condition!r}")
+
+
+def _compile_ladders(ladders) -> List[Tuple[str, List[Tuple[Callable, str, str]]]]:
+    return [(field, [(compile_condition(cond), quadrant, message) for cond, quadrant, message in rungs])
+            for field, rungs in ladders]
+
+
+def _compile_sector_matcher(spec: Dict[str, Sequence[str]]) -> Callable[[str], bool]:
+    equals = set(spec.get('equals', []))
+    contains = list(spec.get('contains', []))
+    contains_exact = list(spec.get('contains_exact', []))
+
+    def matches(sector: str) -> bool:
+        lower = sector.lower()
+        return (lower in equals or any(word in lower for word in contains)
+                or any(word in sector for word in contains_exact))
+    return matches
+
+
+class SWOTRuleEngine:
+    """Evaluates the rule tables over many symbols at once"""
+
+    def __init__(self):
+        self.ladders = _compile_ladders(SWOT_LADDERS)
+        self.threat_ladders = _compile_ladders(THREAT_LADDERS)
+        self.late_threat_ladders = _compile_ladders(LATE_THREAT_LADDERS)
+        self.sector_threats = [(_compile_sector_matcher(spec), threats) for spec, threats in SECTOR_THREATS]
+        self.fields = sorted({field for field, _ in self.ladders + self.threat_ladders + self.late_threat_ladders})
+
+    def columns(self, records: Sequence[Dict]) -> Dict[str, np.ndarray]:
+        """Column arrays (float64) for every field the rules read"""
+        columns = {}
+        for field in self.fields:
+            default = FIELD_DEFAULTS.get(field, 0.0)
+            values = np.array([to_float(r.get(field), default) for r in records], dtype=np.float64)
+            if field in FIELD_DEFAULTS:
+                values[values == 0] = default
+            columns[field] = values
+        return columns
+
+    @staticmethod
+    def _choose(rungs, x: np.ndarray) -> np.ndarray:
+        """Index of the first matching rung per row (-1 if none)"""
+        choice = np.full(len(x), -1)
+        unmatched = np.ones(len(x), dtype=bool)
+        for idx, (condition, _, _) in enumerate(rungs):
+            hit = condition(x) & unmatched
+            choice[hit] = idx
+            unmatched &= ~hit
+        return choice
+
+    def _apply(self, ladders, columns, results):
+        for field, rungs in ladders:
+            x = columns[field]
+            choice = self._choose(rungs, x)
+            for row in np.flatnonzero(choice >= 0):
+                _, quadrant, message = rungs[choice[row]]
+                results[row][quadrant].append(message.format(x=x[row]))
+
+    def _sector_threats(self, sector: str) -> List[str]:
+        for matches, threats in self.sector_threats:
+            if matches(sector):
+                return threats
+        return []
+
+    def buckets(self, records: Sequence[Dict], columns: Dict[str, np.ndarray] = None) -> List[Tuple]:
+        """
+        Per record, the rung chosen in every ladder plus the sector: two records
+        with equal buckets get the same SWOT points (only the quoted figures differ)
+        """
+        if columns is None:
+            columns = self.columns(records)
+        choices = [self._choose(rungs, columns[field]).tolist()
+                   for field, rungs in self.ladders + self.threat_ladders + self.late_threat_ladders]
+        return [tuple(choice[row] for choice in choices) + (r.get('sector') or '',)
+                for row, r in enumerate(records)]
+
+    def evaluate(self, records: Sequence[Dict], columns: Dict[str, np.ndarray] = None) -> List[Dict[str, List[str]]]:
+        """SWOT quadrants for each record (same order as `records`)"""
+        if columns is None:
+            columns = self.columns(records)
+        results = [{STRENGTH: [], WEAKNESS: [], OPPORTUNITY: [], THREAT: []} for _ in records]
+
+        self._apply(self.ladders, columns, results)
+        self._apply(self.threat_ladders, columns, results)
+
+        sectors = [r.get('sector') or '' for r in records]
+        sector_threats = {sector: self._sector_threats(sector) for sector in set(sectors)}
+        for result, sector in zip(results, sectors):
+            if sector:
+                result[OPPORTUNITY].append(SECTOR_OPPORTUNITY.format(sector=sector))
+            result[THREAT].extend(sector_threats[sector])
+
+        self._apply(self.late_threat_ladders, columns, results)
+
+        for result in results:
+            if not result[OPPORTUNITY]:
+                result[OPPORTUNITY] = list(GENERIC_OPPORTUNITIES)
+            if len(result[STRENGTH]) < 3:
+                result[STRENGTH].extend(GENERIC_STRENGTHS)
+            if len(result[WEAKNESS]) < 3:
+                result[WEAKNESS].extend(GENERIC_WEAKNESSES)
+            result[THREAT].extend(GENERIC_THREATS)
+            result[STRENGTH] = result[STRENGTH][:MAX_ITEMS]
+            result[WEAKNESS] = result[WEAKNESS][:MAX_ITEMS]
+            result[OPPORTUNITY] = result[OPPORTUNITY][:MAX_ITEMS]
+            result[THREAT] = result[THREAT][:MAX_ITEMS]
+        return results
+
+
+# Compiled once at import
+engine = SWOTRuleEngine()
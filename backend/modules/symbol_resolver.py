@@ -0,0 +1,87 @@
+"""
+Symbol Resolver Module
+Persistent symbol -> screener.in company URL table.
+
+Remembers which URL variant worked for a symbol (standalone company page,
+consolidated page or a search result) so repeat lookups go straight to the
+right page. Symbols screener.in does not know are cached negatively for a
+while so they fail without any network round trip.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from .database import db_connection
+
+# Sentinel returned by lookup() for negatively cached symbols
+UNKNOWN = object()
+
+NEGATIVE_TTL = timedelta(hours=24)
+
+
+class SymbolResolver:
+    """SQLite-backed resolution table with an in-process read-through copy"""
+
+    def __init__(self, negative_ttl: timedelta = NEGATIVE_TTL):
+        self.negative_ttl = negative_ttl
+        self._memory: Dict[str, Tuple[Optional[str], datetime]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, symbol: str):
+        """
+        Return the cached company URL for a symbol, UNKNOWN if the symbol is
+        negatively cached, or None if it has not been resolved yet.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self._memory.get(symbol)
+
+        if entry is None:
+            with db_connection() as conn:
+                row = conn.execute("SELECT url, updated_at FROM symbol_urls WHERE symbol = ?", (symbol,)).fetchone()
+            if not row:
+                return None
+            entry = (row['url'], datetime.fromisoformat(row['updated_at']))
+            with self._lock:
+                self._memory[symbol] = entry
+
+        url, updated_at = entry
+        if url:
+            return url
+        if datetime.now() - updated_at < self.negative_ttl:
+            return UNKNOWN
+
+        # Negative entry expired - resolve again
+        self.invalidate(symbol)
+        return None
+
+    def _store(self, symbol: str, url: Optional[str], variant: str):
+        symbol = symbol.upper()
+        now = datetime.now()
+        with db_connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO symbol_urls (symbol, url, variant, updated_at)
+                VALUES (?, ?, ?, ?)
+            """, (symbol, url, variant, now.isoformat()))
+        with self._lock:
+            self._memory[symbol] = (url, now)
+
+    def record(self, symbol: str, url: str, variant: str):
+        """Remember the URL that worked ('standalone', 'consolidated' or 'search')"""
+        self._store(symbol, url, variant)
+
+    def record_missing(self, symbol: str):
+        """Negatively cache a symbol screener.in does not know"""
+        self._store(symbol, None, 'missing')
+
+    def invalidate(self, symbol: str):
+        """Forget a symbol (e.g. its cached URL stopped working)"""
+        symbol = symbol.upper()
+        with db_connection() as conn:
+            conn.execute("DELETE FROM symbol_urls WHERE symbol = ?", (symbol,))
+        with self._lock:
+            self._memory.pop(symbol, None)
+
+
+# Shared by every ScreenerScraper instance in the process
+resolver = SymbolResolver()
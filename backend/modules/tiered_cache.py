@@ -0,0 +1,321 @@
+"""
+Tiered Cache Module
+One cache interface for every module, shared across gunicorn workers.
+
+- L1: bounded in-process LRU per namespace.
+- L2: local SQLite file in WAL mode (CACHE_DB_PATH, default cache/cache.db).
+  Every worker on the host reads and writes it, and it survives restarts.
+
+Entries carry fetched_at / expires_at metadata. get() returns expired
+entries as well, so callers can serve stale data (see revalidate). Values
+are stored as zlib-compressed JSON; ResultTable values round-trip through
+their dict form.
+
+L1 copies are re-checked against L2 after L1_MAX_AGE_SECONDS, so a refresh
+done by another worker is picked up quickly. Expired entries stay in L1 for
+the namespace's stale-serving window (L1_STALE_GRACE), so serving stale data
+does not cost an L2 read per request.
+
+Usage:
+    cache.set('financials', 'TCS', data, expires_at=...)
+    entry = cache.get('financials', 'TCS')   # CacheEntry or None
+    entry.value, entry.fetched_at, entry.expires_at
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+from .market_hours import IST
+from .result_table import ResultTable
+from .metrics import span
+
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', os.path.join('cache', 'cache.db'))
+
+NAMESPACES = ('financials', 'history', 'swot', 'quotes', 'tweets')
+
+# L1 entries per namespace
+L1_SIZES = {'financials': 512, 'history': 256, 'swot': 512, 'quotes': 16, 'tweets': 256}
+DEFAULT_L1_SIZE = 256
+L1_MAX_AGE_SECONDS = 30
+
+# How long past expiry L1 keeps serving an entry; matches the callers' grace
+# windows (FINANCIALS_GRACE, HISTORY_GRACE, SWOT_GRACE)
+L1_STALE_GRACE = {'financials': timedelta(hours=1), 'history': timedelta(hours=1), 'swot': timedelta(hours=18)}
+
+# Expired L2 entries are kept this long for stale serving before purge_expired() drops them
+RETAIN_AFTER_EXPIRY = timedelta(days=7)
+
+# Age buckets reported by stats(): (label, upper bound in seconds)
+AGE_BUCKETS = (('1m', 60), ('15m', 900), ('1h', 3600), ('6h', 21600), ('1d', 86400), ('7d', 604800))
+
+# Values smaller than this are stored uncompressed
+COMPRESS_MIN_BYTES = 512
+
+_TYPE_KEY = '__type__'
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fetched_at: datetime
+    expires_at: datetime
+
+
+def _encode_default(obj):
+    if isinstance(obj, ResultTable):
+        return {_TYPE_KEY: 'ResultTable', **obj.to_dict()}
+    raise TypeError(f"Cannot cache {type(obj).__name__}")
+
+
+def _decode_hook(obj):
+    if obj.get(_TYPE_KEY) == 'ResultTable':
+        return ResultTable.from_dict(obj)
+    return obj
+
+
+def serialize(value) -> bytes:
+    raw = json.dumps(value, default=_encode_default, separators=(',', ':')).encode()
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return b'z' + zlib.compress(raw)
+    return b'j' + raw
+
+
+def deserialize(blob: bytes):
+    blob = bytes(blob)
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b'z' else blob[1:]
+    return json.loads(raw, object_hook=_decode_hook)
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, IST)
+
+
+class TieredCache:
+    """Namespaced L1 LRU + L2 SQLite cache"""
+
+    def __init__(self, path: str = CACHE_DB_PATH):
+        self.path = path
+        self._l1: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {ns: self._new_stats() for ns in NAMESPACES}
+
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread L2 connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at)")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _new_stats() -> Dict[str, int]:
+        return {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'purged': 0}
+
+    def _count(self, namespace: str, stat: str, amount: int = 1):
+        with self._lock:
+            self._count_locked(namespace, stat, amount)
+
+    def _count_locked(self, namespace: str, stat: str, amount: int = 1):
+        """_count for callers already holding self._lock"""
+        stats = self._stats.setdefault(namespace, self._new_stats())
+        stats[stat] += amount
+
+    def _l1_put(self, namespace: str, key: str, entry: CacheEntry):
+        with self._lock:
+            lru = self._l1.setdefault(namespace, OrderedDict())
+            lru[key] = (entry, time.monotonic())
+            lru.move_to_end(key)
+            while len(lru) > L1_SIZES.get(namespace, DEFAULT_L1_SIZE):
+                lru.popitem(last=False)
+                self._count_locked(namespace, 'evictions')
+
+    def _l1_get(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        """L1 entry if it is within its grace window and was loaded recently enough to trust"""
+        with self._lock:
+            lru = self._l1.get(namespace)
+            item = lru.get(key) if lru else None
+            if item is None:
+                return None
+            entry, loaded = item
+            grace = L1_STALE_GRACE.get(namespace, timedelta(0))
+            if time.monotonic() - loaded > L1_MAX_AGE_SECONDS or datetime.now(IST) >= entry.expires_at + grace:
+                return None
+            lru.move_to_end(key)
+            self._count_locked(namespace, 'l1_hits')
+            return entry
+
+    def get(self, namespace: str, key: str, skip_l1: bool = False) -> Optional[CacheEntry]:
+        """Cached entry (possibly expired) or None"""
+        return self.get_many(namespace, [key], skip_l1).get(key)
+
+    def get_many(self, namespace: str, keys: Iterable[str], skip_l1: bool = False) -> Dict[str, CacheEntry]:
+        """
+        Entries for several keys; L1 misses are read from L2 in one query.
+        `skip_l1` reads every key from L2, to see what other workers stored since.
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            entry = None if skip_l1 else self._l1_get(namespace, key)
+            if entry is not None:
+                found[key] = entry
+            else:
+                missing.append(key)
+        if not missing:
+            return found
+
+        placeholders = ','.join('?' * len(missing))
+        with span('cache.l2_read'):
+            rows = self._conn().execute(
+                f"SELECT key, value, fetched_at, expires_at FROM cache_entries WHERE namespace = ? AND key IN ({placeholders})",
+                [namespace, *missing]
+            ).fetchall()
+            for key, value, fetched_at, expires_at in rows:
+                entry = CacheEntry(deserialize(value), _to_datetime(fetched_at), _to_datetime(expires_at))
+                self._l1_put(namespace, key, entry)
+                found[key] = entry
+                self._count(namespace, 'l2_hits')
+        if len(missing) > len(rows):
+            self._count(namespace, 'misses', len(missing) - len(rows))
+        return found
+
+    def set(self, namespace: str, key: str, value, ttl: Optional[timedelta] = None,
+            expires_at: Optional[datetime] = None, fetched_at: Optional[datetime] = None) -> CacheEntry:
+        """Store a value in both tiers; give either `ttl` or `expires_at`"""
+        fetched_at = fetched_at or datetime.now(IST)
+        expires_at = expires_at or fetched_at + (ttl or timedelta(0))
+        conn = self._conn()
+        conn.execute("""
+            INSERT OR REPLACE INTO cache_entries (namespace, key, value, fetched_at, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (namespace, key, serialize(value), fetched_at.timestamp(), expires_at.timestamp()))
+        conn.commit()
+        entry = CacheEntry(value, fetched_at, expires_at)
+        self._l1_put(namespace, key, entry)
+        self._count(namespace, 'sets')
+        return entry
+
+    def delete(self, namespace: str, key: str):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+        conn.commit()
+        with self._lock:
+            self._l1.get(namespace, {}).pop(key, None)
+
+    def purge(self, namespace: Optional[str] = None) -> int:
+        """Drop every entry (of one namespace, or all); returns L2 rows removed"""
+        conn = self._conn()
+        if namespace:
+            cursor = conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+        else:
+            cursor = conn.execute("DELETE FROM cache_entries")
+        conn.commit()
+        with self._lock:
+            if namespace:
+                self._l1.pop(namespace, None)
+            else:
+                self._l1.clear()
+        self._count(namespace or '*', 'purged', cursor.rowcount)
+        return cursor.rowcount
+
+    def purge_symbol(self, symbol: str) -> Dict[str, int]:
+        """
+        Drop every entry for a symbol, in all namespaces. Keys are the symbol
+        itself or carry it as one ':'-separated part ('TCS:1y', 'ETMarkets:TCS').
+        Returns L2 rows removed per namespace.
+        """
+        symbol = symbol.upper()
+        escaped = symbol.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        condition = "(key = ? OR key LIKE ? ESCAPE '\\' OR key LIKE ? ESCAPE '\\')"
+        params = [symbol, f"{escaped}:%", f"%:{escaped}"]
+        conn = self._conn()
+        rows = conn.execute(
+            f"SELECT namespace, key FROM cache_entries WHERE {condition}", params
+        ).fetchall()
+        conn.execute(f"DELETE FROM cache_entries WHERE {condition}", params)
+        conn.commit()
+
+        removed: Dict[str, int] = {}
+        with self._lock:
+            for namespace, key in rows:
+                removed[namespace] = removed.get(namespace, 0) + 1
+                self._l1.get(namespace, {}).pop(key, None)
+        for namespace, count in removed.items():
+            self._count(namespace, 'purged', count)
+        return removed
+
+    def purge_expired(self, retain: timedelta = RETAIN_AFTER_EXPIRY) -> int:
+        """Drop L2 entries that expired more than `retain` ago"""
+        conn = self._conn()
+        cursor = conn.execute("DELETE FROM cache_entries WHERE expires_at < ?",
+                              ((datetime.now(IST) - retain).timestamp(),))
+        conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Per namespace: hit/miss counters and ratios (this process), L1 entries
+        (this process), L2 entries, bytes, expired entries and the age
+        distribution (shared by all workers).
+        """
+        now = datetime.now(IST).timestamp()
+        bucket_sql = ", ".join(
+            f"SUM(CASE WHEN ? - fetched_at < {seconds} THEN 1 ELSE 0 END)" for _, seconds in AGE_BUCKETS
+        )
+        rows = self._conn().execute(f"""
+            SELECT namespace, COUNT(*), SUM(LENGTH(value)), SUM(CASE WHEN expires_at <= ? THEN 1 ELSE 0 END), {bucket_sql}
+            FROM cache_entries GROUP BY namespace
+        """, [now] + [now] * len(AGE_BUCKETS)).fetchall()
+        l2 = {row[0]: row[1:] for row in rows}
+        with self._lock:
+            l1 = {namespace: len(lru) for namespace, lru in self._l1.items()}
+            counted = {namespace: dict(counters) for namespace, counters in self._stats.items()}
+
+        result = {}
+        for namespace in sorted(set(NAMESPACES) | set(l2) | set(counted) - {'*'}):
+            counters = counted.get(namespace, self._new_stats())
+            lookups = counters['l1_hits'] + counters['l2_hits'] + counters['misses']
+            count, size, expired, *cumulative = l2.get(namespace, (0, 0, 0) + (0,) * len(AGE_BUCKETS))
+            # Cumulative "younger than" counts -> per-bucket counts
+            ages, previous = {}, 0
+            for (label, _), within in zip(AGE_BUCKETS, cumulative):
+                ages[label] = (within or 0) - previous
+                previous = within or 0
+            ages['older'] = count - previous
+            result[namespace] = dict(
+                counters,
+                hit_ratio=round((counters['l1_hits'] + counters['l2_hits']) / lookups, 3) if lookups else None,
+                l1_hit_ratio=round(counters['l1_hits'] / lookups, 3) if lookups else None,
+                l1_entries=l1.get(namespace, 0),
+                l2_entries=count,
+                l2_bytes=size or 0,
+                expired_entries=expired or 0,
+                age_distribution=ages
+            )
+        return result
+
+
+# Shared by every module in the process
+cache = TieredCache()
@@ -0,0 +1,328 @@
+"""
+Upstream Fixtures Module
+Record/replay of upstream HTTP traffic, so performance work can be measured
+reproducibly and offline.
+
+Every upstream client (requests.get for screener.in and Twitter, yfinance,
+nsepython, bsedata) sends through requests' HTTPAdapter, so that is where
+the hook sits:
+
+- record: requests go out as usual and every response is saved to
+  FIXTURES_DIR/<host>/<key>.json
+- replay: requests are redirected to a local stand-in server that serves
+  the saved responses, optionally with injected latency and errors; a
+  request without a fixture gets a 502 (X-Fixture-Miss: 1)
+
+The fixture key covers the method, host, path, sorted query (without
+volatile parameters such as Yahoo's crumb) and the request body. Request
+headers are never stored, and response headers that set or ask for
+credentials (cookies, auth challenges) are dropped, so recorded fixtures
+carry no credentials.
+
+Usage:
+    UPSTREAM_MODE=record python app.py                  # or:
+    python -m modules.upstream_fixtures record TCS INFY
+    python -m modules.upstream_fixtures serve --port 8765 --latency-ms 150 --error-rate 0.05
+    UPSTREAM_MODE=replay STANDIN_URL=http://127.0.0.1:8765 python app.py
+
+    with replaying(latency_ms=100) as server:   # in-process stand-in (benchmarks)
+        scraper.fetch_financial_data('TCS', force_refresh=True)
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from requests.adapters import HTTPAdapter
+
+UPSTREAM_MODE = os.getenv('UPSTREAM_MODE', 'live')   # live | record | replay
+FIXTURES_DIR = os.getenv('FIXTURES_DIR', os.path.join('fixtures', 'upstream'))
+STANDIN_URL = os.getenv('STANDIN_URL', '')
+STANDIN_PORT = 8765
+
+# Query parameters that change between otherwise identical requests
+IGNORED_PARAMS = {'crumb', '_', 'cb'}
+
+# Not replayed: the stand-in sends the decoded body with its own framing, date and server
+_DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection', 'keep-alive',
+                    'date', 'server'}
+
+# Never stored: session cookies, tokens and auth challenges
+_CREDENTIAL_HEADERS = {'set-cookie', 'set-cookie2', 'cookie', 'authorization', 'proxy-authorization',
+                       'www-authenticate', 'proxy-authenticate', 'x-csrftoken', 'x-csrf-token', 'x-auth-token',
+                       'x-api-key'}
+
+_original_send = HTTPAdapter.send
+
+
+def fixture_key(method: str, url: str, body=None) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    digest = hashlib.sha1(f"{method.upper()} {parts.netloc.lower()}{parts.path}?{urlencode(query)}".encode())
+    if body:
+        digest.update(body if isinstance(body, bytes) else str(body).encode())
+    return digest.hexdigest()[:20]
+
+
+def fixture_path(host: str, key: str, directory: str = FIXTURES_DIR) -> str:
+    return os.path.join(directory, host.lower(), f"{key}.json")
+
+
+def save_fixture(request, response, directory: str = FIXTURES_DIR) -> str:
+    """Store a response under its request's key; returns the fixture path"""
+    host = urlsplit(request.url).netloc
+    path = fixture_path(host, fixture_key(request.method, request.url, request.body), directory)
+    content = response.content
+    try:
+        body = {"body": content.decode('utf-8')}
+    except UnicodeDecodeError:
+        body = {"body_base64": base64.b64encode(content).decode('ascii')}
+    fixture = {
+        "request": {"method": request.method, "url": request.url},
+        "response": {
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS | _CREDENTIAL_HEADERS},
+            **body,
+        },
+        "recorded_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(fixture, f, indent=1)
+    os.replace(tmp, path)
+    return path
+
+
+def load_fixture(host: str, key: str, directory: str = FIXTURES_DIR) -> Optional[Dict]:
+    try:
+        with open(fixture_path(host, key, directory)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def response_body(response: Dict) -> bytes:
+    """Body of a recorded response; binary bodies are stored as body_base64"""
+    if 'body_base64' in response:
+        return base64.b64decode(response['body_base64'])
+    return response['body'].encode('utf-8')
+
+
+# Stand-in server
+
+class StandInServer(ThreadingHTTPServer):
+    """Serves recorded fixtures at /<host>/<key>, with injected latency and errors"""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = STANDIN_PORT, directory: str = FIXTURES_DIR, latency_ms: float = 0,
+                 jitter_ms: float = 0, error_rate: float = 0, error_status: int = 503,
+                 reset_rate: float = 0, host_latency_ms: Optional[Dict[str, float]] = None):
+        super().__init__(('127.0.0.1', port), _StandInHandler)
+        self.directory = directory
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.reset_rate = reset_rate
+        self.host_latency_ms = host_latency_ms or {}
+        self.counts = {'hits': 0, 'misses': 0, 'errors': 0, 'resets': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def delay(self, host: str) -> float:
+        latency = self.host_latency_ms.get(host, self.latency_ms)
+        return max(0.0, latency + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='upstream-standin', daemon=True)
+        thread.start()
+        return thread
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        server: StandInServer = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        _, host, key = (self.path.split('?', 1)[0].split('/') + ['', ''])[:3]
+
+        time.sleep(server.delay(host))
+        roll = random.random()
+        if roll < server.reset_rate:
+            # Drop the connection without a response (network failure)
+            server.count('resets')
+            self.close_connection = True
+            self.connection.close()
+            return
+        if roll < server.reset_rate + server.error_rate:
+            server.count('errors')
+            self._send(server.error_status, {'Content-Type': 'text/plain'}, b'injected error')
+            return
+
+        fixture = load_fixture(host, key, server.directory)
+        if fixture is None:
+            server.count('misses')
+            print(f"Stand-in: no fixture for {self.headers.get('X-Original-Url') or self.path}")
+            self._send(502, {'Content-Type': 'text/plain', 'X-Fixture-Miss': '1'}, b'no recorded fixture')
+            return
+        server.count('hits')
+        recorded = fixture['response']
+        self._send(recorded['status'], recorded['headers'], response_body(recorded), recorded.get('reason'))
+
+    def _send(self, status: int, headers: Dict[str, str], body: bytes, reason: Optional[str] = None):
+        self.send_response(status, reason)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_HEAD = _respond
+
+
+# Hooks
+
+def _recording_send(adapter, request, **kwargs):
+    response = _original_send(adapter, request, **kwargs)
+    try:
+        save_fixture(request, response)
+    except Exception as e:
+        print(f"Could not record fixture for {request.url}: {e}")
+    return response
+
+
+def _replay_sender(standin_url: str):
+    def send(adapter, request, **kwargs):
+        original_url = request.url
+        host = urlsplit(original_url).netloc.lower()
+        request.url = f"{standin_url}/{host}/{fixture_key(request.method, original_url, request.body)}"
+        request.headers['X-Original-Url'] = original_url
+        try:
+            response = _original_send(adapter, request, **kwargs)
+        finally:
+            request.url = original_url
+            del request.headers['X-Original-Url']
+        response.url = original_url
+        return response
+    return send
+
+
+def install(mode: str = UPSTREAM_MODE, standin_url: str = STANDIN_URL) -> Optional[StandInServer]:
+    """
+    Route all upstream HTTP through record or replay mode ('live' undoes it).
+    Replay without a stand-in URL starts an in-process stand-in, which is returned.
+    """
+    server = None
+    if mode == 'record':
+        HTTPAdapter.send = _recording_send
+    elif mode == 'replay':
+        if not standin_url:
+            server = StandInServer(port=0)
+            server.start()
+            standin_url = server.url
+        HTTPAdapter.send = _replay_sender(standin_url.rstrip('/'))
+    elif mode == 'live':
+        HTTPAdapter.send = _original_send
+    else:
+        raise ValueError(f"Unknown UPSTREAM_MODE {mode!r}, expected live, record or replay")
+    if mode != 'live':
+        print(f"Upstream HTTP in {mode} mode ({standin_url or FIXTURES_DIR})")
+    return server
+
+
+@contextmanager
+def recording():
+    install('record')
+    try:
+        yield
+    finally:
+        install('live')
+
+
+@contextmanager
+def replaying(**standin_options):
+    """Serve upstream calls from fixtures through an in-process stand-in; yields the server"""
+    server = StandInServer(port=0, **standin_options)
+    server.start()
+    install('replay', server.url)
+    try:
+        yield server
+    finally:
+        install('live')
+        server.shutdown()
+        server.server_close()
+
+
+def record_symbols(symbols, period: str = '1y') -> Dict[str, bool]:
+    """Fetch what the benchmarked paths need for each symbol, recording the traffic"""
+    from .screener_scraper import ScreenerScraper
+    from .data_fetcher import DataFetcher
+    from .stock_screener import StockScreener
+    scraper, fetcher, screener = ScreenerScraper(), DataFetcher(), StockScreener()
+    results = {}
+    with recording():
+        for symbol in symbols:
+            financials = scraper.fetch_financial_data(symbol, force_refresh=True)
+            history = fetcher._load_historical_data(symbol, period)
+            basic = screener.fetch_stock_basic_data_yfinance(symbol)
+            results[symbol] = bool(financials and not financials.get('stale') and history and basic)
+            print(f"Recorded {symbol}: financials={bool(financials)} history={bool(history)} info={bool(basic)}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Record upstream fixtures or serve them from a stand-in server")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help="record financials, history and yfinance info for symbols")
+    record.add_argument('symbols', nargs='+')
+    record.add_argument('--period', default='1y')
+
+    serve = commands.add_parser('serve', help="serve recorded fixtures")
+    serve.add_argument('--port', type=int, default=STANDIN_PORT)
+    serve.add_argument('--latency-ms', type=float, default=0)
+    serve.add_argument('--jitter-ms', type=float, default=0)
+    serve.add_argument('--host-latency', action='append', default=[], metavar='HOST=MS',
+                       help="latency for one upstream host, e.g. www.screener.in=400")
+    serve.add_argument('--error-rate', type=float, default=0, help="fraction of requests answered with --error-status")
+    serve.add_argument('--error-status', type=int, default=503)
+    serve.add_argument('--reset-rate', type=float, default=0, help="fraction of connections dropped without a response")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record_symbols([s.upper() for s in args.symbols], period=args.period)
+    else:
+        host_latency = {host.lower(): float(ms) for host, ms in (item.split('=', 1) for item in args.host_latency)}
+        standin = StandInServer(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                error_rate=args.error_rate, error_status=args.error_status,
+                                reset_rate=args.reset_rate, host_latency_ms=host_latency)
+        print(f"Serving fixtures from {FIXTURES_DIR} at {standin.url}")
+        try:
+            standin.serve_forever()
+        except KeyboardInterrupt:
+            print(f"Stand-in stopped: {standin.counts}")
@@ -0,0 +1,215 @@
+"""
+Warm-up Module
+Nightly job that walks the symbol universe so visitors after the close hit
+warm data instead of paying for the scrape, parse and analysis themselves.
+
+For every symbol it refreshes the financials cache (stock details and peer
+comparison come from the same page) and the stored SWOT report; price
+analytics are refreshed for the whole universe in one batch first, and
+long-expired cache entries are purged at the end.
+
+- Bounded concurrency; upstream calls run in the rate limiter's batch lane,
+  so interactive requests are still served first.
+- Progress is checkpointed per symbol in `warmup_progress`: an interrupted
+  run resumes where it stopped. Only one process runs a given day's warm-up.
+
+Usage:
+    python -m modules.warmup [--workers 4] [--restart] [SYMBOL ...]
+
+    start_scheduler('18:00')    # in-process, daily at 18:00 IST
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from .database import db_connection
+from .market_hours import now_ist
+from .rate_limiter import batch_lane
+from .screener_scraper import ScreenerScraper
+from .swot_analyzer import SWOTAnalyzer
+from .price_analytics import price_analytics
+from .tiered_cache import cache
+
+WARMUP_WORKERS = int(os.getenv('WARMUP_WORKERS', '4'))
+
+# A run whose checkpoints stopped this long ago is treated as crashed and can be taken over
+RUN_STALE_AFTER = timedelta(minutes=10)
+
+PROGRESS_EVERY = 10
+
+
+def warmup_universe() -> List[str]:
+    """WARMUP_SYMBOLS (comma separated) if set, else the screener universe"""
+    configured = os.getenv('WARMUP_SYMBOLS')
+    if configured:
+        return [s.strip().upper() for s in configured.split(',') if s.strip()]
+    from .stock_screener import StockScreener
+    return StockScreener().get_indian_stocks_list()
+
+
+class WarmupRun:
+    """One day's warm-up, identified by its IST date"""
+
+    def __init__(self, run_id: Optional[str] = None, workers: int = WARMUP_WORKERS):
+        self.run_id = run_id or now_ist().date().isoformat()
+        self.workers = workers
+        self.scraper = ScreenerScraper()
+        self.swot = SWOTAnalyzer()
+
+    def claim(self, restart: bool = False) -> bool:
+        """
+        Take ownership of the run: start it, or resume it if it was interrupted.
+        Returns False if it already finished or another process is running it.
+        """
+        now = datetime.now()
+        with db_connection() as conn:
+            if restart:
+                conn.execute("DELETE FROM warmup_progress WHERE run_id = ?", (self.run_id,))
+                conn.execute("DELETE FROM warmup_runs WHERE run_id = ?", (self.run_id,))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO warmup_runs (run_id, started_at, updated_at) VALUES (?, ?, ?)",
+                (self.run_id, now.isoformat(), now.isoformat())
+            )
+            if cursor.rowcount == 0:
+                # Existing run: resume it only if it is unfinished and its owner went quiet
+                cursor = conn.execute("""
+                    UPDATE warmup_runs SET updated_at = ?
+                    WHERE run_id = ? AND finished_at IS NULL AND updated_at < ?
+                """, (now.isoformat(), self.run_id, (now - RUN_STALE_AFTER).isoformat()))
+            return cursor.rowcount == 1
+
+    def completed_symbols(self) -> set:
+        with db_connection() as conn:
+            rows = conn.execute(
+                "SELECT symbol FROM warmup_progress WHERE run_id = ? AND status = 'done'", (self.run_id,)
+            ).fetchall()
+            return {row['symbol'] for row in rows}
+
+    def _checkpoint(self, symbol: str, status: str):
+        now = datetime.now().isoformat()
+        with db_connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO warmup_progress (run_id, symbol, status, finished_at)
+                VALUES (?, ?, ?, ?)
+            """, (self.run_id, symbol, status, now))
+            conn.execute("UPDATE warmup_runs SET updated_at = ? WHERE run_id = ?", (now, self.run_id))
+
+    def _finish(self, complete: bool):
+        """Mark the run finished, or release it so failed symbols can be retried right away"""
+        with db_connection() as conn:
+            if complete:
+                conn.execute("UPDATE warmup_runs SET finished_at = ? WHERE run_id = ?",
+                             (datetime.now().isoformat(), self.run_id))
+            else:
+                conn.execute("UPDATE warmup_runs SET updated_at = '' WHERE run_id = ?", (self.run_id,))
+
+    def warm_symbol(self, symbol: str) -> str:
+        """Refresh one symbol's cached data; returns the checkpoint status"""
+        with batch_lane():
+            try:
+                data = self.scraper.fetch_financial_data(symbol, force_refresh=True)
+                if not data or data.get('stale'):
+                    return 'failed'
+                # Regenerated even if the stored report is only stale; reads the
+                # financials cached just above, so there is no second scrape
+                self.swot.analyze(symbol, force_refresh=True)
+                return 'done'
+            except Exception as e:
+                print(f"Warm-up failed for {symbol}: {e}")
+                return 'failed'
+
+    def run(self, symbols: List[str]) -> Dict:
+        """Warm every symbol not already done in this run and report throughput"""
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        done_before = self.completed_symbols()
+        pending = [s for s in symbols if s not in done_before]
+        print(f"Warm-up {self.run_id}: {len(pending)} of {len(symbols)} symbols to go, {self.workers} workers")
+
+        started = time.monotonic()
+        with batch_lane():
+            analytics = price_analytics.refresh(symbols)
+
+        counts = {'done': 0, 'failed': 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.warm_symbol, symbol): symbol for symbol in pending}
+            for completed, future in enumerate(as_completed(futures), start=1):
+                status = future.result()
+                self._checkpoint(futures[future], status)
+                counts[status] += 1
+                if completed % PROGRESS_EVERY == 0:
+                    elapsed = time.monotonic() - started
+                    print(f"Warm-up {self.run_id}: {completed}/{len(pending)} "
+                          f"({completed / elapsed * 60:.1f} symbols/min)")
+
+        self._finish(complete=counts['failed'] == 0)
+        purged = cache.purge_expired()
+        elapsed = time.monotonic() - started
+        stats = {
+            "run_id": self.run_id,
+            "symbols": len(symbols),
+            "skipped": len(symbols) - len(pending),
+            "done": counts['done'],
+            "failed": counts['failed'],
+            "analytics_recomputed": analytics['recomputed'],
+            "cache_entries_purged": purged,
+            "seconds": round(elapsed, 1),
+            "symbols_per_minute": round(len(pending) / elapsed * 60, 1) if elapsed > 0 else 0
+        }
+        print(f"Warm-up {self.run_id} finished: {stats}")
+        return stats
+
+
+def run_warmup(symbols: Optional[List[str]] = None, workers: int = WARMUP_WORKERS,
+               restart: bool = False) -> Optional[Dict]:
+    """Run (or resume) today's warm-up; None if it is done or running elsewhere"""
+    run = WarmupRun(workers=workers)
+    if not run.claim(restart=restart):
+        print(f"Warm-up {run.run_id} already finished or running in another process")
+        return None
+    return run.run(symbols or warmup_universe())
+
+
+def warm_symbols(symbols: List[str], workers: int = WARMUP_WORKERS) -> Dict[str, str]:
+    """Warm a list of symbols now, outside the daily run (no checkpoints); returns status per symbol"""
+    run = WarmupRun(workers=workers)
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(symbols, pool.map(run.warm_symbol, symbols)))
+
+
+def _seconds_until(at: str) -> float:
+    hour, minute = (int(part) for part in at.split(':'))
+    now = now_ist()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def start_scheduler(at: str) -> threading.Thread:
+    """Run the warm-up every day at `at` (HH:MM, IST) on a daemon thread"""
+    def loop():
+        while True:
+            time.sleep(_seconds_until(at))
+            try:
+                run_warmup()
+            except Exception as e:
+                print(f"Scheduled warm-up failed: {e}")
+
+    thread = threading.Thread(target=loop, name='warmup-scheduler', daemon=True)
+    thread.start()
+    print(f"Warm-up scheduled daily at {at} IST")
+    return thread
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Warm caches for the symbol universe")
+    parser.add_argument('symbols', nargs='*', help="symbols to warm (default: WARMUP_SYMBOLS or the screener universe)")
+    parser.add_argument('--workers', type=int, default=WARMUP_WORKERS)
+    parser.add_argument('--restart', action='store_true', help="discard today's checkpoints and start over")
+    args = parser.parse_args()
+    run_warmup([s.upper() for s in args.symbols] or None, workers=args.workers, restart=args.restart)
@@ -0,0 +1,61 @@
+"""
+Shared fixtures. Tests run offline against scratch databases: nothing here
+touches stock_data.db, cache/cache.db or a live upstream.
+
+    cd backend && python -m pytest
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Read at import time by the modules under test
+_scratch = tempfile.mkdtemp(prefix='stock-analysis-tests-')
+os.environ.setdefault('CACHE_DB_PATH', os.path.join(_scratch, 'cache.db'))
+os.environ.setdefault('HOT_PREFETCH', '0')
+os.environ.setdefault('EMAIL_OUTBOX', '0')
+os.environ.setdefault('TOKEN_SWEEP', '0')
+
+import modules.database as database  # noqa: E402
+
+# Anything that runs init_db outside the `db` fixture (importing app) gets a scratch file too
+database.DB_PATH = os.path.join(_scratch, 'stock_data.db')
+
+
+def _drop_connection():
+    conn = getattr(database._local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        del database._local.conn
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_scratch, ignore_errors=True)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, initialised stock_data database for this test"""
+    _drop_connection()
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'stock_data.db'))
+    database.init_db()
+    yield database
+    _drop_connection()
+
+
+@pytest.fixture
+def fresh_cache(tmp_path, monkeypatch):
+    """An empty TieredCache in place of the shared `cache`, in every module that uses it"""
+    import app, modules.data_fetcher, modules.warmup  # noqa: F401 - every cache user, imported before patching
+    from modules import tiered_cache
+    shared, replacement = tiered_cache.cache, tiered_cache.TieredCache(str(tmp_path / 'cache.db'))
+    for name, module in list(sys.modules.items()):
+        if (name == 'app' or name.startswith('modules.')) and getattr(module, 'cache', None) is shared:
+            monkeypatch.setattr(module, 'cache', replacement)
+    return replacement
@@ -0,0 +1,104 @@
+"""Admin cache endpoints: access control, stats, purges and background warming"""
+
+import threading
+from datetime import timedelta
+
+import pytest
+
+from modules import auth
+from modules.auth import generate_jwt_token
+
+HOUR = timedelta(hours=1)
+
+
+@pytest.fixture
+def app_module(fresh_cache):
+    import app as app_module
+    return app_module
+
+
+@pytest.fixture
+def admin_enabled(app_module, monkeypatch):
+    """As if SECRET_KEY were configured and ADMIN_EMAILS listed admin@example.com"""
+    monkeypatch.setattr(auth, 'ADMIN_ENABLED', True)
+    monkeypatch.setattr(auth, 'ADMIN_EMAILS', {'admin@example.com'})
+    monkeypatch.setattr(app_module, 'ADMIN_ENABLED', True)
+
+
+def _headers(email: str) -> dict:
+    return {'Authorization': f"Bearer {generate_jwt_token(1, email)}"}
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def test_admin_claim_needs_a_configured_secret(monkeypatch):
+    monkeypatch.setattr(auth, 'ADMIN_EMAILS', {'admin@example.com'})
+    assert not auth.is_admin_email('admin@example.com')
+    monkeypatch.setattr(auth, 'ADMIN_ENABLED', True)
+    assert auth.is_admin_email('Admin@Example.com')
+    assert not auth.is_admin_email('user@example.com')
+
+
+def test_disabled_without_secret_key(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_ENABLED', False)
+    # Even a token that claims admin, since anyone can sign one with the built-in key
+    forged = auth.jwt.encode({'user_id': 1, 'email': 'x@example.com', 'admin': True}, auth.SECRET_KEY, algorithm='HS256')
+    response = client.get('/api/admin/cache', headers={'Authorization': f"Bearer {forged}"})
+    assert response.status_code == 403
+    assert 'SECRET_KEY' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('method, path', [
+    ('GET', '/api/admin/cache'),
+    ('DELETE', '/api/admin/cache/all'),
+    ('DELETE', '/api/admin/cache/symbol/TCS'),
+    ('POST', '/api/admin/cache/warm'),
+    ('GET', '/api/admin/profiles'),
+])
+def test_requires_an_admin_session(client, admin_enabled, method, path):
+    assert client.open(path, method=method).status_code == 401
+    assert client.open(path, method=method, headers=_headers('user@example.com')).status_code == 403
+
+
+def test_stats_and_purges(client, admin_enabled, fresh_cache):
+    fresh_cache.set('financials', 'TCS', {'pe': 20}, ttl=HOUR)
+    fresh_cache.set('history', 'TCS:1y', [1, 2], ttl=HOUR)
+    fresh_cache.set('history', 'INFY:1y', [3], ttl=HOUR)
+    fresh_cache.set('quotes', 'NIFTY 50', {'v': 1}, ttl=HOUR)
+    headers = _headers('admin@example.com')
+
+    stats = client.get('/api/admin/cache', headers=headers).get_json()
+    assert stats['success'] is True
+    assert (stats['data']['history']['l2_entries'], stats['data']['quotes']['l2_entries']) == (2, 1)
+
+    response = client.delete('/api/admin/cache/symbol/tcs', headers=headers).get_json()
+    assert (response['symbol'], response['removed']) == ('TCS', {'financials': 1, 'history': 1})
+    assert fresh_cache.get('history', 'INFY:1y') is not None
+
+    assert client.delete('/api/admin/cache/nope', headers=headers).status_code == 400
+    assert client.delete('/api/admin/cache/quotes', headers=headers).get_json()['removed'] == 1
+    assert client.delete('/api/admin/cache/all', headers=headers).get_json()['removed'] == 1
+    assert fresh_cache.get('history', 'INFY:1y') is None
+
+
+def test_warm_runs_in_the_background(client, admin_enabled, app_module, monkeypatch):
+    warmed, done = [], threading.Event()
+
+    def warm(symbols):
+        warmed.extend(symbols)
+        done.set()
+
+    monkeypatch.setattr(app_module, 'warm_symbols', warm)
+    headers = _headers('admin@example.com')
+
+    assert client.post('/api/admin/cache/warm', json={'symbols': []}, headers=headers).status_code == 400
+    too_many = [f"S{i}" for i in range(app_module.MAX_WARM_SYMBOLS + 1)]
+    assert client.post('/api/admin/cache/warm', json={'symbols': too_many}, headers=headers).status_code == 400
+
+    response = client.post('/api/admin/cache/warm', json={'symbols': ['tcs', 'TCS', 'infy']}, headers=headers)
+    assert response.status_code == 202
+    assert response.get_json()['queued'] == ['TCS', 'INFY']
+    assert done.wait(5) and warmed == ['TCS', 'INFY']
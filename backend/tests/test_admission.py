@@ -0,0 +1,83 @@
+"""AdmissionController limits, and the 429/503 + Retry-After responses of admission_control"""
+
+import threading
+
+import pytest
+
+from modules import admission as admission_module
+from modules.admission import AdmissionController, AdmissionPolicy, AdmissionRejected
+
+POLICIES = {'heavy': AdmissionPolicy(user_concurrency=1, global_concurrency=1, rate=0.1, burst=2, queue_seconds=0.05)}
+
+
+def test_quota_exhausted_is_429_with_retry_after():
+    controller = AdmissionController(POLICIES)
+    for _ in range(2):
+        with controller.admit('heavy', 'alice'):
+            pass
+    with pytest.raises(AdmissionRejected) as error:
+        with controller.admit('heavy', 'alice'):
+            pass
+    assert error.value.status == 429
+    # One token every 10s
+    assert 1 <= error.value.retry_after <= 10
+
+    # Quotas are per user
+    with controller.admit('heavy', 'bob'):
+        pass
+
+
+def test_user_concurrency_is_429():
+    controller = AdmissionController(POLICIES)
+    with controller.admit('heavy', 'alice'):
+        with pytest.raises(AdmissionRejected) as error:
+            with controller.admit('heavy', 'alice'):
+                pass
+    assert (error.value.status, error.value.retry_after) == (429, admission_module.BUSY_RETRY_SECONDS)
+    # The rejected attempt did not leave a slot held
+    assert controller._active == {}
+
+
+def test_full_global_queue_is_503():
+    controller = AdmissionController(POLICIES)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with controller.admit('heavy', 'alice'):
+            holding.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    holding.wait(5)
+    try:
+        with pytest.raises(AdmissionRejected) as error:
+            with controller.admit('heavy', 'bob'):
+                pass
+        assert (error.value.status, error.value.retry_after) == (503, 1)
+    finally:
+        release.set()
+        thread.join()
+    assert controller.stats()['heavy'] == {'in_use': 0, 'waiting': 0, 'limit': 1}
+
+
+def test_route_returns_429_with_retry_after(monkeypatch):
+    import app as app_module
+    from modules.auth import generate_jwt_token
+
+    controller = AdmissionController(dict(admission_module.POLICIES))
+    monkeypatch.setattr(app_module, 'admission', controller)
+    email = 'quota@example.com'
+    bucket = controller._bucket('historical_max', email)
+    while bucket.try_acquire() == 0:
+        pass
+
+    client = app_module.app.test_client()
+    headers = {'Authorization': f"Bearer {generate_jwt_token(1, email)}"}
+    response = client.get('/api/historical/TCS?period=all', headers=headers)
+
+    assert response.status_code == 429
+    body = response.get_json()
+    assert body['success'] is False
+    assert response.headers['Retry-After'] == str(body['retry_after'])
+    assert int(response.headers['Retry-After']) >= 1
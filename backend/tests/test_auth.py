@@ -0,0 +1,84 @@
+"""JWTVerifier: cached verification ends at the token's exp"""
+
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+
+from modules import auth
+from modules.auth import JWTVerifier
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=time.time())
+    monkeypatch.setattr(auth, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Signature checks actually performed (cache misses)"""
+    calls = []
+    decode = auth._decode_jwt_token
+
+    def counting(token):
+        calls.append(token)
+        return decode(token)
+
+    monkeypatch.setattr(auth, '_decode_jwt_token', counting)
+    return calls
+
+
+def _token(exp: float, secret: str = auth.SECRET_KEY) -> str:
+    return jwt.encode({'user_id': 1, 'email': 'user@example.com', 'exp': int(exp)}, secret, algorithm='HS256')
+
+
+def test_verified_tokens_are_cached_until_exp(clock, decodes):
+    verifier = JWTVerifier()
+    token = _token(clock.now + 60)
+
+    assert verifier.verify(token)['user_id'] == 1
+    assert verifier.verify(token)['email'] == 'user@example.com'
+    assert len(decodes) == 1
+
+    clock.now += 59
+    assert verifier.verify(token) is not None
+    clock.now += 1
+    assert verifier.verify(token) is None
+    assert verifier.verify(token) is None
+    assert len(decodes) == 1
+
+
+def test_cached_payload_is_a_copy(clock, decodes):
+    verifier = JWTVerifier()
+    token = _token(clock.now + 60)
+    verifier.verify(token)['admin'] = True
+    assert 'admin' not in verifier.verify(token)
+
+
+def test_rejections_are_cached_briefly(clock, decodes):
+    verifier = JWTVerifier(reject_ttl=60)
+    forged = _token(clock.now + 60, secret='not-the-secret')
+
+    assert verifier.verify(forged) is None
+    assert verifier.verify(forged) is None
+    assert len(decodes) == 1
+    clock.now += 60
+    assert verifier.verify(forged) is None
+    assert len(decodes) == 2
+
+
+def test_cache_is_bounded(clock, decodes):
+    verifier = JWTVerifier(size=2)
+    tokens = [_token(clock.now + 60 + i) for i in range(3)]
+    for token in tokens:
+        verifier.verify(token)
+    verifier.verify(tokens[0])
+    assert len(decodes) == 4
+
+
+def test_non_string_tokens_are_rejected(decodes):
+    assert JWTVerifier().verify(None) is None
+    assert decodes == []
@@ -0,0 +1,145 @@
+"""CircuitBreaker state transitions and guarded_call, on a fake clock"""
+
+import pytest
+
+from modules import circuit_breaker
+from modules.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from modules.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return clock
+
+
+def _breaker(**options) -> CircuitBreaker:
+    settings = dict(window_seconds=60, min_calls=4, failure_ratio=0.5, slow_call_seconds=5, slow_ratio=0.8,
+                    open_seconds=30)
+    settings.update(options)
+    return CircuitBreaker('test', **settings)
+
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        breaker.check()
+        breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = _breaker()
+    for _ in range(breaker.min_calls - 1):
+        breaker.check()
+        breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_failure_ratio(clock):
+    breaker = _breaker()
+    for ok in (True, True, False, False):
+        breaker.check()
+        breaker.record(ok, 0.1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.check()
+    assert error.value.retry_after == pytest.approx(30)
+
+
+def test_opens_on_slow_calls(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.check()
+        breaker.record(True, 6)
+    assert breaker.state == OPEN
+
+
+def test_old_failures_leave_the_window(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    clock.now += 61
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['failures_in_window'] == 0
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now += 1
+    breaker.check()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_successful_probe_closes(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock.now += 30
+    breaker.check()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['calls_in_window'] == 0
+    breaker.check()
+
+
+@pytest.mark.parametrize('ok, latency', [(False, 0.1), (True, 6)])
+def test_failed_or_slow_probe_reopens(clock, ok, latency):
+    breaker = _breaker()
+    _open(breaker)
+    clock.now += 30
+    breaker.check()
+    breaker.record(ok, latency)
+    assert breaker.state == OPEN
+    assert breaker.is_open
+    clock.now += 30
+    assert not breaker.is_open
+
+
+def test_cancel_frees_the_probe(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock.now += 30
+    breaker.check()
+    breaker.cancel()
+    breaker.check()
+    assert breaker.state == HALF_OPEN
+
+
+def test_guarded_call_records_outcomes(clock, monkeypatch):
+    breaker = _breaker()
+    monkeypatch.setattr(circuit_breaker, 'breaker_for', lambda upstream: breaker)
+    bucket = TokenBucket('test-upstream', rate=100, capacity=100)
+    monkeypatch.setattr(circuit_breaker, 'limiter_for', lambda upstream: bucket)
+
+    def fail():
+        raise ConnectionError('down')
+
+    assert circuit_breaker.guarded_call('test-upstream', lambda: 'ok') == 'ok'
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            circuit_breaker.guarded_call('test-upstream', fail)
+    # A returned value flagged by `failed` counts as a failure too
+    circuit_breaker.guarded_call('test-upstream', lambda: 503, failed=lambda status: status >= 500)
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.guarded_call('test-upstream', calls.append, 1)
+    assert calls == []
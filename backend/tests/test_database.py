@@ -0,0 +1,108 @@
+"""Schema setup, MIGRATIONS and the pooled per-thread connections"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from modules import database
+
+
+def _tables(db) -> set:
+    with db.db_connection() as conn:
+        return {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_fresh_database_is_at_latest_version(db):
+    with db.db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+    tables = _tables(db)
+    assert {'users', 'password_tokens', 'email_outbox', 'symbol_urls'} <= tables
+    assert not {'swot_reports', 'job_leases'} & tables
+
+
+def test_migrate_drops_dead_tables_from_an_older_database(db):
+    with db.db_connection() as conn:
+        conn.execute("CREATE TABLE swot_reports (symbol TEXT PRIMARY KEY, swot_data TEXT, created_at TEXT)")
+        conn.execute("INSERT INTO swot_reports VALUES ('TEST1', '{}', '2024-01-01')")
+        conn.execute("CREATE TABLE job_leases (name TEXT PRIMARY KEY)")
+        conn.execute("PRAGMA user_version = 2")
+
+    database.init_db()
+
+    assert not {'swot_reports', 'job_leases'} & _tables(db)
+    with db.db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+
+
+def test_init_db_is_idempotent(db):
+    before = _tables(db)
+    database.init_db()
+    assert _tables(db) == before
+
+
+# Pooled connections
+
+def test_connection_is_reused_per_thread(db):
+    with db.db_connection() as first:
+        pass
+    with db.db_connection() as second:
+        assert second is first
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(_connection_id(db)))
+    thread.start()
+    thread.join()
+    assert other[0] != id(first)
+
+
+def _connection_id(db):
+    with db.db_connection() as conn:
+        return id(conn)
+
+
+def test_connections_are_tuned(db):
+    with db.db_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == database.BUSY_TIMEOUT_SECONDS * 1000
+
+
+def test_nested_blocks_share_one_transaction(db):
+    with db.db_connection() as outer:
+        outer.execute("INSERT INTO stocks (symbol) VALUES ('TEST1')")
+        with db.db_connection() as inner:
+            inner.execute("INSERT INTO stocks (symbol) VALUES ('TEST2')")
+        # The inner block did not commit: another connection cannot see its row yet
+        assert _count_elsewhere(db) == 0
+    assert _count_elsewhere(db) == 2
+
+
+def test_error_rolls_back_the_whole_transaction(db):
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.db_connection() as outer:
+            outer.execute("INSERT INTO stocks (symbol) VALUES ('TEST1')")
+            with db.db_connection() as inner:
+                inner.execute("INSERT INTO stocks (symbol) VALUES ('TEST1')")
+    assert _count_elsewhere(db) == 0
+    # The pooled connection is usable afterwards
+    with db.db_connection() as conn:
+        conn.execute("INSERT INTO stocks (symbol) VALUES ('TEST1')")
+    assert _count_elsewhere(db) == 1
+
+
+def test_forked_child_opens_its_own_connection(db, monkeypatch):
+    with db.db_connection() as parent:
+        pass
+    monkeypatch.setattr(database._local, 'pid', -1)
+    with db.db_connection() as child:
+        assert child is not parent
+
+
+def _count_elsewhere(db) -> int:
+    """Test rows seen by a separate connection (committed data only)"""
+    conn = sqlite3.connect(database.DB_PATH)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM stocks WHERE symbol LIKE 'TEST%'").fetchone()[0]
+    finally:
+        conn.close()
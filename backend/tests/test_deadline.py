@@ -0,0 +1,99 @@
+"""Request deadlines: budget checks, upstream timeouts, and a route that returns on time"""
+
+import threading
+import time
+
+import pytest
+
+from modules import circuit_breaker, data_fetcher, deadline
+from modules.circuit_breaker import CircuitBreaker
+from modules.deadline import DeadlineExceeded, request_deadline
+from modules.rate_limiter import TokenBucket
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    """Fresh breakers and unlimited buckets, so one test's failures do not open another's circuit"""
+    breakers = {}
+    monkeypatch.setattr(circuit_breaker, 'breaker_for',
+                        lambda upstream: breakers.setdefault(upstream, CircuitBreaker(upstream)))
+    bucket = TokenBucket('test-upstream', rate=100, capacity=100)
+    monkeypatch.setattr(circuit_breaker, 'limiter_for', lambda upstream: bucket)
+    return breakers
+
+
+def test_no_deadline_outside_a_request():
+    assert deadline.remaining() is None
+    assert deadline.budget_allows(1000)
+    assert not deadline.exhausted()
+    assert deadline.upstream_timeout() == deadline.UPSTREAM_TIMEOUT
+
+
+def test_budget_and_upstream_timeout_follow_the_deadline():
+    with request_deadline(2):
+        assert deadline.upstream_timeout() <= 2
+        assert deadline.budget_allows(1)
+        assert not deadline.budget_allows(5)
+    with request_deadline(deadline.MIN_CALL_SECONDS / 2):
+        with pytest.raises(DeadlineExceeded):
+            deadline.upstream_timeout()
+    assert deadline.remaining() is None
+
+
+def test_guarded_call_takes_timeout_from_budget(upstreams):
+    with request_deadline(3):
+        timeout = circuit_breaker.guarded_call('test-upstream', lambda timeout: timeout, with_timeout=True)
+    assert 0 < timeout <= 3
+
+    calls = []
+    with request_deadline(deadline.MIN_CALL_SECONDS / 2):
+        with pytest.raises(DeadlineExceeded):
+            circuit_breaker.guarded_call('test-upstream', calls.append, 1, with_timeout=True)
+    assert calls == []
+
+
+def test_call_with_budget_gives_up_on_a_hung_call():
+    release = threading.Event()
+    try:
+        with request_deadline(1):
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                deadline.call_with_budget(release.wait)
+            assert time.monotonic() - started < 1.5
+    finally:
+        release.set()
+    assert deadline.call_with_budget(lambda x: x * 2, 21) == 42
+
+
+def test_index_route_returns_within_its_deadline(monkeypatch, fresh_cache, upstreams):
+    import app as app_module
+    from modules.auth import generate_jwt_token
+
+    release = threading.Event()
+    calls = []
+
+    def hung_quote(name):
+        calls.append(name)
+        release.wait()
+
+    monkeypatch.setattr(data_fetcher, 'NSE_AVAILABLE', True)
+    monkeypatch.setattr(data_fetcher, 'nse_get_index_quote', hung_quote, raising=False)
+    monkeypatch.setattr(app_module.data_fetcher, 'nse', None)
+    monkeypatch.setitem(app_module.ROUTE_DEADLINES, 'get_nifty50', 1)
+
+    client = app_module.app.test_client()
+    headers = {'Authorization': f"Bearer {generate_jwt_token(1, 'deadline@example.com')}"}
+    try:
+        started = time.monotonic()
+        response = client.get('/api/nifty50', headers=headers)
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+
+    assert elapsed < 2
+    assert calls == ['NIFTY 50']
+    assert response.status_code == 200
+    # Mock quote, since nothing was cached
+    assert response.get_json()['data']['index_name'] == 'NIFTY 50'
+    # Cut short by the request budget, so not counted against the upstream
+    assert not upstreams['nse']._calls
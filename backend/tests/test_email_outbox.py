@@ -0,0 +1,187 @@
+"""OutboxSender against an in-process SMTP server: claim, send, backoff and release"""
+
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules import email_outbox
+from modules.email_outbox import OutboxSender
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server: SMTPStandIn = self.server
+        server.connections += 1
+        self.reply('220 standin ESMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().rstrip('\r\n')
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 standin')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                address = line.split(':', 1)[1].strip().strip('<>')
+                if address in server.rejects:
+                    self.reply(server.rejects[address])
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while (chunk := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data.append(chunk)
+                server.messages.append((recipients, b''.join(data)))
+                self.reply('250 OK queued')
+            elif command in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        # recipient -> reply to RCPT TO, e.g. '550 No such user'
+        self.rejects = {}
+
+
+@pytest.fixture
+def smtp():
+    server = SMTPStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _sender(port: int) -> OutboxSender:
+    return OutboxSender(host='127.0.0.1', port=port, user='', password='', starttls=False, dry_run=False)
+
+
+def _row(db, message_id: int) -> dict:
+    with db.db_connection() as conn:
+        return dict(conn.execute("SELECT * FROM email_outbox WHERE id = ?", (message_id,)).fetchone())
+
+
+def test_sends_batch_over_one_connection(db, smtp):
+    sender = _sender(smtp.server_address[1])
+    ids = [sender.enqueue(f"user{i}@example.com", f"Subject {i}", "body", "<p>body</p>") for i in range(3)]
+
+    assert sender.drain() == {'sent': 3, 'failed': 0}
+    sender.close()
+
+    assert [recipients for recipients, _ in smtp.messages] == [[f"user{i}@example.com"] for i in range(3)]
+    assert smtp.connections == 1
+    for message_id in ids:
+        row = _row(db, message_id)
+        assert (row['status'], row['attempts'], row['claimed_by']) == ('sent', 1, None)
+    assert sender.pending_count() == 0
+
+
+def test_claimed_messages_are_not_claimed_by_another_sender(db):
+    first, second = OutboxSender(dry_run=True), OutboxSender(dry_run=True)
+    ids = [first.enqueue(f"user{i}@example.com", "Subject", "body") for i in range(3)]
+
+    assert [m['id'] for m in first._claim(limit=2)] == ids[:2]
+    assert [m['id'] for m in second._claim()] == [ids[2]]
+    assert _row(db, ids[0])['claimed_by'] == first.sender_id
+
+
+def test_stale_claims_are_released(db):
+    crashed, survivor = OutboxSender(dry_run=True), OutboxSender(dry_run=True)
+    message_id = crashed.enqueue('user@example.com', 'Subject', 'body')
+    crashed._claim()
+    stale = (datetime.now() - email_outbox.CLAIM_TIMEOUT - timedelta(seconds=1)).isoformat()
+    with db.db_connection() as conn:
+        conn.execute("UPDATE email_outbox SET claimed_at = ? WHERE id = ?", (stale, message_id))
+
+    assert [m['id'] for m in survivor._claim()] == [message_id]
+
+
+def test_temporary_rejection_backs_off(db, smtp):
+    smtp.rejects['busy@example.com'] = '451 Try again later'
+    sender = _sender(smtp.server_address[1])
+    message_id = sender.enqueue('busy@example.com', 'Subject', 'body')
+    other_id = sender.enqueue('user@example.com', 'Subject', 'body')
+
+    before = datetime.now()
+    assert sender.send_batch() == {'sent': 1, 'failed': 1}
+    row = _row(db, message_id)
+    assert (row['status'], row['attempts'], row['claimed_by']) == ('pending', 1, None)
+    assert '451' in row['last_error']
+    retry_at = datetime.fromisoformat(row['next_attempt_at'])
+    assert retry_at >= before + email_outbox._backoff(1)
+    assert _row(db, other_id)['status'] == 'sent'
+
+    # Not due again until the backoff has passed
+    assert sender.send_batch() == {'sent': 0, 'failed': 0}
+    sender.close()
+
+
+def test_backoff_doubles_up_to_the_cap():
+    assert email_outbox._backoff(1) == timedelta(seconds=email_outbox.BACKOFF_BASE_SECONDS)
+    assert email_outbox._backoff(2) == timedelta(seconds=email_outbox.BACKOFF_BASE_SECONDS * 2)
+    assert email_outbox._backoff(50) == timedelta(seconds=email_outbox.BACKOFF_MAX_SECONDS)
+
+
+def test_permanent_rejection_fails_without_retry(db, smtp):
+    smtp.rejects['gone@example.com'] = '550 No such user'
+    sender = _sender(smtp.server_address[1])
+    message_id = sender.enqueue('gone@example.com', 'Subject', 'body')
+
+    assert sender.send_batch() == {'sent': 0, 'failed': 1}
+    sender.close()
+    row = _row(db, message_id)
+    assert (row['status'], row['attempts']) == ('failed', 1)
+    assert sender.pending_count() == 0
+
+
+def test_last_attempt_gives_up(db, smtp):
+    smtp.rejects['busy@example.com'] = '451 Try again later'
+    sender = _sender(smtp.server_address[1])
+    message_id = sender.enqueue('busy@example.com', 'Subject', 'body')
+    with db.db_connection() as conn:
+        conn.execute("UPDATE email_outbox SET attempts = ? WHERE id = ?", (email_outbox.MAX_ATTEMPTS - 1, message_id))
+
+    sender.send_batch()
+    sender.close()
+    row = _row(db, message_id)
+    assert (row['status'], row['attempts']) == ('failed', email_outbox.MAX_ATTEMPTS)
+
+
+def test_unreachable_relay_releases_rest_of_batch(db, smtp):
+    port = smtp.server_address[1]
+    smtp.shutdown()
+    smtp.server_close()
+    sender = _sender(port)
+    ids = [sender.enqueue(f"user{i}@example.com", "Subject", "body") for i in range(3)]
+
+    assert sender.send_batch() == {'sent': 0, 'failed': 1}
+    first = _row(db, ids[0])
+    assert (first['status'], first['attempts']) == ('pending', 1)
+    for message_id in ids[1:]:
+        row = _row(db, message_id)
+        # Released without counting an attempt, and due immediately
+        assert (row['status'], row['attempts'], row['claimed_by']) == ('pending', 0, None)
+    assert [m['id'] for m in sender._claim()] == ids[1:]
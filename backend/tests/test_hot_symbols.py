@@ -0,0 +1,91 @@
+"""Hot symbol scoring, off-hours expiry and when hot symbols and peers are refetched"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from modules import hot_symbols
+from modules.hot_symbols import DecayedCounter, HotSymbolPrefetcher
+from modules.market_hours import IST, market_expiry, session_date
+from modules.tiered_cache import TieredCache
+
+TTL = timedelta(minutes=15)
+
+
+@pytest.mark.parametrize('fetched_at, expires_at', [
+    # Monday 2026-10-19: during the session, then just before the open, after the close, and on Saturday
+    (datetime(2026, 10, 19, 11, 0), datetime(2026, 10, 19, 11, 15)),
+    (datetime(2026, 10, 19, 9, 14), datetime(2026, 10, 19, 9, 30)),
+    (datetime(2026, 10, 19, 18, 0), datetime(2026, 10, 20, 9, 30)),
+    (datetime(2026, 10, 24, 12, 0), datetime(2026, 10, 26, 9, 30)),
+])
+def test_market_expiry(fetched_at, expires_at):
+    assert market_expiry(fetched_at.replace(tzinfo=IST), TTL) == expires_at.replace(tzinfo=IST)
+
+
+@pytest.mark.parametrize('at, day', [
+    (datetime(2026, 10, 19, 8, 0), date(2026, 10, 19)),
+    (datetime(2026, 10, 19, 12, 0), date(2026, 10, 19)),
+    (datetime(2026, 10, 19, 16, 0), date(2026, 10, 20)),
+    (datetime(2026, 10, 23, 16, 0), date(2026, 10, 26)),
+])
+def test_session_date(at, day):
+    assert session_date(at.replace(tzinfo=IST)) == day
+
+
+def test_counter_ranks_by_decayed_score():
+    counter = DecayedCounter(half_life=60)
+    for _ in range(4):
+        counter.touch('TCS')
+    counter.touch('INFY')
+    assert [symbol for symbol, _ in counter.top(2)] == ['TCS', 'INFY']
+    assert counter.top(5, min_score=2) == [('TCS', pytest.approx(4, rel=0.01))]
+
+
+def _prefetcher(monkeypatch, fetched: list) -> HotSymbolPrefetcher:
+    prefetcher = HotSymbolPrefetcher()
+    monkeypatch.setattr(prefetcher.scraper, 'fetch_financial_data', lambda symbol, force_refresh: fetched.append(symbol))
+    return prefetcher
+
+
+def test_hot_symbols_refresh_only_near_expiry(fresh_cache, monkeypatch):
+    now = datetime.now(IST)
+    fresh_cache.set('financials', 'FRESH', {}, expires_at=now + hot_symbols.REFRESH_LEAD * 2)
+    fresh_cache.set('financials', 'DUE', {}, expires_at=now + hot_symbols.REFRESH_LEAD / 2)
+
+    fetched = []
+    prefetcher = _prefetcher(monkeypatch, fetched)
+    for symbol in ('FRESH', 'DUE', 'UNCACHED'):
+        for _ in range(5):
+            prefetcher.record_access(symbol)
+    prefetcher.record_access('COLD')
+    assert prefetcher.refresh_hot() == 2
+    assert sorted(fetched) == ['DUE', 'UNCACHED']
+
+
+def test_symbols_refreshed_by_another_worker_are_skipped(fresh_cache, monkeypatch):
+    now = datetime.now(IST)
+    fresh_cache.set('financials', 'TCS', {}, expires_at=now + hot_symbols.REFRESH_LEAD / 2)
+    fresh_cache.set('financials', 'INFY', {}, expires_at=now - timedelta(minutes=1))
+    fresh_cache.get_many('financials', ['TCS', 'INFY'])
+
+    # Another worker refreshes both in the shared L2; this worker's L1 still holds the old entries
+    other_worker = TieredCache(fresh_cache.path)
+    other_worker.set('financials', 'TCS', {}, expires_at=now + timedelta(minutes=15))
+    other_worker.set('financials', 'INFY', {}, expires_at=now + timedelta(minutes=15))
+
+    fetched = []
+    prefetcher = _prefetcher(monkeypatch, fetched)
+    for _ in range(5):
+        prefetcher.record_access('TCS', [{'symbol': 'INFY'}])
+    assert prefetcher.run_once() == {'refreshed': 0, 'peers': 0}
+    assert fetched == []
+
+
+def test_peers_are_prefetched_once(fresh_cache, monkeypatch):
+    fetched = []
+    prefetcher = _prefetcher(monkeypatch, fetched)
+    prefetcher.record_access('TCS', [{'symbol': 'INFY'}, {'symbol': 'TCS'}, {'name': 'no symbol'}])
+    prefetcher.record_access('WIPRO', [{'symbol': 'INFY'}])
+    assert prefetcher.prefetch_peers() == 1
+    assert fetched == ['INFY']
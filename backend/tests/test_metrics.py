@@ -0,0 +1,135 @@
+"""Spans, Server-Timing headers and the /metrics endpoint"""
+
+import contextvars
+import re
+import threading
+
+import pytest
+
+from modules import auth, metrics as metrics_module
+from modules.auth import generate_jwt_token
+from modules.metrics import (BUCKETS, MetricsRegistry, end_request_timings, server_timing_header, span,
+                             start_request_timings, timed)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics_module, 'metrics', registry)
+    return registry
+
+
+@pytest.fixture
+def request_timings():
+    token = start_request_timings()
+    yield
+    end_request_timings(token)
+
+
+def test_render_is_prometheus_text(registry):
+    registry.observe('upstream', ('screener.in',), 0.003)
+    registry.observe('upstream', ('screener.in',), 2.0)
+    registry.observe('route', ('/api/x', 'GET', '200'), 0.02)
+    text = registry.render()
+
+    assert '# TYPE upstream_call_duration_seconds histogram' in text
+    assert 'upstream_call_duration_seconds_bucket{upstream="screener.in",le="0.0025"} 0' in text
+    assert 'upstream_call_duration_seconds_bucket{upstream="screener.in",le="0.005"} 1' in text
+    assert 'upstream_call_duration_seconds_bucket{upstream="screener.in",le="+Inf"} 2' in text
+    assert 'upstream_call_duration_seconds_count{upstream="screener.in"} 2' in text
+    assert re.search(r'upstream_call_duration_seconds_sum\{upstream="screener.in"\} 2\.003\d*', text)
+    assert 'http_request_duration_seconds_count{route="/api/x",method="GET",status="200"} 1' in text
+    assert len(re.findall(r'upstream_call_duration_seconds_bucket', text)) == len(BUCKETS) + 1
+
+
+def test_label_values_are_escaped(registry):
+    registry.observe('stage', ('say "hi"\n',), 0.1)
+    assert 'stage="say \\"hi\\"\\n"' in registry.render()
+
+
+def test_spans_outside_a_request_only_feed_histograms(registry):
+    with span('parse.html'):
+        pass
+    assert 'stage_duration_seconds_count{stage="parse.html"} 1' in registry.render()
+    assert server_timing_header() == ''
+
+
+def test_server_timing_sums_repeated_spans(registry, request_timings):
+    @timed('swot.rules')
+    def rules():
+        pass
+
+    rules()
+    rules()
+    with span('screener.in', 'upstream'):
+        pass
+
+    header = server_timing_header(0.25)
+    assert re.fullmatch(r'swot\.rules;dur=\d+\.\d;desc="2 calls", screener\.in;dur=\d+\.\d, total;dur=250\.0', header)
+
+
+def test_names_are_made_header_safe(registry, request_timings):
+    with span('NIFTY 50/quote'):
+        pass
+    assert server_timing_header().startswith('NIFTY-50-quote;dur=')
+
+
+def test_pool_spans_reach_the_request_through_a_copied_context(registry, request_timings):
+    copied = threading.Thread(target=contextvars.copy_context().run, args=(_fetch,))
+    plain = threading.Thread(target=_fetch)
+    for thread in (copied, plain):
+        thread.start()
+        thread.join()
+    # Only the span run in a copy of the request's context is the request's
+    assert server_timing_header().count('fetch;') == 1
+    assert 'stage_duration_seconds_count{stage="fetch"} 2' in registry.render()
+
+
+def _fetch():
+    with span('fetch'):
+        pass
+
+
+# Routes
+
+@pytest.fixture
+def client(registry, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'metrics', registry)
+    return app_module.app.test_client()
+
+
+def test_responses_carry_server_timing(client, registry):
+    response = client.get('/')
+    assert re.search(r'total;dur=\d+\.\d$', response.headers['Server-Timing'])
+    assert 'http_request_duration_seconds_count{route="/",method="GET",status="' in registry.render()
+
+
+def test_metrics_needs_the_token_or_an_admin(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', 'scrape-secret')
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    user = {'Authorization': f"Bearer {generate_jwt_token(1, 'user@example.com')}"}
+    assert client.get('/metrics', headers=user).status_code == 401
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert '# TYPE http_request_duration_seconds histogram' in response.get_data(as_text=True)
+
+
+def test_admin_sessions_can_read_metrics(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(auth, 'ADMIN_ENABLED', True)
+    monkeypatch.setattr(auth, 'ADMIN_EMAILS', {'admin@example.com'})
+    monkeypatch.setattr(app_module, 'ADMIN_ENABLED', True)
+    admin = {'Authorization': f"Bearer {generate_jwt_token(1, 'admin@example.com')}"}
+    assert client.get('/metrics', headers=admin).status_code == 200
+
+
+def test_metrics_is_closed_without_a_configured_token(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', '')
+    assert client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code == 401
@@ -0,0 +1,84 @@
+"""number_parser: the Indian market number formats seen in scraped pages and feeds"""
+
+import math
+
+import numpy as np
+import pytest
+
+from modules.number_parser import format_market_cap, fraction_to_percent, parse_number, parse_numbers, to_float
+
+
+@pytest.mark.parametrize('text, value', [
+    ('1,234', 1234),
+    ('₹1,23,456.78', 123456.78),
+    ('₹ 2,950', 2950),
+    ('\xa01,234.5 ', 1234.5),
+    ('.5', 0.5),
+    ('23.5%', 23.5),
+    ('-4.2 %', -4.2),
+    ('-56', -56),
+    ('−56', -56),
+    ('–56', -56),
+    ('(1,234.5)', -1234.5),
+    ('(12%)', -12),
+    ('9,552 Cr', 9552),
+    (42, 42.0),
+    (3.5, 3.5),
+    (np.float32(1.5), 1.5),
+])
+def test_parse_number(text, value):
+    assert parse_number(text) == pytest.approx(value)
+
+
+@pytest.mark.parametrize('text, value', [
+    ('9,552 Cr', 9.552e10),
+    ('9,552 Cr.', 9.552e10),
+    ('₹ 9,552 Crore', 9.552e10),
+    ('15.2 L Cr', 15.2e12),
+    ('15.2 Lakh Crore', 15.2e12),
+    ('3 Lakh', 3e5),
+    ('3 Lakhs', 3e5),
+    ('250 K', 2.5e5),
+    ('12.5M', 1.25e7),
+    ('1.2 B', 1.2e9),
+    ('1.2Bn', 1.2e9),
+    ('2 T', 2e12),
+    ('(1,000 Cr)', -1e10),
+    ('−2.5 Cr', -2.5e7),
+    ('1,234', 1234),
+    ('12%', 12),
+])
+def test_parse_number_absolute(text, value):
+    assert parse_number(text, absolute=True) == pytest.approx(value)
+
+
+@pytest.mark.parametrize('missing', ['', '   ', '--', '-', '—', 'NA', 'Raw PDF', None, True])
+def test_missing_values_are_nan(missing):
+    assert math.isnan(parse_number(missing))
+    assert math.isnan(parse_number(missing, absolute=True))
+    assert to_float(missing) == 0.0
+    assert to_float(missing, default=None) is None
+
+
+def test_parse_numbers_on_a_mixed_row():
+    row = ['₹1,234', '', '12%', '(5)', None, '--', 7, '2.5 Cr', '−3']
+    parsed = parse_numbers(row)
+    assert parsed.dtype == np.float64
+    np.testing.assert_array_equal(np.isnan(parsed), [False, True, False, False, True, True, False, False, False])
+    np.testing.assert_allclose(parsed[~np.isnan(parsed)], [1234, 12, -5, 7, 2.5, -3])
+    assert parse_numbers(row, absolute=True)[7] == pytest.approx(2.5e7)
+    assert parse_numbers([]).shape == (0,)
+
+
+def test_format_market_cap():
+    assert format_market_cap('15.2 L Cr') == '15.20 T'
+    assert format_market_cap(9.552e10) == '95.52 B'
+    assert format_market_cap('500 Cr') == '5.00 B'
+    assert format_market_cap('5 Cr') == '5.00 Cr'
+    assert format_market_cap(123456) == '123,456'
+    assert format_market_cap('N/A') == 'N/A'
+
+
+def test_fraction_to_percent():
+    assert fraction_to_percent(0.29) == pytest.approx(29.0)
+    assert fraction_to_percent(None) == 0.0
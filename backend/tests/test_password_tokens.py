@@ -0,0 +1,76 @@
+"""Password tokens: one live reset link per user, and the sweeper for used and expired tokens"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules import auth
+
+
+@pytest.fixture
+def user(db):
+    result = auth.register_user('Asha', 'Rao', 'asha@example.com', '')
+    assert result['success']
+    return result['token']
+
+
+def _tokens(db) -> list:
+    with db.db_connection() as conn:
+        return [dict(row) for row in conn.execute("SELECT token, token_type, used, expires_at FROM password_tokens")]
+
+
+def _expire(db, token: str):
+    with db.db_connection() as conn:
+        conn.execute("UPDATE password_tokens SET expires_at = ? WHERE token = ?",
+                     ((datetime.now() - timedelta(minutes=1)).isoformat(), token))
+
+
+def test_new_reset_link_retires_the_previous_one(db, user):
+    first = auth.forgot_password('Asha', 'Rao', 'asha@example.com', '')['token']
+    second = auth.forgot_password('Asha', '', 'asha@example.com', '')['token']
+
+    assert not auth.verify_token(first, 'reset_password')['success']
+    assert auth.verify_token(second, 'reset_password') == {'success': True, 'email': 'asha@example.com'}
+    # The account's create-password link is a different type and stays valid
+    assert auth.verify_token(user, 'create_password')['success']
+
+
+def test_used_and_expired_tokens_are_rejected(db, user):
+    assert auth.create_or_reset_password(user, 'longenough', 'create_password')['success']
+    assert not auth.verify_token(user, 'create_password')['success']
+
+    reset = auth.forgot_password('Asha', 'Rao', 'asha@example.com', '')['token']
+    _expire(db, reset)
+    assert auth.verify_token(reset, 'reset_password')['error'] == 'Token has expired'
+
+
+def test_sweeper_removes_spent_tokens_only(db, user):
+    auth.forgot_password('Asha', 'Rao', 'asha@example.com', '')  # used: retired by the next link
+    live = auth.forgot_password('Asha', 'Rao', 'asha@example.com', '')['token']
+    _expire(db, user)  # unused but expired
+
+    assert auth.purge_spent_tokens() == 2
+    assert [t['token'] for t in _tokens(db)] == [live]
+    assert auth.purge_spent_tokens() == 0
+
+
+def test_sweeper_deletes_in_batches(db, user):
+    for _ in range(5):
+        auth.forgot_password('Asha', 'Rao', 'asha@example.com', '')
+    # Four retired links; the newest one is live
+    assert auth.purge_spent_tokens(batch_size=2) == 4
+    assert len(_tokens(db)) == 2
+
+
+@pytest.mark.parametrize('query, params, index', [
+    ("SELECT id FROM password_tokens WHERE used = 0 AND expires_at < ?", ('2024-01-01',),
+     'idx_password_tokens_spent'),
+    ("UPDATE password_tokens SET used = 1 WHERE email = ? AND token_type = 'reset_password' AND used = 0",
+     ('asha@example.com',), 'idx_password_tokens_email'),
+    ("SELECT * FROM password_tokens WHERE token = ? AND token_type = ? AND used = 0", ('t', 'reset_password'),
+     'sqlite_autoindex_password_tokens'),
+])
+def test_token_queries_use_an_index(db, query, params, index):
+    with db.db_connection() as conn:
+        plan = ' '.join(row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+    assert index in plan
@@ -0,0 +1,113 @@
+"""Locally computed beta, volatility, volumes and previous close"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from modules import price_analytics as analytics_module
+from modules.price_analytics import BENCHMARK, MIN_OBSERVATIONS, TRADING_DAYS, PriceAnalytics, compute
+from modules.price_store import price_store
+
+
+def _dates(count: int, last: date) -> list:
+    return [(last - timedelta(days=count - 1 - i)).isoformat() for i in range(count)]
+
+
+def _prices(returns: np.ndarray, start: float = 100.0) -> np.ndarray:
+    return start * np.concatenate(([1.0], np.cumprod(1 + returns)))
+
+
+@pytest.fixture
+def market():
+    return np.random.default_rng(7).normal(0, 0.01, 120)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Pin the session previous_close is computed for"""
+    def pin(day: date):
+        monkeypatch.setattr(analytics_module, 'session_date', lambda: day)
+    return pin
+
+
+def test_beta_and_volatility(market, session):
+    session(date(2030, 1, 1))
+    bench = _prices(market)
+    noise = np.random.default_rng(8).normal(0, 0.002, len(market))
+    closes = np.vstack([_prices(2 * market), _prices(0.5 * market + noise)])
+    volumes = np.ones_like(closes)
+
+    stats = compute(closes, volumes, bench, _dates(len(bench), date(2024, 6, 28)))
+
+    assert stats['beta'][0] == pytest.approx(2.0)
+    assert stats['beta'][1] == pytest.approx(0.5, abs=0.05)
+    expected = np.std(2 * market, ddof=1) * np.sqrt(TRADING_DAYS) * 100
+    assert stats['volatility'][0] == pytest.approx(expected)
+
+
+def test_gaps_and_short_histories(market, session):
+    session(date(2030, 1, 1))
+    bench = _prices(market)
+    gappy = _prices(1.5 * market)
+    gappy[[10, 50, 90]] = np.nan
+    short = np.full_like(bench, np.nan)
+    short[-(MIN_OBSERVATIONS - 1):] = bench[-(MIN_OBSERVATIONS - 1):]
+    closes = np.vstack([gappy, short])
+
+    stats = compute(closes, np.ones_like(closes), bench, _dates(len(bench), date(2024, 6, 28)))
+
+    # Returns touching a missing day are skipped, not treated as zero
+    assert stats['beta'][0] == pytest.approx(1.5)
+    assert np.isnan(stats['beta'][1]) and np.isnan(stats['volatility'][1])
+
+
+def test_volumes(session):
+    session(date(2030, 1, 1))
+    volumes = np.array([[np.nan] * 10 + list(range(1, 101)) + [np.nan]])
+    closes = np.full(volumes.shape, 100.0)
+
+    stats = compute(closes, volumes, np.full(volumes.shape[1], 100.0), _dates(volumes.shape[1], date(2024, 6, 28)))
+
+    assert stats['volume'][0] == 100
+    assert stats['avg_volume'][0] == pytest.approx(np.mean(range(39, 101)))
+
+
+@pytest.mark.parametrize('session_day, expected', [
+    # During Friday's session its bar is live: previous close is Thursday's
+    (date(2024, 3, 15), 104.0),
+    # After Friday's close (or over the weekend), the next session's previous close is Friday's
+    (date(2024, 3, 18), 105.0),
+])
+def test_previous_close_across_the_session_boundary(session, session_day, expected):
+    session(session_day)
+    dates = ['2024-03-11', '2024-03-12', '2024-03-13', '2024-03-14', '2024-03-15']
+    closes = np.array([[101.0, 102.0, 103.0, 104.0, 105.0]])
+
+    stats = compute(closes, np.ones_like(closes), np.ones(5), dates)
+
+    assert stats['previous_close'][0] == expected
+
+
+def test_recompute_stores_and_refresh_skips_current_symbols(db, market, session, monkeypatch):
+    session(date.today() + timedelta(days=1))
+    dates = _dates(len(market) + 1, date.today())
+
+    def save(symbol, closes):
+        price_store.save(symbol, [(d, c, c, c, c, 1000.0) for d, c in zip(dates, closes)])
+
+    save(BENCHMARK, _prices(market))
+    save('TCS', _prices(2 * market))
+    save('INFY', _prices(-market))
+    analytics = PriceAnalytics()
+
+    assert analytics.recompute(['tcs', 'INFY', 'NOBARS']) == 2
+    stored = analytics.get('TCS')
+    assert stored['beta'] == pytest.approx(2.0, abs=1e-3)
+    assert stored['as_of'] == dates[-1] and stored['previous_close'] == pytest.approx(_prices(2 * market)[-1], abs=1e-3)
+    assert analytics.get('NOBARS') is None
+
+    monkeypatch.setattr(price_store, 'refresh', lambda symbols: 0)
+    assert analytics.refresh(['TCS', 'INFY']) == {'bars_stored': 0, 'recomputed': 0}
+    price_store.save('INFY', [((date.today() + timedelta(days=1)).isoformat(), 50, 50, 50, 50, 1)])
+    assert analytics.refresh(['TCS', 'INFY']) == {'bars_stored': 0, 'recomputed': 1}
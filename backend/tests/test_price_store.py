@@ -0,0 +1,107 @@
+"""PriceStore: local daily bars, topped up from yfinance only with the missing days"""
+
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import price_store as price_store_module
+from modules.price_store import PriceStore, frame_to_rows, yahoo_symbol
+
+
+def _rows(last: date, days: int, close: float = 100.0):
+    return [((last - timedelta(days=days - 1 - i)).isoformat(), close, close + 1, close - 1, close + i, 1000 + i)
+            for i in range(days)]
+
+
+class FakeYahoo:
+    """yf stand-in: Ticker(symbol).history(**kwargs) returns `frame` and records the call"""
+
+    def __init__(self, frame=None, error=None):
+        self.frame, self.error, self.calls = frame, error, []
+
+    def Ticker(self, symbol):
+        def history(**kwargs):
+            self.calls.append((symbol, kwargs))
+            if self.error:
+                raise self.error
+            return self.frame
+        return SimpleNamespace(history=history)
+
+
+@pytest.fixture
+def yahoo(monkeypatch):
+    def install(**options):
+        fake = FakeYahoo(**options)
+        monkeypatch.setattr(price_store_module, 'yf', fake)
+        return fake
+    monkeypatch.setattr(price_store_module, 'guarded_call', lambda upstream, func, *args, **kwargs: func(*args, **kwargs))
+    return install
+
+
+def test_yahoo_symbol():
+    assert yahoo_symbol('TCS') == 'TCS.NS'
+    assert (yahoo_symbol('^NSEI'), yahoo_symbol('TCS.BO')) == ('^NSEI', 'TCS.BO')
+
+
+def test_frame_to_rows():
+    frame = pd.DataFrame({'Open': [1.0], 'High': [2.0], 'Low': [0.5], 'Close': [1.5], 'Volume': [10]},
+                         index=pd.to_datetime(['2024-03-01']))
+    assert frame_to_rows(frame) == [('2024-03-01', 1.0, 2.0, 0.5, 1.5, 10.0)]
+    assert frame_to_rows(None) == [] and frame_to_rows(frame.iloc[0:0]) == []
+
+
+def test_current_bars_are_served_without_yfinance(db, yahoo):
+    fake = yahoo()
+    store = PriceStore()
+    store.save('tcs', _rows(date.today(), 5))
+
+    bars = store.history('TCS')
+
+    assert fake.calls == []
+    assert len(bars['date']) == 5
+    np.testing.assert_array_equal(bars['close'], [100, 101, 102, 103, 104])
+
+
+def test_stale_bars_are_topped_up_with_missing_days_only(db, yahoo):
+    last = date.today() - timedelta(days=10)
+    new_day = pd.Timestamp(date.today())
+    fake = yahoo(frame=pd.DataFrame({'Open': [1.0], 'High': [1.0], 'Low': [1.0], 'Close': [200.0], 'Volume': [5.0]},
+                                    index=[new_day]))
+    store = PriceStore()
+    store.save('TCS', _rows(last, 3))
+
+    bars = store.history('TCS')
+
+    assert fake.calls == [('TCS.NS', {'start': (last + timedelta(days=1)).isoformat()})]
+    assert bars['close'][-1] == 200.0 and len(bars['date']) == 4
+    assert store.last_dates(['TCS', 'INFY']) == {'TCS': date.today().isoformat()}
+
+
+def test_first_lookup_fetches_the_whole_period(db, yahoo):
+    fake = yahoo(frame=None)
+    assert PriceStore().history('INFY', period='5y') is None
+    assert fake.calls == [('INFY.NS', {'period': '5y'})]
+
+
+def test_failed_top_up_still_serves_stored_bars(db, yahoo):
+    yahoo(error=ConnectionError('down'))
+    store = PriceStore()
+    store.save('TCS', _rows(date.today() - timedelta(days=10), 3))
+    assert len(store.history('TCS')['date']) == 3
+
+
+def test_load_matrix_aligns_symbols_on_dates(db):
+    store = PriceStore()
+    today = date.today()
+    store.save('TCS', _rows(today, 3))
+    store.save('INFY', _rows(today, 2, close=50))
+
+    dates, matrix = store.load_matrix(['TCS', 'INFY', 'NONE'])
+
+    assert len(dates) == 3
+    np.testing.assert_array_equal(matrix['close'][0], [100, 101, 102])
+    assert np.isnan(matrix['close'][1][0]) and matrix['close'][1][-1] == 51
+    assert np.isnan(matrix['close'][2]).all()
@@ -0,0 +1,122 @@
+"""RequestProfiler sampling and output files, and profiling requests through the admin opt-in"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from modules import auth, profiler as profiler_module
+from modules.auth import generate_jwt_token
+from modules.profiler import RequestProfiler, _prune, list_profiles, should_profile
+
+
+def _busy(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+@pytest.fixture
+def profile():
+    profile = RequestProfiler(threading.get_ident(), interval_ms=1)
+    profile.start()
+    _busy(0.1)
+    profile.stop()
+    return profile
+
+
+def test_samples_the_request_thread(profile):
+    assert profile.samples > 0
+    assert profile.duration >= 0.1
+    assert any(frame[0] == '_busy' for stack in profile.stacks for frame in stack)
+    # Stopping twice is harmless
+    profile.stop()
+
+
+def test_writes_speedscope_folded_and_summary(profile, tmp_path):
+    base = profile.write('GET /api/swot/TCS', status=200, directory=str(tmp_path))
+
+    assert base.endswith('GET_api_swot_TCS')
+    with open(tmp_path / f"{base}.speedscope.json") as f:
+        speedscope = json.load(f)
+    sampled = speedscope['profiles'][0]
+    assert len(sampled['samples']) == len(sampled['weights']) == len(profile.stacks)
+    assert max(index for sample in sampled['samples'] for index in sample) < len(speedscope['shared']['frames'])
+
+    folded = (tmp_path / f"{base}.folded").read_text().splitlines()
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in folded) == profile.samples
+    assert any('_busy (test_profiler.py:' in line for line in folded)
+
+    summary = (tmp_path / f"{base}.txt").read_text()
+    assert summary.startswith('Request:  GET /api/swot/TCS\nStatus:   200\n')
+    assert '_busy' in summary
+
+
+def test_list_profiles_newest_first(profile, tmp_path):
+    first = profile.write('GET /first', status=200, directory=str(tmp_path))
+    second = profile.write('GET /second', status=500, directory=str(tmp_path))
+
+    listed = list_profiles(str(tmp_path))
+    assert [p['name'] for p in listed] == [second, first]
+    assert (listed[0]['request'], listed[0]['status']) == ('GET /second', '500')
+    assert listed[0]['duration'].endswith(' ms')
+    assert list_profiles(str(tmp_path / 'missing')) == []
+
+
+def test_prune_keeps_the_newest_profiles(profile, tmp_path):
+    bases = [profile.write(f"GET /{i}", directory=str(tmp_path)) for i in range(3)]
+    _prune(str(tmp_path), keep=2)
+    remaining = sorted(os.listdir(tmp_path))
+    assert not any(name.startswith(bases[0]) for name in remaining)
+    assert len(remaining) == 6
+
+
+def test_sample_rate():
+    assert not should_profile(0)
+    assert should_profile(1.0)
+
+
+# Routes
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    import app as app_module
+    # PROFILE_DIR is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(auth, 'ADMIN_ENABLED', True)
+    monkeypatch.setattr(auth, 'ADMIN_EMAILS', {'admin@example.com'})
+    monkeypatch.setattr(app_module, 'ADMIN_ENABLED', True)
+    monkeypatch.setattr(app_module, 'should_profile', lambda: True)
+    return app_module.app.test_client()
+
+
+def _headers(email: str) -> dict:
+    return {'Authorization': f"Bearer {generate_jwt_token(1, email)}"}
+
+
+def test_admin_can_profile_a_request(client, tmp_path):
+    admin = _headers('admin@example.com')
+    response = client.get('/?_profile=1', headers=admin)
+    profile_id = response.headers['X-Profile-Id']
+    assert os.path.exists(tmp_path / profiler_module.PROFILE_DIR / f"{profile_id}.txt")
+
+    assert client.get('/', headers=dict(admin, **{'X-Profile': '1'})).headers.get('X-Profile-Id')
+
+    listed = client.get('/api/admin/profiles', headers=admin).get_json()['data']
+    assert profile_id in [p['name'] for p in listed]
+    summary = client.get(f'/api/admin/profiles/{profile_id}.txt', headers=admin)
+    assert summary.status_code == 200 and summary.get_data(as_text=True).startswith('Request:  GET /')
+
+
+def test_only_admins_are_profiled(client):
+    assert 'X-Profile-Id' not in client.get('/?_profile=1').headers
+    assert 'X-Profile-Id' not in client.get('/?_profile=1', headers=_headers('user@example.com')).headers
+
+
+@pytest.mark.parametrize('filename', ['missing.txt', '../app.py'])
+def test_unknown_profile_files_are_404_json(client, filename):
+    response = client.get(f'/api/admin/profiles/{filename}', headers=_headers('admin@example.com'))
+    assert response.status_code == 404
+    assert response.get_json() == {"success": False, "error": "Profile not found"}
@@ -0,0 +1,79 @@
+"""TokenBucket: refill, the interactive/batch lanes and timeouts"""
+
+import contextvars
+import threading
+import time
+
+from modules.rate_limiter import BATCH, INTERACTIVE, TokenBucket, batch_lane, _lane
+
+
+def _drain(bucket: TokenBucket):
+    while bucket.try_acquire() == 0:
+        pass
+
+
+def _wait_for_waiters(bucket: TokenBucket, count: int):
+    deadline = time.monotonic() + 2
+    while len(bucket._waiters) < count:
+        assert time.monotonic() < deadline, "waiter never queued"
+        time.sleep(0.001)
+
+
+def _queue(bucket: TokenBucket, lane: int, name: str, order: list) -> threading.Thread:
+    thread = threading.Thread(target=lambda: bucket.acquire(lane=lane, timeout=5) and order.append(name))
+    thread.start()
+    return thread
+
+
+def test_burst_then_refill():
+    bucket = TokenBucket('test', rate=10, capacity=3)
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.1
+    time.sleep(wait + 0.01)
+    assert bucket.try_acquire() == 0
+
+
+def test_interactive_waiters_go_before_batch():
+    bucket = TokenBucket('test', rate=20, capacity=1)
+    _drain(bucket)
+    order = []
+    threads = []
+    # Batch work queued first still waits for interactive requests that arrive later
+    for lane, name in ((BATCH, 'batch-1'), (BATCH, 'batch-2'), (INTERACTIVE, 'interactive-1'),
+                       (INTERACTIVE, 'interactive-2')):
+        threads.append(_queue(bucket, lane, name, order))
+        _wait_for_waiters(bucket, len(threads))
+    for thread in threads:
+        thread.join()
+    assert order == ['interactive-1', 'interactive-2', 'batch-1', 'batch-2']
+
+
+def test_batch_lane_sets_the_default_lane():
+    assert _lane.get() == INTERACTIVE
+    with batch_lane():
+        assert _lane.get() == BATCH
+        bucket = TokenBucket('test', rate=20, capacity=1)
+        _drain(bucket)
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(bucket.acquire,), kwargs={'timeout': 1})
+        thread.start()
+        _wait_for_waiters(bucket, 1)
+        assert bucket._waiters[0][0] == BATCH
+        thread.join()
+    assert _lane.get() == INTERACTIVE
+
+
+def test_acquire_times_out():
+    bucket = TokenBucket('test', rate=0.1, capacity=1)
+    _drain(bucket)
+    started = time.monotonic()
+    assert bucket.acquire(timeout=0.05) is False
+    assert time.monotonic() - started < 1
+    assert bucket._waiters == []
+
+
+def test_penalize_withholds_tokens():
+    bucket = TokenBucket('test', rate=10, capacity=5)
+    bucket.penalize(1)
+    assert bucket.try_acquire() > 1
@@ -0,0 +1,104 @@
+"""ResultTable parsing, lookups and serialisation, and the screener analyses that read it"""
+
+import math
+
+import numpy as np
+import pytest
+from bs4 import BeautifulSoup
+
+from modules.result_table import ResultTable
+from modules.screener_scraper import ScreenerScraper
+from modules.stock_screener import StockScreener
+
+HEADERS = ['', 'Mar 2023', 'Jun 2023', 'Sep 2023', 'Dec 2023']
+ROWS = [
+    ['Sales\xa0+', '1,000', '1,100', '', '1,300'],
+    ['Net Profit +', '100', '(20)', '150', '200'],
+    ['OPM %', '18%', '19%', '20%', '21%'],
+    ['EPS in Rs', '10.50', '11.25', '12', '13'],
+    ['Raw PDF', '', '', '', ''],
+]
+
+
+@pytest.fixture
+def table() -> ResultTable:
+    return ResultTable.from_cells(HEADERS, ROWS)
+
+
+def test_from_cells_parses_each_cell_once(table):
+    assert table.periods == HEADERS[1:]
+    # Expand markers stripped, rows without numbers dropped
+    assert table.metrics == ['Sales', 'Net Profit', 'OPM %', 'EPS in Rs']
+    assert table.units == ['Cr', 'Cr', '%', 'Rs']
+    assert table.values.dtype == np.float64
+    np.testing.assert_array_equal(table.values[1], [100, -20, 150, 200])
+    assert math.isnan(table.values[0][2])
+
+
+def test_short_rows_are_padded_with_nan():
+    table = ResultTable.from_cells(HEADERS, [['Sales', '1', '2']])
+    np.testing.assert_array_equal(table.values[0][:2], [1, 2])
+    assert np.isnan(table.values[0][2:]).all()
+
+
+@pytest.mark.parametrize('headers, rows', [
+    ([''], [['Sales', '1']]),
+    (HEADERS, []),
+    (HEADERS, [['Raw PDF', '', '', '', '']]),
+])
+def test_tables_without_data_are_none(headers, rows):
+    assert ResultTable.from_cells(headers, rows) is None
+
+
+def test_row_matches_any_name_case_insensitively(table):
+    np.testing.assert_array_equal(table.row('revenue', 'SALES'), table.values[0])
+    assert table.row('debt') is None
+
+
+def test_recent_skips_missing_values(table):
+    np.testing.assert_array_equal(ResultTable.recent(table.row('sales'), 3), [1000, 1100, 1300])
+    np.testing.assert_array_equal(ResultTable.recent(table.row('sales'), 10), [1000, 1100, 1300])
+    assert ResultTable.recent(None, 3).size == 0
+
+
+def test_dict_round_trip(table):
+    data = table.to_dict()
+    assert data['values'][0][2] is None
+    restored = ResultTable.from_dict(data)
+    assert (restored.periods, restored.metrics, restored.units) == (table.periods, table.metrics, table.units)
+    np.testing.assert_array_equal(restored.values, table.values)
+    assert ResultTable.from_dict(None) is None
+
+
+def test_to_display_formats_by_unit(table):
+    display = table.to_display()
+    assert display['headers'] == HEADERS
+    assert display['rows'][0] == ['Sales', '1,000', '1,100', '', '1,300']
+    assert display['rows'][2][1] == '18%'
+    assert display['rows'][3][1:3] == ['10.50', '11.25']
+
+
+def test_scraper_parses_html_table():
+    html = '<table><thead><tr>' + ''.join(f'<th>{h}</th>' for h in HEADERS) + '</tr></thead><tbody>'
+    html += ''.join('<tr>' + ''.join(f'<td>{c}</td>' for c in row) + '</tr>' for row in ROWS) + '</tbody></table>'
+    parsed = ScreenerScraper()._parse_result_table(BeautifulSoup(html, 'html.parser').find('table'))
+    assert parsed.metrics == ['Sales', 'Net Profit', 'OPM %', 'EPS in Rs']
+    np.testing.assert_array_equal(parsed.values[1], [100, -20, 150, 200])
+
+
+def test_quarterly_analysis_uses_numeric_rows(table):
+    result = StockScreener().analyze_quarterly_results(table)
+    assert result['sales_growth'] == pytest.approx(30.0)
+    assert result['profit_growth'] == pytest.approx(100.0)
+    # Margins over quarters with both figures: 10% in Mar, 15.4% in Dec
+    assert result['margin_improvement'] is True
+    assert result['quarters_analyzed'] == 4
+    assert StockScreener().analyze_quarterly_results(None)['quarters_analyzed'] == 0
+
+
+def test_annual_debt_trend_uses_recent_reported_years():
+    annual = ResultTable.from_cells(['', 'Mar 2020', 'Mar 2021', 'Mar 2022', 'Mar 2023'],
+                                    [['Debt to Equity', '0.9', '0.6', '', '0.3']])
+    result = StockScreener().analyze_annual_debt_trend(annual)
+    assert result['avg_debt_to_equity'] == pytest.approx(0.6)
+    assert (result['debt_decreasing'], result['years_analyzed']) == (True, 3)
@@ -0,0 +1,255 @@
+"""SWOTAnalyzer: serving, reusing and regenerating stored reports"""
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from modules import deadline, swot_analyzer
+from modules.deadline import request_deadline
+from modules.market_hours import now_ist
+from modules.revalidate import FRESH
+from modules.swot_analyzer import SWOT_GRACE, SWOT_MAX_AGE, SWOTAnalyzer
+
+
+class RecordingRevalidator:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, key, func, *args, **kwargs):
+        self.submitted.append(key)
+        return True
+
+
+@pytest.fixture
+def revalidations(monkeypatch):
+    revalidator = RecordingRevalidator()
+    monkeypatch.setattr(swot_analyzer, 'revalidator', revalidator)
+    return revalidator.submitted
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    analyzer = SWOTAnalyzer()
+    analyzer.fetched = []
+    # symbol -> stock_data returned by the fetch (None: unavailable)
+    analyzer.data = {}
+
+    def fetch(symbol):
+        analyzer.fetched.append(symbol)
+        return analyzer.data.get(symbol)
+
+    monkeypatch.setattr(analyzer, '_fetch_stock_data', fetch)
+    return analyzer
+
+
+def _store(cache, symbol, checked_ago):
+    """A stored report whose fundamentals were last checked `checked_ago`"""
+    fetched_at = now_ist() - checked_ago
+    swot = {"symbol": symbol, "name": f"{symbol} Ltd", "strengths": ["Stored"],
+            "financial_summary": {"current_price": 100}}
+    cache.set('swot', symbol, {"swot": swot, "input_hash": "stored"},
+              expires_at=fetched_at + SWOT_MAX_AGE, fetched_at=fetched_at)
+
+
+def _stock(symbol, **fields):
+    data = dict(symbol=symbol, name=f"{symbol} Ltd", sector='Technology', current_price=100, market_cap='1,000',
+                pe_ratio=20, roe=18, debt_to_equity=0.2, profit_margin=12, dividend_yield=1.5)
+    data.update(fields)
+    return data
+
+
+def _store_generated(analyzer, cache, stock_data, checked_ago):
+    """The report analyze would have stored for stock_data, last checked `checked_ago`"""
+    fetched_at = now_ist() - checked_ago
+    swot = analyzer._generate_swot_from_data(stock_data)
+    swot['strengths'] = swot['strengths'] + ['Stored']
+    cache.set('swot', stock_data['symbol'], {"swot": swot, "input_hash": analyzer._input_hash(stock_data)},
+              expires_at=fetched_at + SWOT_MAX_AGE, fetched_at=fetched_at)
+
+
+EXPIRED_AGE = SWOT_MAX_AGE + SWOT_GRACE + timedelta(hours=1)
+
+
+def test_fresh_report_is_served_without_fetching(fresh_cache, analyzer, revalidations):
+    _store(fresh_cache, 'TCS', timedelta(hours=1))
+    swot = analyzer.analyze('TCS')
+    assert (swot['strengths'], swot['stale']) == (['Stored'], False)
+    assert analyzer.fetched == [] and revalidations == []
+
+
+def test_unchanged_fundamentals_keep_the_report(fresh_cache, analyzer):
+    _store_generated(analyzer, fresh_cache, _stock('TCS'), EXPIRED_AGE)
+    # Price and P/E moved, but every ladder stays on the same rung
+    analyzer.data['TCS'] = _stock('TCS', current_price=104.5, pe_ratio=20.9)
+
+    swot = analyzer.analyze('TCS')
+
+    assert analyzer.fetched == ['TCS']
+    assert swot['strengths'][-1] == 'Stored'
+    assert (swot['financial_summary']['current_price'], swot['financial_summary']['pe_ratio']) == (104.5, 20.9)
+    # Checked again just now, so the next call is served from the cache
+    assert analyzer._freshness(fresh_cache.get('swot', 'TCS')) == FRESH
+    assert analyzer.analyze('TCS')['financial_summary']['current_price'] == 104.5
+    assert analyzer.fetched == ['TCS']
+
+
+def test_changed_fundamentals_regenerate_the_report(fresh_cache, analyzer):
+    _store_generated(analyzer, fresh_cache, _stock('TCS'), EXPIRED_AGE)
+    analyzer.data['TCS'] = _stock('TCS', pe_ratio=35)
+
+    swot = analyzer.analyze('TCS')
+
+    assert 'Stored' not in swot['strengths']
+    assert 'High P/E ratio of 35.0 suggesting overvaluation' in swot['weaknesses']
+    assert fresh_cache.get('swot', 'TCS').value['swot'] == swot
+
+
+def test_force_refresh_regenerates_a_fresh_report(fresh_cache, analyzer):
+    _store_generated(analyzer, fresh_cache, _stock('TCS'), timedelta(minutes=5))
+    analyzer.data['TCS'] = _stock('TCS')
+
+    swot = analyzer.analyze('TCS', force_refresh=True)
+
+    assert analyzer.fetched == ['TCS']
+    assert 'Stored' not in swot['strengths']
+
+
+def test_unavailable_data_is_not_stored(fresh_cache, analyzer):
+    swot = analyzer.analyze('NODATA')
+    assert swot['weaknesses'][0] == 'Data unavailable'
+    assert fresh_cache.get('swot', 'NODATA') is None
+
+
+def test_batch_reports_reuse_status(fresh_cache, analyzer, revalidations):
+    _store_generated(analyzer, fresh_cache, _stock('SAME'), EXPIRED_AGE)
+    _store_generated(analyzer, fresh_cache, _stock('MOVED'), EXPIRED_AGE)
+    analyzer.data.update(SAME=_stock('SAME', current_price=101), MOVED=_stock('MOVED', roe=5),
+                         NEW=_stock('NEW'))
+
+    results = analyzer.analyze_batch(['SAME', 'MOVED', 'NEW'])
+
+    assert {symbol: result['status'] for symbol, result in results.items()} == {
+        'SAME': 'unchanged', 'MOVED': 'generated', 'NEW': 'generated'}
+    assert results['SAME']['swot']['financial_summary']['current_price'] == 101
+    assert results['NEW']['swot'] == analyzer._generate_swot_from_data(_stock('NEW'))
+    assert fresh_cache.get('swot', 'MOVED').value['swot'] == results['MOVED']['swot']
+
+
+def test_batch_serves_stale_reports_without_fetching(fresh_cache, analyzer, revalidations):
+    _store(fresh_cache, 'FRESH', timedelta(hours=1))
+    _store(fresh_cache, 'STALE', SWOT_MAX_AGE + timedelta(hours=2))
+    _store(fresh_cache, 'EXPIRED', SWOT_MAX_AGE + SWOT_GRACE + timedelta(hours=1))
+
+    results = analyzer.analyze_batch(['FRESH', 'STALE', 'EXPIRED', 'MISSING'])
+
+    assert sorted(analyzer.fetched) == ['EXPIRED', 'MISSING']
+    assert revalidations == [('swot', 'STALE')]
+    assert {symbol: result['status'] for symbol, result in results.items()} == {
+        'FRESH': 'cached', 'STALE': 'cached', 'EXPIRED': 'unavailable', 'MISSING': 'unavailable'}
+    stale = results['STALE']['swot']
+    assert stale['stale'] is True and stale['strengths'] == ['Stored']
+    assert stale['age_seconds'] == pytest.approx((SWOT_MAX_AGE + timedelta(hours=2)).total_seconds(), abs=5)
+    assert results['FRESH']['swot']['stale'] is False
+
+
+def test_analyze_and_batch_agree_on_stale_reports(fresh_cache, analyzer, revalidations):
+    _store(fresh_cache, 'STALE', SWOT_MAX_AGE + timedelta(hours=2))
+    single = analyzer.analyze('STALE')
+    batch = analyzer.analyze_batch(['STALE'])['STALE']['swot']
+    assert analyzer.fetched == []
+    assert single == batch
+    assert revalidations == [('swot', 'STALE')] * 2
+
+
+# yfinance fallback
+
+FULL_INFO = {'longName': 'Tata Consultancy Services', 'sector': 'Technology', 'currentPrice': 3900,
+             'previousClose': 3880, 'volume': 1200, 'averageVolume': 1500, 'fiftyTwoWeekHigh': 4200,
+             'fiftyTwoWeekLow': 3100, 'marketCap': 1.4e13, 'trailingPE': 28.5, 'returnOnEquity': 0.45,
+             'returnOnAssets': 0.22, 'debtToEquity': 9.5, 'profitMargins': 0.19, 'revenueGrowth': 0.07,
+             'earningsGrowth': 0.09, 'dividendYield': 1.2, 'beta': 0.8}
+
+
+class FakeStore:
+    def __init__(self, bars=None):
+        self.bars, self.calls = bars, []
+
+    def history(self, symbol):
+        self.calls.append(symbol)
+        return self.bars
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    """An analyzer whose screener.in lookup fails, with yfinance `info` and the price store stubbed"""
+    analyzer = SWOTAnalyzer()
+    monkeypatch.setattr(analyzer.screener, 'fetch_financial_data', lambda symbol: None)
+    monkeypatch.setattr(swot_analyzer, 'guarded_call', lambda upstream, func, *args, **kwargs: func(*args, **kwargs))
+    state = SimpleNamespace(info=dict(FULL_INFO), tickers=[], store=FakeStore())
+
+    def ticker(name):
+        state.tickers.append(name)
+        return SimpleNamespace(info=state.info)
+
+    monkeypatch.setattr(swot_analyzer, 'yf', SimpleNamespace(Ticker=ticker))
+    monkeypatch.setattr(swot_analyzer, 'price_store', state.store)
+    state.analyzer = analyzer
+    return state
+
+
+def test_fallback_uses_info_without_loading_bars(fallback):
+    data = fallback.analyzer._fetch_stock_data('TCS')
+
+    assert fallback.tickers == ['TCS.NS'] and fallback.store.calls == []
+    assert (data['previous_close'], data['volume'], data['avg_volume']) == (3880, 1200, 1500)
+    assert (data['52w_high'], data['52w_low']) == (4200, 3100)
+    # Normalised to screener.in units: percent ratios, D/E as a plain ratio
+    assert (data['roe'], data['profit_margin'], data['revenue_growth']) == pytest.approx((45, 19, 7))
+    assert data['debt_to_equity'] == pytest.approx(0.095)
+
+
+def test_missing_fields_come_from_one_bar_load(fallback):
+    for key in ('previousClose', 'volume', 'fiftyTwoWeekHigh'):
+        del fallback.info[key]
+    fallback.store.bars = {'close': np.array([10.0, 11.0, 12.0]), 'volume': np.array([5.0, 6.0, 7.0]),
+                           'high': np.array([13.0, 15.0, 14.0]), 'low': np.array([9.0, 8.0, 10.0])}
+
+    data = fallback.analyzer._fetch_stock_data('TCS')
+
+    assert fallback.store.calls == ['TCS']
+    assert (data['previous_close'], data['volume'], data['52w_high']) == (11.0, 7.0, 15.0)
+    assert (data['avg_volume'], data['52w_low']) == (1500, 3100)
+
+
+def test_missing_fields_without_bars_are_zero(fallback):
+    del fallback.info['previousClose']
+    data = fallback.analyzer._fetch_stock_data('TCS')
+    assert data['previous_close'] == 0 and fallback.store.calls == ['TCS']
+
+
+def test_fallback_is_skipped_on_a_nearly_spent_deadline(fallback):
+    with request_deadline(swot_analyzer.YFINANCE_FALLBACK_SECONDS - 1):
+        assert fallback.analyzer._fetch_stock_data('TCS') is None
+    assert fallback.tickers == []
+
+
+def test_bar_top_up_is_skipped_when_info_used_up_the_budget(fallback, monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(deadline, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    del fallback.info['previousClose']
+    info = fallback.info
+
+    class SlowInfo:
+        @property
+        def info(self):
+            clock.now += swot_analyzer.YFINANCE_FALLBACK_SECONDS - 1
+            return info
+
+    monkeypatch.setattr(swot_analyzer, 'yf', SimpleNamespace(Ticker=lambda name: SlowInfo()))
+    with request_deadline(swot_analyzer.YFINANCE_FALLBACK_SECONDS):
+        data = fallback.analyzer._fetch_stock_data('TCS')
+
+    assert fallback.store.calls == []
+    assert (data['previous_close'], data['volume']) == (0, 1200)
@@ -0,0 +1,98 @@
+"""POST /api/swot/batch: validation, ordering, one rule-engine pass and the request deadline in fetch threads"""
+
+import pytest
+
+from modules import admission as admission_module, deadline
+from modules.admission import AdmissionController
+from modules.auth import generate_jwt_token
+
+
+@pytest.fixture
+def app_module(fresh_cache, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(dict(admission_module.POLICIES)))
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def headers():
+    return {'Authorization': f"Bearer {generate_jwt_token(1, 'batch@example.com')}"}
+
+
+@pytest.fixture
+def analyzer(app_module, monkeypatch):
+    """The app's SWOTAnalyzer with fetches answered locally; records what each fetch saw"""
+    analyzer = app_module.swot_analyzer
+    analyzer.fetches, analyzer.passes = [], []
+
+    def fetch(symbol):
+        analyzer.fetches.append((symbol, deadline.remaining()))
+        if symbol == 'NODATA':
+            return None
+        return dict(symbol=symbol, name=f"{symbol} Ltd", sector='Technology', current_price=100, pe_ratio=20)
+
+    generate = analyzer._generate_swot_batch
+
+    def generate_batch(stock_data_list):
+        analyzer.passes.append([s['symbol'] for s in stock_data_list])
+        return generate(stock_data_list)
+
+    monkeypatch.setattr(analyzer, '_fetch_stock_data', fetch)
+    monkeypatch.setattr(analyzer, '_generate_swot_batch', generate_batch)
+    return analyzer
+
+
+def test_get_is_405_not_a_symbol_named_batch(client, analyzer):
+    response = client.get('/api/swot/batch')
+    assert response.status_code == 405
+    assert response.headers['Allow'] == 'POST'
+    assert analyzer.fetches == []
+
+
+def test_requires_auth(client):
+    assert client.post('/api/swot/batch', json={'symbols': ['TCS']}).status_code == 401
+
+
+@pytest.mark.parametrize('body', [{}, {'symbols': []}, {'symbols': 'TCS'}])
+def test_symbols_must_be_a_non_empty_list(client, headers, body):
+    response = client.post('/api/swot/batch', json=body, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_batch_size_is_capped(app_module, client, headers, analyzer):
+    symbols = [f"S{i}" for i in range(app_module.MAX_SWOT_BATCH + 1)]
+    assert client.post('/api/swot/batch', json={'symbols': symbols}, headers=headers).status_code == 400
+    assert analyzer.fetches == []
+
+
+def test_dedupes_in_order_and_generates_in_one_pass(client, headers, analyzer):
+    response = client.post('/api/swot/batch', json={'symbols': ['infy', 'TCS', ' tcs ', 'NODATA', '']},
+                           headers=headers)
+
+    body = response.get_json()
+    assert response.status_code == 200 and body['success'] is True
+    assert [(item['symbol'], item['status']) for item in body['data']] == [
+        ('INFY', 'generated'), ('TCS', 'generated'), ('NODATA', 'unavailable')]
+    assert body['count'] == 3
+    assert analyzer.passes == [['INFY', 'TCS']]
+    assert sorted(symbol for symbol, _ in analyzer.fetches) == ['INFY', 'NODATA', 'TCS']
+
+
+def test_fetch_threads_keep_the_request_deadline(app_module, client, headers, analyzer):
+    client.post('/api/swot/batch', json={'symbols': ['INFY', 'TCS']}, headers=headers)
+    budget = app_module.ROUTE_DEADLINES['generate_swot_batch']
+    assert all(left is not None and 0 < left <= budget for _, left in analyzer.fetches)
+
+
+def test_second_request_is_served_from_stored_reports(client, headers, analyzer):
+    client.post('/api/swot/batch', json={'symbols': ['INFY', 'TCS']}, headers=headers)
+    response = client.post('/api/swot/batch', json={'symbols': ['TCS', 'INFY']}, headers=headers)
+
+    assert [item['status'] for item in response.get_json()['data']] == ['cached', 'cached']
+    assert len(analyzer.fetches) == 2
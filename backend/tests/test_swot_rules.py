@@ -0,0 +1,120 @@
+"""SWOT rule tables: conditions, batch evaluation and the output of the original if/elif ladders"""
+
+import numpy as np
+import pytest
+
+from modules.swot_rules import GENERIC_OPPORTUNITIES, MAX_ITEMS, compile_condition, engine
+
+# Inputs in percent units, as _fetch_stock_data produces them
+TCS = dict(symbol='TCS', sector='Technology', pe_ratio=24.6, roe=45, roa=22, debt_to_equity=0.1, profit_margin=19,
+           revenue_growth=7, earnings_growth=9, beta=0.8, dividend_yield=1.2, market_cap_value=1.4e13)
+DISTRESSED = dict(symbol='WEAK', sector='Oil & Gas', pe_ratio=45, roe=-5, roa=1, debt_to_equity=2.5,
+                  profit_margin=-3, revenue_growth=-15, earnings_growth=-30, beta=1.8, dividend_yield=0,
+                  market_cap_value=5e8)
+MIDCAP_BANK = dict(symbol='MID', sector='Banking', pe_ratio=12, roe=12, roa=1.2, debt_to_equity=0.7,
+                   profit_margin=12, revenue_growth=22, earnings_growth=30, beta=0.4, dividend_yield=3.1,
+                   market_cap_value=8e9)
+
+# What the if/elif ladders in SWOTAnalyzer produced for the same inputs (in fraction units)
+EXPECTED = {
+    'TCS': {
+        'strengths': ['Attractive P/E ratio of 24.6 indicating reasonable valuation',
+                      'Excellent Return on Equity (45.0%) indicating highly efficient capital usage',
+                      'Healthy Return on Assets (22.0%)',
+                      'Prudent debt management (D/E: 0.10) - low financial risk',
+                      'Strong profit margins (19.0%) indicating efficient operations',
+                      'Steady revenue growth (7.0%)',
+                      'Low volatility (beta: 0.80) - stable against market'],
+        'weaknesses': ['Dependence on domestic market', 'Regulatory compliance challenges'],
+        'opportunities': ['Growth potential in Technology sector'],
+        'threats': ['Rapid technological obsolescence risks',
+                    'Intense competition from global tech giants',
+                    'Cybersecurity vulnerabilities and data breaches',
+                    'Skill shortage in emerging technologies (AI, Cloud)',
+                    'Economic recession impacting demand',
+                    'Global supply chain disruptions',
+                    'Currency fluctuation affecting export competitiveness'],
+    },
+    'WEAK': {
+        'strengths': ['Established market presence', 'Experienced management team'],
+        'weaknesses': ['High P/E ratio of 45.0 suggesting overvaluation',
+                       'Negative Return on Equity (-5.0%) indicating financial distress',
+                       'Excessive leverage (D/E: 2.50) - high financial risk',
+                       'Negative profit margins indicating operational losses',
+                       'Contracting revenues (-15.0%) - business challenges',
+                       'Earnings declining (-30.0%) - profitability concerns',
+                       'High volatility (beta: 1.80) - more sensitive to market'],
+        'opportunities': ['Growth potential in Oil & Gas sector'],
+        # The old ladder said "Thin profit margins" here: its losses rung sat unreachable behind "< 5"
+        'threats': ['High leverage (D/E: 2.50) increasing bankruptcy risk during economic downturn',
+                    'Operating losses - cash flow concerns and potential funding crisis',
+                    'Severe revenue contraction (-15.0%) indicating market share loss',
+                    'Negative ROE indicating capital destruction and investor confidence loss',
+                    'High volatility (beta: 1.80) - magnified losses during market corrections',
+                    'Volatile commodity prices (oil/gas) affecting margins',
+                    'Regulatory changes towards renewable energy'],
+    },
+    'MID': {
+        'strengths': ['Attractive P/E ratio of 12.0 indicating reasonable valuation',
+                      'Moderate leverage (D/E: 0.70) for growth',
+                      'Healthy profit margins (12.0%)',
+                      'Exceptional revenue growth (22.0%) - strong market expansion',
+                      'Outstanding earnings growth (30.0%) - profitability momentum',
+                      'Low volatility (beta: 0.40) - stable against market',
+                      'Attractive dividend yield (3.10%) providing regular income'],
+        'weaknesses': ['Dependence on domestic market', 'Regulatory compliance challenges'],
+        'opportunities': ['Mid-cap position with growth potential', 'Growth potential in Banking sector'],
+        'threats': ['Unusually low volatility (beta: 0.40) may mask underlying risks',
+                    'Rising non-performing assets (NPA) risk',
+                    'Interest rate volatility impact on margins',
+                    'Regulatory capital requirements (Basel norms)',
+                    'Digital disruption from fintech companies',
+                    'Economic slowdown increasing credit defaults',
+                    'Mid-cap volatility - higher risk than large-cap peers during market corrections'],
+    },
+}
+
+
+@pytest.mark.parametrize('condition, inside, outside', [
+    ('x > 30', [30.1, 1e9], [30, -1]),
+    ('x <= 0', [0, -5], [0.1]),
+    ('x == 0', [0], [0.01, -0.01]),
+    ('0 < x < 10', [0.1, 9.9], [0, 10]),
+    ('10 <= x <= 25', [10, 25], [9.99, 25.01]),
+    ('1.0 < x <= 2.0', [1.01, 2.0], [1.0, 2.01]),
+])
+def test_conditions(condition, inside, outside):
+    mask = compile_condition(condition)
+    assert mask(np.array(inside, dtype=float)).all()
+    assert not mask(np.array(outside, dtype=float)).any()
+
+
+def test_unsupported_condition_is_rejected():
+    with pytest.raises(ValueError):
+        compile_condition('x > y')
+
+
+@pytest.mark.parametrize('record', [TCS, DISTRESSED, MIDCAP_BANK], ids=lambda r: r['symbol'])
+def test_matches_the_original_ladders(record):
+    assert engine.evaluate([record])[0] == EXPECTED[record['symbol']]
+
+
+def test_batch_evaluation_equals_one_at_a_time():
+    records = [TCS, DISTRESSED, MIDCAP_BANK, TCS]
+    assert engine.evaluate(records) == [engine.evaluate([r])[0] for r in records]
+
+
+def test_missing_fields_fall_back_to_defaults():
+    swot = engine.evaluate([{'symbol': 'BARE', 'roe': 'n/a'}])[0]
+    # beta defaults to 1.0, so neither volatility rung fires
+    assert not any('beta' in point for quadrant in swot.values() for point in quadrant)
+    assert swot['opportunities'] == GENERIC_OPPORTUNITIES[:MAX_ITEMS]
+    assert all(len(points) <= MAX_ITEMS for points in swot.values())
+
+
+def test_buckets_ignore_moves_within_a_rung():
+    moved = dict(TCS, pe_ratio=24.1, roe=44, profit_margin=18.5)
+    crossed = dict(TCS, pe_ratio=26)
+    assert engine.buckets([TCS])[0] == engine.buckets([moved])[0]
+    assert engine.buckets([TCS])[0] != engine.buckets([crossed])[0]
+    assert engine.buckets([TCS])[0] != engine.buckets([dict(TCS, sector='Software')])[0]
@@ -0,0 +1,112 @@
+"""Symbol -> company URL resolution: persistence, negative caching and when the scraper re-resolves"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+from modules.screener_scraper import ScreenerScraper
+from modules.symbol_resolver import UNKNOWN, SymbolResolver
+
+BASE = 'https://www.screener.in'
+
+
+def _response(status: int, url: str, body: bytes = b'') -> requests.Response:
+    response = requests.Response()
+    response.status_code, response.url, response._content = status, url, body
+    return response
+
+
+class FakeScreener:
+    """Answers _get from a url -> status map and records what was requested"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def __call__(self, url: str) -> requests.Response:
+        self.requested.append(url)
+        return _response(self.pages.get(url, 404), url, b'<html></html>')
+
+
+@pytest.fixture
+def resolver(db):
+    return SymbolResolver()
+
+
+@pytest.fixture
+def scraper(resolver):
+    scraper = ScreenerScraper()
+    scraper.resolver = resolver
+    return scraper
+
+
+def test_recorded_urls_persist_across_processes(resolver):
+    assert resolver.lookup('tcs') is None
+    resolver.record('tcs', f'{BASE}/company/TCS/', 'standalone')
+
+    assert resolver.lookup('TCS') == f'{BASE}/company/TCS/'
+    # A new process reads the table, not its own memory
+    assert SymbolResolver().lookup('TCS') == f'{BASE}/company/TCS/'
+
+
+def test_negative_entries_expire(resolver, db):
+    resolver.record_missing('NOPE')
+    assert resolver.lookup('NOPE') is UNKNOWN
+
+    stale = (datetime.now() - timedelta(hours=25)).isoformat()
+    with db.db_connection() as conn:
+        conn.execute("UPDATE symbol_urls SET updated_at = ? WHERE symbol = 'NOPE'", (stale,))
+    later = SymbolResolver()
+    assert later.lookup('NOPE') is None
+    with db.db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM symbol_urls WHERE symbol = 'NOPE'").fetchone()[0] == 0
+
+
+def test_invalidate_forgets_the_symbol(resolver):
+    resolver.record('TCS', f'{BASE}/company/TCS/', 'standalone')
+    resolver.invalidate('tcs')
+    assert resolver.lookup('TCS') is None
+    assert SymbolResolver().lookup('TCS') is None
+
+
+def test_unknown_symbol_is_not_fetched_again(scraper, resolver, monkeypatch):
+    screener = FakeScreener({f'{BASE}/search/?q=NOPE': 200})
+    monkeypatch.setattr(scraper, '_get', screener)
+
+    assert scraper._fetch_company_page('nope') is None
+    assert screener.requested == [f'{BASE}/company/NOPE/', f'{BASE}/search/?q=NOPE']
+    assert resolver.lookup('NOPE') is UNKNOWN
+
+    assert scraper._fetch_company_page('NOPE') is None
+    assert len(screener.requested) == 2
+
+
+def test_moved_page_is_resolved_again(scraper, resolver, monkeypatch):
+    resolver.record('TCS', f'{BASE}/company/OLD/', 'standalone')
+    screener = FakeScreener({f'{BASE}/company/OLD/': 410, f'{BASE}/company/TCS/': 200})
+    monkeypatch.setattr(scraper, '_get', screener)
+
+    assert scraper._fetch_company_page('TCS').status_code == 200
+    assert resolver.lookup('TCS') == f'{BASE}/company/TCS/'
+
+
+@pytest.mark.parametrize('status', [403, 429, 503])
+def test_cached_url_is_kept_when_screener_is_unhealthy(scraper, resolver, monkeypatch, status):
+    resolver.record('TCS', f'{BASE}/company/TCS/consolidated/', 'consolidated')
+    screener = FakeScreener({f'{BASE}/company/TCS/consolidated/': status})
+    monkeypatch.setattr(scraper, '_get', screener)
+
+    with pytest.raises(requests.HTTPError):
+        scraper._fetch_company_page('TCS')
+    assert screener.requested == [f'{BASE}/company/TCS/consolidated/']
+    assert resolver.lookup('TCS') == f'{BASE}/company/TCS/consolidated/'
+
+
+def test_outage_during_resolution_is_not_cached_as_missing(scraper, resolver, monkeypatch):
+    screener = FakeScreener({f'{BASE}/company/NEW/': 503})
+    monkeypatch.setattr(scraper, '_get', screener)
+
+    with pytest.raises(requests.HTTPError):
+        scraper._fetch_company_page('NEW')
+    assert resolver.lookup('NEW') is None
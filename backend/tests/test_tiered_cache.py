@@ -0,0 +1,108 @@
+"""TieredCache expiry, stale grace and L1/L2 behaviour, and the freshness rules callers apply"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules import tiered_cache
+from modules.market_hours import IST
+from modules.result_table import ResultTable
+from modules.revalidate import EXPIRED, FRESH, STALE, freshness
+from modules.tiered_cache import TieredCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TieredCache(str(tmp_path / 'cache.db'))
+
+
+def _counters(cache: TieredCache, namespace: str):
+    stats = cache.stats()[namespace]
+    return stats['l1_hits'], stats['l2_hits'], stats['misses']
+
+
+def test_round_trip_and_miss(cache):
+    table = ResultTable.from_cells(['', 'Mar 2024', 'Mar 2025'], [['Sales +', '1,000', '1,200'], ['OPM %', '21%', '']])
+    cache.set('financials', 'TCS', {'name': 'TCS', 'quarterly_results': table}, ttl=timedelta(minutes=15))
+
+    entry = TieredCache(cache.path).get('financials', 'TCS')
+    assert entry.value['name'] == 'TCS'
+    assert entry.value['quarterly_results'].to_dict() == table.to_dict()
+    assert entry.expires_at - entry.fetched_at == timedelta(minutes=15)
+    assert cache.get('financials', 'INFY') is None
+
+
+def test_expired_entries_are_still_returned(cache):
+    now = datetime.now(IST)
+    cache.set('quotes', 'NIFTY', {'price': 1}, expires_at=now - timedelta(days=1), fetched_at=now - timedelta(days=2))
+    entry = cache.get('quotes', 'NIFTY')
+    assert entry.value == {'price': 1}
+    assert entry.expires_at < now
+
+
+def test_l1_keeps_entries_through_grace(cache):
+    now = datetime.now(IST)
+    grace = tiered_cache.L1_STALE_GRACE['financials']
+    cache.set('financials', 'STALE', {}, expires_at=now - grace / 2)
+    cache.set('financials', 'GONE', {}, expires_at=now - grace - timedelta(minutes=1))
+
+    cache.get('financials', 'STALE')
+    cache.get('financials', 'GONE')
+    assert _counters(cache, 'financials') == (1, 1, 0)
+
+
+def test_l1_is_rechecked_against_l2(cache, monkeypatch):
+    other_worker = TieredCache(cache.path)
+    cache.set('swot', 'TCS', {'version': 1}, ttl=timedelta(hours=1))
+    other_worker.set('swot', 'TCS', {'version': 2}, ttl=timedelta(hours=1))
+    assert cache.get('swot', 'TCS').value == {'version': 1}
+
+    monkeypatch.setattr(tiered_cache, 'L1_MAX_AGE_SECONDS', 0)
+    assert cache.get('swot', 'TCS').value == {'version': 2}
+
+
+def test_get_many_reads_misses_in_one_pass(cache):
+    cache.set('history', 'TCS:1y', [1], ttl=timedelta(hours=1))
+    TieredCache(cache.path).set('history', 'INFY:1y', [2], ttl=timedelta(hours=1))
+    found = cache.get_many('history', ['TCS:1y', 'INFY:1y', 'WIPRO:1y'])
+    assert {key: entry.value for key, entry in found.items()} == {'TCS:1y': [1], 'INFY:1y': [2]}
+    assert _counters(cache, 'history') == (1, 1, 1)
+
+
+def test_l1_is_bounded(cache, monkeypatch):
+    monkeypatch.setitem(tiered_cache.L1_SIZES, 'quotes', 2)
+    for key in ('A', 'B', 'C'):
+        cache.set('quotes', key, key, ttl=timedelta(hours=1))
+    stats = cache.stats()['quotes']
+    assert (stats['l1_entries'], stats['evictions'], stats['l2_entries']) == (2, 1, 3)
+
+
+def test_purge_expired_keeps_the_retention_window(cache):
+    now = datetime.now(IST)
+    cache.set('financials', 'RECENT', {}, expires_at=now - timedelta(days=1))
+    cache.set('financials', 'ANCIENT', {}, expires_at=now - tiered_cache.RETAIN_AFTER_EXPIRY - timedelta(days=1))
+    assert cache.purge_expired() == 1
+    assert TieredCache(cache.path).get('financials', 'ANCIENT') is None
+    assert TieredCache(cache.path).get('financials', 'RECENT') is not None
+
+
+def test_purge_symbol_matches_whole_key_parts(cache):
+    for namespace, key in (('financials', 'TCS'), ('history', 'TCS:1y'), ('tweets', 'ETMarkets:TCS'),
+                           ('financials', 'TCSL'), ('history', 'TCS_X:1y')):
+        cache.set(namespace, key, 1, ttl=timedelta(hours=1))
+    assert cache.purge_symbol('tcs') == {'financials': 1, 'history': 1, 'tweets': 1}
+    assert cache.get('financials', 'TCSL') is not None
+    assert cache.get('history', 'TCS_X:1y') is not None
+
+
+@pytest.mark.parametrize('age_past_expiry, fetched_ago, state', [
+    (timedelta(minutes=-1), timedelta(minutes=10), FRESH),
+    (timedelta(0), timedelta(minutes=15), STALE),
+    (timedelta(minutes=59), timedelta(minutes=74), STALE),
+    (timedelta(hours=1), timedelta(minutes=75), EXPIRED),
+    # Within grace but past the hard limit on staleness
+    (timedelta(minutes=30), timedelta(days=3), EXPIRED),
+])
+def test_freshness(age_past_expiry, fetched_ago, state):
+    now = datetime.now(IST)
+    assert freshness(now - fetched_ago, now - age_past_expiry, now, timedelta(hours=1), timedelta(days=2)) == state
@@ -0,0 +1,43 @@
+"""Recorded upstream fixtures: text and binary bodies round-trip, and the benchmark reads both"""
+
+import requests
+
+from benchmarks import hot_paths
+from modules import upstream_fixtures
+from modules.upstream_fixtures import load_fixture, response_body, save_fixture
+
+
+def _exchange(url: str, content: bytes):
+    request = requests.Request('GET', url).prepare()
+    response = requests.Response()
+    response.status_code, response.reason, response._content = 200, 'OK', content
+    response.headers['Content-Type'] = 'text/html'
+    response.headers['Set-Cookie'] = 'session=secret'
+    return request, response
+
+
+def _load(request, directory):
+    key = upstream_fixtures.fixture_key(request.method, request.url)
+    return load_fixture('www.screener.in', key, str(directory))
+
+
+def test_bodies_round_trip(tmp_path):
+    text = _exchange('https://www.screener.in/company/TCS/consolidated/', '<h1>TCS ₹</h1>'.encode('utf-8'))
+    binary = _exchange('https://www.screener.in/company/INFY/consolidated/', b'\x1f\x8b\x08\xff<h1>INFY</h1>')
+    for request, response in (text, binary):
+        save_fixture(request, response, str(tmp_path))
+
+    recorded = _load(text[0], tmp_path)['response']
+    assert 'body' in recorded and response_body(recorded) == text[1].content
+    assert 'set-cookie' not in {name.lower() for name in recorded['headers']}
+    recorded = _load(binary[0], tmp_path)['response']
+    assert 'body_base64' in recorded and response_body(recorded) == binary[1].content
+
+
+def test_benchmark_loads_base64_pages(tmp_path, monkeypatch):
+    binary = _exchange('https://www.screener.in/company/INFY/consolidated/', b'\xff\xfe<h1>INFY</h1>')
+    save_fixture(*binary, str(tmp_path))
+    monkeypatch.setattr(upstream_fixtures, 'FIXTURES_DIR', str(tmp_path))
+    monkeypatch.setattr(hot_paths, 'PAGE_FIXTURES', str(tmp_path / 'no-pages'))
+
+    assert hot_paths.load_pages() == [(binary[0].url, binary[1].content)]
@@ -0,0 +1,87 @@
+"""WarmupRun: claiming a day's run, checkpoints, resume after failures"""
+
+import pytest
+
+from modules import warmup
+from modules.warmup import WarmupRun
+
+
+class FakeScraper:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.fetched = []
+
+    def fetch_financial_data(self, symbol, force_refresh=False):
+        self.fetched.append((symbol, force_refresh))
+        if symbol in self.failing:
+            return None
+        return {'name': symbol, 'current_price': 100}
+
+
+class FakeSWOT:
+    def __init__(self):
+        self.analyzed = []
+
+    def analyze(self, symbol, force_refresh=False):
+        self.analyzed.append((symbol, force_refresh))
+        return {'symbol': symbol}
+
+
+@pytest.fixture(autouse=True)
+def no_analytics(monkeypatch):
+    monkeypatch.setattr(warmup.price_analytics, 'refresh', lambda symbols: {'recomputed': len(symbols)})
+
+
+def _run(failing=()) -> WarmupRun:
+    run = WarmupRun(run_id='2026-10-19', workers=2)
+    run.scraper, run.swot = FakeScraper(failing), FakeSWOT()
+    return run
+
+
+def test_warm_symbol_refreshes_financials_and_swot(db, fresh_cache):
+    run = _run(failing=['GONE'])
+    assert run.warm_symbol('TCS') == 'done'
+    assert run.scraper.fetched == [('TCS', True)]
+    # A stale stored report is regenerated, not served as is
+    assert run.swot.analyzed == [('TCS', True)]
+    assert run.warm_symbol('GONE') == 'failed'
+    assert run.swot.analyzed == [('TCS', True)]
+
+
+def test_stale_financials_count_as_failed(db, fresh_cache):
+    run = _run()
+    run.scraper.fetch_financial_data = lambda symbol, force_refresh=False: {'name': symbol, 'stale': True}
+    assert run.warm_symbol('TCS') == 'failed'
+
+
+def test_one_process_runs_a_day(db, fresh_cache):
+    first = _run()
+    assert first.claim()
+    assert not _run().claim()
+
+
+def test_interrupted_run_resumes_where_it_stopped(db, fresh_cache):
+    first = _run(failing=['INFY'])
+    assert first.claim()
+    stats = first.run(['TCS', 'INFY', 'tcs', 'WIPRO'])
+    assert (stats['symbols'], stats['done'], stats['failed'], stats['skipped']) == (3, 2, 1, 0)
+    assert first.completed_symbols() == {'TCS', 'WIPRO'}
+
+    # Failures release the run, so it can be resumed at once and only retries what is left
+    second = _run()
+    assert second.claim()
+    stats = second.run(['TCS', 'INFY', 'WIPRO'])
+    assert (stats['done'], stats['failed'], stats['skipped']) == (1, 0, 2)
+    assert second.scraper.fetched == [('INFY', True)]
+
+    # Finished: not run again today
+    assert not _run().claim()
+
+
+def test_restart_discards_checkpoints(db, fresh_cache):
+    first = _run()
+    first.claim()
+    first.run(['TCS'])
+    again = _run()
+    assert again.claim(restart=True)
+    assert again.completed_symbols() == set()
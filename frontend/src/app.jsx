@@ -1,5 +1,15 @@
 ﻿const { useState, useEffect, useRef } = React;
 
+// Send the session token with every API request (data endpoints require it)
+axios.interceptors.request.use(config => {
+  const token = localStorage.getItem('authToken');
+  if (token) {
+    config.headers = config.headers || {};
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
 // Main Stock Analysis Component (original app content)
 function StockAnalysis({ user, onLogout }) {
   const [niftyData, setNiftyData] = useState(null);